@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inline article bodies vs content-addressed compressed blobs
+======================================================================
+
+Generates a year of synthetic newsletter articles, where some bodies
+repeat: a pool of sponsor blocks and a share of re-sent issues.  It
+stores them two ways:
+
+  inline  – the old layout: full content plus a 500-char snippet copy
+            on every articles row
+  blobs   – Database.store_articles_bulk: one compressed body per
+            distinct content_hash
+
+It reports the file size of each, and the cost of reading --reads random
+article bodies from a cold cache.  "Cold" means a fresh connection with
+mmap off, with the file's pages dropped from the OS cache through
+posix_fadvise where the platform supports it.
+
+    python benchmarks/bench_article_storage.py
+    python benchmarks/bench_article_storage.py --days 365 --issues-per-day 40
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import config
+from src.database import blobs as blob_codec
+from src.database.blobs import content_hash, decompress
+from src.database.models import Database
+
+# A Zipf-distributed vocabulary, so word frequencies (and therefore both
+# compression ratios and full-text selectivity) look like real prose
+SYLLABLES = ['ba', 'cor', 'den', 'fi', 'gal', 'hu', 'ker', 'lo', 'man', 'nor',
+             'pi', 'quen', 'ros', 'sta', 'tu', 'ver', 'wil', 'xa', 'yor', 'zen']
+WORDS = 'the a of to in and is that for on with as by at from it an be this are'.split()
+WORDS += [a + b + c for c in [''] + SYLLABLES for a in SYLLABLES for b in SYLLABLES
+          if a != b][:6000]
+ZIPF_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) ** 1.1
+                                         for rank in range(len(WORDS))))
+
+
+def make_year(days: int, issues_per_day: int, per_issue: int, seed: int = 7):
+    rng = random.Random(seed)
+    text = lambda n: ' '.join(rng.choices(WORDS, cum_weights=ZIPF_WEIGHTS, k=n)).capitalize() + '.'
+    sponsors = [text(120) for _ in range(30)]
+    articles, seen = [], []
+    for day in range(days):
+        for issue in range(issues_per_day):
+            for slot in range(per_issue):
+                roll = rng.random()
+                if roll < 0.15:
+                    body = rng.choice(sponsors)
+                elif roll < 0.20 and seen:
+                    body = rng.choice(seen)            # re-sent issue
+                else:
+                    body = text(rng.randint(150, 600))
+                    seen.append(body)
+                articles.append({'title': f'Day {day} issue {issue} #{slot}',
+                                 'url': f'https://example.com/{day}/{issue}/{slot}',
+                                 'content': body, 'word_count': len(body.split()),
+                                 'newsletter_name': f'Newsletter {issue}'})
+    return articles
+
+
+def write_inline(path: Path, articles):
+    db = Database(path)
+    email_id = db.store_email({'gmail_message_id': 'bench', 'subject': 'Bench',
+                               'sender_email': 'a@b.example', 'received_timestamp': '',
+                               'is_newsletter': True})
+    with db.conn:
+        db.conn.executemany('''
+            INSERT INTO articles (email_id, title, url, content, content_snippet,
+                                  word_count, content_hash, newsletter_name)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(email_id, a['title'], a['url'], a['content'], a['content'][:500],
+               a['word_count'], content_hash(a['content']), a['newsletter_name'])
+              for a in articles])
+    db.close()
+
+
+def write_blobs(path: Path, articles):
+    db = Database(path)
+    email_id = db.store_email({'gmail_message_id': 'bench', 'subject': 'Bench',
+                               'sender_email': 'a@b.example', 'received_timestamp': '',
+                               'is_newsletter': True})
+    db.store_articles_bulk([(a, email_id) for a in articles])
+    db.close()
+
+
+def file_size(path: Path) -> int:
+    conn = sqlite3.connect(str(path))
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.execute('VACUUM')
+    conn.close()
+    return path.stat().st_size
+
+
+def cold_reads(path: Path, ids, blobs: bool) -> float:
+    if hasattr(os, 'posix_fadvise'):
+        fd = os.open(path, os.O_RDONLY)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        os.close(fd)
+    conn = sqlite3.connect(str(path))
+    conn.execute('PRAGMA mmap_size = 0')
+    start = time.perf_counter()
+    for article_id in ids:
+        if blobs:
+            codec, data = conn.execute('''
+                SELECT b.codec, b.data FROM articles a JOIN blobs b ON b.hash = a.content_hash
+                WHERE a.id = ?''', (article_id,)).fetchone()
+            decompress(codec, data)
+        else:
+            conn.execute('SELECT content FROM articles WHERE id = ?', (article_id,)).fetchone()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--issues-per-day', type=int, default=20)
+    parser.add_argument('--per-issue', type=int, default=6)
+    parser.add_argument('--reads', type=int, default=2000)
+    args = parser.parse_args()
+
+    articles = make_year(args.days, args.issues_per_day, args.per_issue)
+    distinct = len({content_hash(a['content']) for a in articles})
+    raw_mb = sum(len(a['content'].encode('utf-8')) for a in articles) / 1e6
+    print(f'\n{len(articles)} articles over {args.days} days, {distinct} distinct bodies, '
+          f'{raw_mb:.1f} MB of text\n')
+
+    ids = random.Random(1).sample(range(1, len(articles) + 1), min(args.reads, len(articles)))
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, write, blobs in (('inline', write_inline, False), ('blobs', write_blobs, True)):
+            path = Path(tmp) / f'{label}.db'
+            start = time.perf_counter()
+            write(path, articles)
+            write_secs = time.perf_counter() - start
+            size = file_size(path)
+            read_secs = cold_reads(path, ids, blobs)
+            print(f'  {label:<7} {size / 1e6:8.1f} MB on disk  write {write_secs:6.2f} s  '
+                  f'cold read {read_secs / len(ids) * 1e6:7.1f} µs/article')
+    codec = 'zstd' if blob_codec.zstandard else 'zlib'
+    print(f'\n  codec: {codec}   (DB_MMAP_MB={config.DB_MMAP_MB} is off for the read test)\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: row-at-a-time vs bulk database writes
+=================================================
+
+Stores a synthetic backfill (--articles articles spread over emails of
+--per-email each) into a fresh on-disk database twice: once through
+store_email / store_article, which commit every row, and once through
+store_emails_bulk / store_articles_bulk in DB_WRITE_BATCH_SIZE
+transactions, the way the pipeline does.
+
+    python benchmarks/bench_db_writes.py
+    python benchmarks/bench_db_writes.py --articles 50000 --per-email 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import config
+from src.database.models import Database
+
+
+def make_load(articles: int, per_email: int):
+    emails = [{'gmail_message_id': f'bench-{i}', 'thread_id': f't{i}',
+               'subject': f'Bench Weekly #{i}', 'sender_email': f'news{i % 20}@bench.example',
+               'sender_name': 'Bench Weekly', 'received_timestamp': '2026-02-02T08:00:00',
+               'headers': {'List-Unsubscribe': '<https://bench.example/u>'},
+               'is_newsletter': True}
+              for i in range((articles + per_email - 1) // per_email)]
+    body = 'A paragraph of article text that goes on for a while. ' * 40
+    items = [{'title': f'Story {i}', 'url': f'https://example.com/story/{i}',
+              'content': f'{body} {i}', 'word_count': 400,
+              'newsletter_name': 'Bench Weekly', 'newsletter_email': 'news@bench.example'}
+             for i in range(articles)]
+    return emails, items
+
+
+def row_at_a_time(db: Database, emails, items, per_email: int):
+    email_ids = [db.store_email(e) for e in emails]
+    for i, article in enumerate(items):
+        db.store_article(article, email_ids[i // per_email])
+
+
+def bulk(db: Database, emails, items, per_email: int):
+    email_ids = db.store_emails_bulk(emails)
+    pairs = [(article, email_ids[i // per_email]) for i, article in enumerate(items)]
+    for start in range(0, len(pairs), config.DB_WRITE_BATCH_SIZE):
+        db.store_articles_bulk(pairs[start:start + config.DB_WRITE_BATCH_SIZE])
+
+
+def measure(label: str, write, emails, items, per_email: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / 'bench.db')
+        start = time.perf_counter()
+        write(db, emails, items, per_email)
+        elapsed = time.perf_counter() - start
+        stored = db.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+        db.close()
+    rows = len(emails) + len(items)
+    print(f'  {label:<16} {elapsed:8.2f} s  {rows / elapsed:10.0f} rows/s  ({stored} articles)')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--articles', type=int, default=10000)
+    parser.add_argument('--per-email', type=int, default=10)
+    args = parser.parse_args()
+
+    emails, items = make_load(args.articles, args.per_email)
+    print(f'\n{len(items)} articles from {len(emails)} emails\n')
+    slow = measure('row at a time', row_at_a_time, emails, items, args.per_email)
+    fast = measure('bulk', bulk, emails, items, args.per_email)
+    print(f'\n  speed-up: {slow / fast:.1f}x\n')
+
+
+if __name__ == '__main__':
+    main()
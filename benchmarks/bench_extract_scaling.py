@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: extraction throughput vs worker processes
+====================================================
+
+Extracts the newsletter fixtures (fixtures/newsletters) x --rounds, first in
+this process, one email at a time, and then through an ExtractorPool
+(src/processors/pool.py) with 1, 2, 4, … workers up to the CPU count.  The
+table shows emails/sec, speed-up over in-process extraction, and whether
+the pool returned the same articles in the same order.
+
+    python benchmarks/bench_extract_scaling.py
+    python benchmarks/bench_extract_scaling.py --rounds 100 --workers 1 2 4 8 16 --chunk-size 8
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.processors.extractor import ArticleExtractor
+from src.processors.pool import ExtractorPool
+
+FIXTURES = ROOT / 'fixtures' / 'newsletters'
+
+
+def load_jobs(rounds: int):
+    # Bytes, decoded by hand: read_text() would turn CR LF into LF
+    jobs = [{'html_content': path.read_bytes().decode('utf-8'),
+             'newsletter_name': 'Bench Weekly',
+             'newsletter_email': 'editor@bench.example'}
+            for path in sorted(FIXTURES.glob('*.html'))]
+    return jobs * rounds
+
+
+def worker_counts() -> list:
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=None)
+    parser.add_argument('--chunk-size', type=int, default=4)
+    parser.add_argument('--parser', default=None, help='HTML parser backend (default: fastest)')
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.rounds)
+    extractor = ArticleExtractor(args.parser)
+    print(f'\n{len(jobs)} emails, parser {extractor.parser.name}, '
+          f'chunk size {args.chunk_size}, {os.cpu_count()} CPUs\n')
+
+    started = time.perf_counter()
+    reference = [extractor.extract_from_email(**job) for job in jobs]
+    baseline = len(jobs) / (time.perf_counter() - started)
+
+    print(f"  {'workers':<10} {'emails/s':>9} {'speed-up':>9} {'same output':>11}")
+    print(f"  {'in-process':<10} {baseline:>9.0f} {1.0:>8.1f}x {'-':>11}")
+    for workers in args.workers or worker_counts():
+        # Start-up (forking, copying the extractor) is left out of the timing
+        with ExtractorPool(extractor, workers=workers, chunk_size=args.chunk_size) as pool:
+            started = time.perf_counter()
+            results = list(pool.imap(jobs))
+            rate = len(jobs) / (time.perf_counter() - started)
+        print(f'  {workers:<10} {rate:>9.0f} {rate / baseline:>8.1f}x '
+              f'{"yes" if results == reference else "NO":>11}')
+    print()
+
+
+if __name__ == '__main__':
+    main()
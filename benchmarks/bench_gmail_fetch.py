@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial vs batched vs concurrent Gmail fetch
+========================================================
+
+Runs GmailClient against a local fake Gmail endpoint (see fake_gmail.py)
+that adds a fixed latency to every HTTP round trip, and reports
+messages/sec for the old one-request-per-message loop, the paginated
+batched fetch, and the thread-pool fetch.
+
+Quota pacing is off by default so the numbers show transport cost only;
+pass --quota 250 to pace at Gmail's real per-user budget (which caps
+every mode at 50 messages.get per second).  --throttle N makes the fake
+server answer 429 beyond N concurrent requests, to exercise the adaptive
+concurrency limit.
+
+    python benchmarks/bench_gmail_fetch.py
+    python benchmarks/bench_gmail_fetch.py --messages 1200 --latency-ms 40
+    python benchmarks/bench_gmail_fetch.py --throttle 6
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import config
+from fake_gmail import FakeGmail, make_service
+from src.gmail import client as client_module
+from src.gmail.client import GmailClient
+
+config.MESSAGE_CACHE_ENABLED = False   # measure Gmail, not the local cache
+
+
+def run_serial(client: GmailClient):
+    """The pre-batching loop: one page of IDs, one messages.get per ID."""
+    results = client.service.users().messages().list(
+        userId='me', q='after:0', maxResults=500).execute()
+    ids = [m['id'] for m in results.get('messages', [])]
+    return [client.get_message_content(i) for i in ids]
+
+
+def run_paginated(client: GmailClient):
+    ids = [m['id'] for m in client.list_message_ids('after:0')]
+    return client.get_messages_content(ids)
+
+
+def measure(label: str, fake: FakeGmail, fn, quota, **client_args):
+    client = GmailClient(service=make_service(fake.root_url),
+                         quota_units_per_sec=quota, **client_args)
+    fake.http_requests = fake.throttled = 0
+    start = time.perf_counter()
+    emails = fn(client)
+    elapsed = time.perf_counter() - start
+    print(f'  {label:<24} {len(emails):>6} msgs  {fake.http_requests:>5} HTTP reqs  '
+          f'{fake.throttled:>4} 429s  {elapsed:7.2f} s  {len(emails) / elapsed:8.1f} msgs/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--messages', type=int, default=600)
+    parser.add_argument('--latency-ms', type=float, default=25.0)
+    parser.add_argument('--quota', type=float, default=None,
+                        help='quota units/sec to pace at (default: unpaced)')
+    parser.add_argument('--throttle', type=int, default=0,
+                        help='fake server 429s beyond this many concurrent GETs')
+    args = parser.parse_args()
+
+    # Keep 429 back-off short so the benchmark measures throughput, not sleep
+    client_module.RETRY_BASE_DELAY_SECS = 0.05
+
+    fake = FakeGmail(message_count=args.messages, latency=args.latency_ms / 1000,
+                     max_concurrent=args.throttle).start()
+    print(f'\nFake Gmail: {args.messages} messages, {args.latency_ms:.0f} ms per round trip, '
+          f'quota {args.quota or "unpaced"}, throttle {args.throttle or "off"}\n')
+    try:
+        # The old loop never looked past the first 500 IDs
+        measure('serial (first page)', fake, run_serial, args.quota, batch_size=1)
+        for batch_size in (10, 50, 100):
+            measure(f'batched ({batch_size}/batch)', fake, run_paginated, args.quota,
+                    batch_size=batch_size)
+        for workers in (4, 8, 16):
+            measure(f'concurrent ({workers} workers)', fake, run_paginated, args.quota,
+                    fetch_mode='concurrent', max_workers=workers)
+    finally:
+        fake.stop()
+    print()
+
+
+if __name__ == '__main__':
+    main()
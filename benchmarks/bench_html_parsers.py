@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ArticleExtractor throughput per HTML parser backend
+==============================================================
+
+Runs every installed backend (parsers.py) over the newsletter fixtures in
+fixtures/newsletters, --rounds times, and reports emails/sec for the full
+extract_from_email() and for parsing alone.  It first checks that every
+backend produces the same articles as html.parser.
+
+Then it times one long newsletter: the body of every fixture repeated
+--long-repeats times, which is where per-heading re-scans of the tree
+used to show.
+
+    python benchmarks/bench_html_parsers.py
+    python benchmarks/bench_html_parsers.py --rounds 200 --long-repeats 40
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.processors.extractor import ArticleExtractor
+from src.processors.parsers import available_backends, get_backend
+
+FIXTURES = ROOT / 'fixtures' / 'newsletters'
+
+
+def load_corpus():
+    # Bytes, decoded by hand: read_text() would turn CR LF into LF
+    return [path.read_bytes().decode('utf-8') for path in sorted(FIXTURES.glob('*.html'))]
+
+
+def make_long(corpus, repeats: int) -> str:
+    bodies = [html.split('<body', 1)[1].split('>', 1)[1].rsplit('</body>', 1)[0]
+              for html in corpus]
+    return '<html><body>' + ''.join(bodies) * repeats + '</body></html>'
+
+
+def extract_all(extractor: ArticleExtractor, corpus):
+    return [extractor.extract_from_email(html, newsletter_name='Bench Weekly',
+                                         newsletter_email='editor@bench.example')
+            for html in corpus]
+
+
+def rate(work, emails: int) -> float:
+    started = time.perf_counter()
+    work()
+    return emails / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--long-repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    emails = corpus * args.rounds
+    size_kb = sum(len(html.encode('utf-8')) for html in corpus) / len(corpus) / 1024
+    print(f'\n{len(corpus)} fixture newsletters (avg {size_kb:.1f} KB) x {args.rounds} rounds '
+          f'= {len(emails)} emails\n')
+
+    reference = extract_all(ArticleExtractor('html.parser'), corpus)
+    print(f"  {'backend':<12} {'same output':>11} {'extract/s':>10} {'parse/s':>9} {'speed-up':>9}")
+    baseline = None
+    for name in available_backends()[::-1]:
+        extractor = ArticleExtractor(name)
+        backend = get_backend(name)
+        same = extract_all(extractor, corpus) == reference
+        extract_rate = rate(lambda: extract_all(extractor, emails), len(emails))
+        parse_rate = rate(lambda: [backend.parse(html) for html in emails], len(emails))
+        baseline = baseline or extract_rate
+        print(f'  {name:<12} {"yes" if same else "NO":>11} {extract_rate:>10.0f} '
+              f'{parse_rate:>9.0f} {extract_rate / baseline:>8.1f}x')
+
+    long_html = make_long(corpus, args.long_repeats)
+    print(f'\nOne long newsletter ({len(long_html) / 1024:.0f} KB)\n')
+    print(f"  {'backend':<12} {'articles':>8} {'extract ms':>10}")
+    for name in available_backends()[::-1]:
+        extractor = ArticleExtractor(name)
+        started = time.perf_counter()
+        articles = extractor.extract_from_email(long_html)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f'  {name:<12} {len(articles):>8} {elapsed_ms:>10.1f}')
+    print()
+
+
+if __name__ == '__main__':
+    main()
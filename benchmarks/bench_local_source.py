@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local archive ingestion (mbox / Maildir / .eml)
+===========================================================
+
+Writes the same synthetic newsletters (see bench_mime_parse.py) into an
+mbox file, a Maildir, and a directory of .eml files, then times
+LocalMailSource.iter_messages over each: messages/sec and MB/sec of raw
+mail parsed into the pipeline's email dicts.  Compare with the fetch
+rates from bench_gmail_fetch.py.
+
+    python benchmarks/bench_local_source.py
+    python benchmarks/bench_local_source.py --messages 5000 --html-kb 40
+"""
+import argparse
+import mailbox
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_mime_parse import make_mime
+from src.sources import LocalMailSource
+
+
+def build_archives(root: Path, count: int, html_kb: int) -> int:
+    mbox = mailbox.mbox(str(root / 'archive.mbox'))
+    maildir = mailbox.Maildir(str(root / 'Maildir'))
+    eml_dir = root / 'eml'
+    eml_dir.mkdir()
+    total_bytes = 0
+    for i in range(count):
+        msg = make_mime(i, html_kb)
+        msg['Message-ID'] = f'<bench-{i}@bench.example>'
+        data = msg.as_bytes()
+        total_bytes += len(data)
+        mbox.add(data)
+        maildir.add(data)
+        (eml_dir / f'{i:06d}.eml').write_bytes(data)
+    mbox.flush()
+    mbox.close()
+    return total_bytes
+
+
+def measure(label: str, path: Path, total_bytes: int):
+    source = LocalMailSource(path)
+    start = time.perf_counter()
+    count = sum(1 for _ in source.iter_messages())
+    elapsed = time.perf_counter() - start
+    print(f'  {label:<10} {count:>6} msgs  {elapsed:7.2f} s  {count / elapsed:9.1f} msgs/s  '
+          f'{total_bytes / elapsed / 1e6:7.1f} MB/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--html-kb', type=int, default=80)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp())
+    try:
+        total_bytes = build_archives(root, args.messages, args.html_kb)
+        print(f'\n{args.messages} messages, {total_bytes / 1e6:.1f} MB of raw mail\n')
+        measure('mbox', root / 'archive.mbox', total_bytes)
+        measure('Maildir', root / 'Maildir', total_bytes)
+        measure('.eml dir', root / 'eml', total_bytes)
+    finally:
+        shutil.rmtree(root)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON-payload vs raw RFC 822 message parsing
+========================================================
+
+Builds synthetic newsletter messages (multipart/alternative, a mix of
+charsets and transfer encodings), renders each both as a Gmail
+format='full' JSON resource and as a format='raw' resource, and times
+GmailClient._parse_message on each.  Peak memory per message comes from
+tracemalloc.  It also counts the messages whose HTML the two paths decode
+differently (the JSON path forces utf-8).
+
+    python benchmarks/bench_mime_parse.py
+    python benchmarks/bench_mime_parse.py --messages 500 --html-kb 200
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+import tracemalloc
+from email.message import EmailMessage
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import config
+from src.gmail.client import GmailClient
+
+config.MESSAGE_CACHE_ENABLED = False   # parsing only; leave the message cache alone
+
+CHARSETS = [('utf-8', 'base64'), ('utf-8', 'quoted-printable'), ('iso-8859-1', 'quoted-printable')]
+
+
+def make_mime(index: int, html_kb: int) -> EmailMessage:
+    charset, cte = CHARSETS[index % len(CHARSETS)]
+    block = (f'<h2><a href="https://example.com/story/{index}">Café story {index}</a></h2>'
+             '<p>A naïve blurb about the story, written by the newsletter editor.</p>')
+    html = '<html><body>' + block * max(1, html_kb * 1024 // len(block)) + '</body></html>'
+
+    msg = EmailMessage()
+    msg['From'] = f'Bench Weekly <news{index % 20}@bench.example>'
+    msg['Subject'] = f'Bench Weekly #{index}'
+    msg['Date'] = 'Mon, 02 Feb 2026 08:00:00 +0000'
+    msg['List-Unsubscribe'] = '<https://bench.example/unsubscribe>'
+    msg.set_content('Plain text edition. ' * 200, charset=charset, cte=cte)
+    msg.add_alternative(html, subtype='html', charset=charset, cte=cte)
+    return msg
+
+
+def to_full_payload(part: EmailMessage) -> dict:
+    """Render a MIME tree the way Gmail's format='full' JSON does."""
+    payload = {
+        'mimeType': part.get_content_type(),
+        'headers': [{'name': k, 'value': str(v)} for k, v in part.items()],
+    }
+    if part.is_multipart():
+        payload['parts'] = [to_full_payload(p) for p in part.iter_parts()]
+        payload['body'] = {'size': 0}
+    else:
+        data = part.get_payload(decode=True)
+        payload['body'] = {'size': len(data),
+                           'data': base64.urlsafe_b64encode(data).decode('ascii')}
+    return payload
+
+
+def measure(label: str, client: GmailClient, resources):
+    start = time.perf_counter()
+    for resource in resources:
+        client._parse_message(resource)
+    elapsed = time.perf_counter() - start
+
+    peaks = []
+    for resource in resources[:20]:
+        tracemalloc.start()
+        client._parse_message(resource)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    per_msg_ms = elapsed / len(resources) * 1000
+    print(f'  {label:<14} {per_msg_ms:8.3f} ms/msg  {len(resources) / elapsed:9.1f} msgs/s  '
+          f'peak {max(peaks) / 1024:8.1f} KiB/msg')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--html-kb', type=int, default=80)
+    args = parser.parse_args()
+
+    mimes = [make_mime(i, args.html_kb) for i in range(args.messages)]
+    full = [{'id': f'm{i}', 'threadId': f't{i}', 'payload': to_full_payload(m)}
+            for i, m in enumerate(mimes)]
+    raw = [{'id': f'm{i}', 'threadId': f't{i}',
+            'raw': base64.urlsafe_b64encode(m.as_bytes()).decode('ascii')}
+           for i, m in enumerate(mimes)]
+
+    client = GmailClient(service=object())
+    print(f'\n{args.messages} messages, ~{args.html_kb} KiB HTML each\n')
+    measure("format='full'", client, full)
+    measure("format='raw'", client, raw)
+
+    # The JSON path decodes every part as utf-8 with errors='ignore'
+    lossy = sum(client._parse_message(f)['html'] != client._parse_message(r)['html']
+                for f, r in zip(full, raw))
+    print(f'\n  bodies that differ between paths (non-utf-8 charsets): {lossy}/{len(full)}')
+    print()
+
+
+if __name__ == '__main__':
+    main()
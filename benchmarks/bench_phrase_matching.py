@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compiled phrase matchers vs one `in` per phrase
+==========================================================
+
+Times each phrase check in the gate and the extractor two ways: the
+per-phrase loops they used to run, and the PhraseMatchers
+(src/phrases.py) they run now.  Inputs come from the newsletter fixtures:
+every anchor's URL and text, every extracted article body, plus synthetic
+sender addresses and subjects.  Each check must give the same answers
+both ways.
+
+A second table shows why PhraseMatcher switches strategy at LONG_TEXT:
+the trie regex against the per-phrase loop, by text length.
+
+    python benchmarks/bench_phrase_matching.py
+    python benchmarks/bench_phrase_matching.py --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import config
+from src.gmail import filters
+from src.phrases import PhraseMatcher
+from src.processors import extractor as ex
+from src.processors.extractor import ArticleExtractor
+from src.processors.parsers import get_backend
+
+FIXTURES = ROOT / 'fixtures' / 'newsletters'
+
+SKIP_SENDERS = ['noreply', 'no-reply', 'donotreply', 'notifications@', 'alerts@', 'digest@google']
+SKIP_SUBJECTS = ['verify your', 'reset password', 'confirm your', 'welcome to', 'receipt', 'invoice']
+
+
+def loop_any(phrases, text: str) -> bool:
+    lower = text.lower()
+    return any(phrase in lower for phrase in phrases)
+
+
+def load_inputs():
+    html = [path.read_bytes().decode('utf-8') for path in sorted(FIXTURES.glob('*.html'))]
+    backend = get_backend()
+    anchors = []
+    for page in html:
+        doc = backend.index(page)
+        anchors += [(a.href, doc.text(a)) for a in doc.anchors]
+    saved, config.MIN_WORD_COUNT = config.MIN_WORD_COUNT, 1
+    try:
+        bodies = [a['content'] for page in html
+                  for a in ArticleExtractor().extract_from_email(page, 'Bench Weekly')]
+    finally:
+        config.MIN_WORD_COUNT = saved
+    senders = [f'{name}@{domain}' for name in ('editor', 'noreply', 'hello', 'news')
+               for domain in ('substack.com', 'example.org', 'mail.beehiiv.com', 'ghost.io')]
+    subjects = ['Your weekly digest #42', 'Verify your email address', 'Markets this week',
+                'The daily brief: chips', 'Receipt for your order', 'On the economics of AI']
+    return anchors, bodies, senders, subjects
+
+
+def timed(check, inputs, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        answers = [check(item) for item in inputs]
+    return (time.perf_counter() - started) / (repeat * len(inputs)) * 1e9, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    anchors, bodies, senders, subjects = load_inputs()
+    urls = [href.lower() for href, _ in anchors]
+    texts = [text for _, text in anchors]
+    checks = [
+        ('social URL',     urls,     ex.SOCIAL_URL_PARTS,     ex._SOCIAL_URL),
+        ('noise anchor',   texts,    ex.NOISE_ANCHOR_PHRASES, ex._NOISE_ANCHOR),
+        ('article signal', urls,     ex.ARTICLE_URL_SIGNALS,  ex._ARTICLE_SIGNAL),
+        ('paywall',        bodies,   ex.PAYWALL_PHRASES,      ex._PAYWALL),
+        ('skip sender',    senders,  SKIP_SENDERS,            filters.SKIP_SENDERS),
+        ('skip subject',   subjects, SKIP_SUBJECTS,           filters.SKIP_SUBJECTS),
+    ]
+
+    print(f'\n{len(anchors)} anchors, {len(bodies)} article bodies '
+          f'(avg {sum(map(len, bodies)) // max(1, len(bodies))} chars), '
+          f'{len(senders)} senders, {len(subjects)} subjects\n')
+    print(f"  {'check':<15} {'inputs':>6} {'loop ns':>8} {'matcher ns':>10} {'speed-up':>9} {'same':>5}")
+    for name, inputs, phrases, matcher in checks:
+        loop_ns, want = timed(lambda text: loop_any(phrases, text), inputs, args.repeat)
+        match_ns, got = timed(matcher.any_in, inputs, args.repeat)
+        print(f'  {name:<15} {len(inputs):>6} {loop_ns:>8.0f} {match_ns:>10.0f} '
+              f'{loop_ns / match_ns:>8.1f}x {"yes" if got == want else "NO":>5}')
+
+    print(f'\nTrie regex vs per-phrase loop, {len(ex.PAYWALL_PHRASES)} paywall phrases '
+          f'(LONG_TEXT = {PhraseMatcher.LONG_TEXT})\n')
+    regex = ex._PAYWALL._regex
+    filler = ' '.join(bodies) or 'lorem ipsum dolor sit amet '
+    filler *= 50 * 4096 // len(filler) + 1
+    print(f"  {'chars':>6} {'loop ns':>8} {'regex ns':>9} {'faster':>7}")
+    for size in (16, 32, 64, 128, 256, 1024, 4096):
+        inputs = [filler[i:i + size] for i in range(0, 50 * size, size)]
+        loop_ns, _ = timed(lambda text: loop_any(ex.PAYWALL_PHRASES, text), inputs, args.repeat // 10 or 1)
+        regex_ns, _ = timed(lambda text: regex.search(text.lower()), inputs, args.repeat // 10 or 1)
+        print(f'  {size:>6} {loop_ns:>8.0f} {regex_ns:>9.0f} '
+              f'{"regex" if regex_ns < loop_ns else "loop":>7}')
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of steps 1–3 vs backfill size
+=====================================================
+
+Writes N synthetic newsletters (see bench_mime_parse.py) to a directory of
+.eml files and runs NewsletterDigestApp over it through LocalMailSource,
+with a temporary database and Claude restricted to its (empty) response
+cache, so nothing leaves the machine.  Reports the tracemalloc peak of the
+whole run next to the peak of simply materialising every email as a list
+(what steps 1–2 used to hold).  The list column grows linearly with N;
+the pipeline's peak should stay roughly flat (tracemalloc makes it slow).
+
+    python benchmarks/bench_pipeline_memory.py
+    python benchmarks/bench_pipeline_memory.py --sizes 100 400 --html-kb 120
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import config
+from bench_mime_parse import make_mime
+from src.claude import api_helpers
+from src.main import NewsletterDigestApp
+from src.sources import LocalMailSource
+
+
+def write_corpus(root: Path, count: int, html_kb: int) -> Path:
+    eml_dir = root / f'eml-{count}'
+    eml_dir.mkdir()
+    for i in range(count):
+        msg = make_mime(i, html_kb)
+        msg['Message-ID'] = f'<bench-{count}-{i}@bench.example>'
+        (eml_dir / f'{i:06d}.eml').write_bytes(msg.as_bytes())
+    return eml_dir
+
+
+def peak_of(fn) -> float:
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 80, 320])
+    parser.add_argument('--html-kb', type=int, default=80)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp())
+    config.DOCS_DIR = config.EMAIL_OUTPUT_DIR = root
+    config.CLAUDE_CACHE_DIR = root / 'claude'
+    api_helpers.OFFLINE = True
+
+    print(f'\n~{args.html_kb} KiB HTML per newsletter\n')
+    print(f'  {"emails":>7}  {"pipeline peak":>14}  {"list of emails":>15}  {"run time":>9}')
+    try:
+        for size in args.sizes:
+            eml_dir = write_corpus(root, size, args.html_kb)
+            source = LocalMailSource(eml_dir)
+
+            config.DATABASE_PATH = root / f'bench-{size}.db'
+            start = time.perf_counter()
+            pipeline_peak = peak_of(lambda: NewsletterDigestApp(source=source)
+                                    .run(hours_back=None, backfill=True))
+            elapsed = time.perf_counter() - start
+
+            list_peak = peak_of(lambda: list(source.iter_messages()))
+            print(f'  {size:>7}  {pipeline_peak:>11.1f} MB  {list_peak:>12.1f} MB  {elapsed:>7.2f} s')
+    finally:
+        shutil.rmtree(root)
+    print()
+
+
+if __name__ == '__main__':
+    main()
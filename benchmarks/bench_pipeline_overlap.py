@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential steps vs the staged pipeline
+===================================================
+
+Feeds synthetic newsletters through the real ArticleExtractor with simulated network latency on both ends: every email
+takes --fetch-ms to "download", and every Claude call takes --claude-ms.
+Compares the old order of work (fetch everything, then extract everything,
+then one Claude call per step) with DigestPipeline, where the three overlap.
+
+    python benchmarks/bench_pipeline_overlap.py
+    python benchmarks/bench_pipeline_overlap.py --messages 200 --fetch-ms 40 --claude-ms 3000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from src.pipeline import DigestPipeline
+from src.processors.extractor import ArticleExtractor
+
+
+class SlowClaude:
+    """Summarizer + categorizer stand-in with a fixed per-call latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def summarize_essays(self, essays):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [{**e, 'summary': 'summary'} for e in essays]
+
+    def categorize_articles(self, links):
+        self.calls += 1
+        time.sleep(self.latency)
+        return {i: 'Other' for i in range(len(links))}
+
+
+def make_html(index: int, stories: int) -> str:
+    blurb = ' '.join(f'word{w}' for w in range(120))
+    sections = ''.join(f'<h2><a href="https://example.com/{index}/{s}">Story {index}.{s}</a></h2>'
+                       f'<p>{blurb}</p>' for s in range(stories))
+    return f'<html><body>{sections}</body></html>'
+
+
+def slow_source(emails, latency: float):
+    for email in emails:
+        time.sleep(latency)
+        yield dict(email)
+
+
+def run_sequential(emails, fetch_latency, claude):
+    extractor = ArticleExtractor()
+    fetched = list(slow_source(emails, fetch_latency))
+    articles = []
+    for nl in fetched:
+        articles.extend(extractor.extract_from_email(nl['html'], newsletter_name='Bench Weekly'))
+    claude.summarize_essays([a for a in articles if a['article_type'] == 'essay'])
+    claude.categorize_articles([a for a in articles if a['article_type'] == 'link'])
+    return articles
+
+
+def run_pipelined(emails, fetch_latency, claude):
+    pipeline = DigestPipeline(ArticleExtractor(), claude, claude)
+    result = pipeline.run(slow_source(emails, fetch_latency))
+    return result['articles'], pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--stories', type=int, default=5)
+    parser.add_argument('--fetch-ms', type=float, default=20.0)
+    parser.add_argument('--claude-ms', type=float, default=1500.0)
+    args = parser.parse_args()
+
+    emails = [{'gmail_message_id': f'b{i}', 'headers': {},
+               'sender_email': f'news{i % 20}@bench.example',
+               'html': make_html(i, args.stories)}
+              for i in range(args.messages)]
+
+    print(f'\n{args.messages} newsletters, {args.fetch_ms:.0f} ms fetch each, '
+          f'{args.claude_ms:.0f} ms per Claude call\n')
+
+    claude = SlowClaude(args.claude_ms / 1000)
+    start = time.perf_counter()
+    articles = run_sequential(emails, args.fetch_ms / 1000, claude)
+    print(f'  sequential   {time.perf_counter() - start:7.2f} s  '
+          f'{len(articles):>5} articles  {claude.calls:>3} Claude calls')
+
+    claude = SlowClaude(args.claude_ms / 1000)
+    start = time.perf_counter()
+    articles, pipeline = run_pipelined(emails, args.fetch_ms / 1000, claude)
+    print(f'  pipelined    {time.perf_counter() - start:7.2f} s  '
+          f'{len(articles):>5} articles  {claude.calls:>3} Claude calls\n')
+    pipeline.print_stats()
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: archive query latency with and without the access-path indexes
+==========================================================================
+
+Fills a database with --articles article rows (metadata only; bodies
+don't matter for these plans) spread over three years, plus one digest
+per day.  It times the archive read paths, first with the indexes
+migration 1 adds, then again with those indexes dropped, the way every
+database was before migrations existed.
+
+    python benchmarks/bench_queries.py
+    python benchmarks/bench_queries.py --articles 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.database.models import Database
+
+DAYS = 3 * 365
+NEW_INDEXES = ('idx_articles_extraction_ts', 'idx_articles_received_ts', 'idx_articles_email_id')
+
+
+def fill(db: Database, articles: int):
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    per_email = 10
+    with db.conn:
+        db.conn.executemany('''
+            INSERT INTO processed_emails (gmail_message_id, subject, sender_email, is_newsletter)
+            VALUES (?, 'Bench', 'news@bench.example', 1)
+        ''', ((f'bench-{i}',) for i in range(articles // per_email)))
+        rows = []
+        for i in range(articles):
+            at = now - timedelta(seconds=rng.randrange(DAYS * 86400))
+            rows.append((i // per_email + 1, f'Story {i}', at.strftime('%Y-%m-%d %H:%M:%S'),
+                         at.isoformat(timespec='seconds')))
+        db.conn.executemany('''
+            INSERT INTO articles (email_id, title, extraction_timestamp, received_timestamp)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+        db.conn.executemany('''
+            INSERT INTO daily_digests (date, article_count, newsletter_count) VALUES (?, 50, 10)
+        ''', (((now - timedelta(days=d)).date().isoformat(),) for d in range(DAYS)))
+
+
+def timed(call, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def run_queries(db: Database, articles: int, repeat: int):
+    since = (datetime.utcnow() - timedelta(days=7)).isoformat(timespec='seconds')
+    email_id = articles // 20
+    queries = [
+        ('get_recent_articles(24)', lambda: db.get_recent_articles(24)),
+        ('get_archive_metadata(30)', lambda: db.get_archive_metadata(30)),
+        ('articles of one email', lambda: db.conn.execute(
+            'SELECT id, title FROM articles WHERE email_id = ?', (email_id,)).fetchall()),
+        ('received in last 7 days', lambda: db.conn.execute(
+            'SELECT COUNT(*) FROM articles WHERE received_timestamp >= ?', (since,)).fetchone()),
+    ]
+    return {label: timed(call, repeat) for label, call in queries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--articles', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / 'queries.db')
+        start = time.perf_counter()
+        fill(db, args.articles)
+        print(f'\n{args.articles} articles over {DAYS} days, filled in '
+              f'{time.perf_counter() - start:.1f} s\n')
+
+        indexed = run_queries(db, args.articles, args.repeat)
+        for index in NEW_INDEXES:
+            db.conn.execute(f'DROP INDEX {index}')
+        unindexed = run_queries(db, args.articles, args.repeat)
+        db.close()
+
+    print(f"  {'query':<26} {'no index':>10} {'indexed':>10}")
+    for label, ms in indexed.items():
+        print(f'  {label:<26} {unindexed[label]:8.2f} ms {ms:8.2f} ms')
+    print()
+
+
+if __name__ == '__main__':
+    main()
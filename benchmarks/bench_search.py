@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-text search over a multi-year archive
+======================================================
+
+Stores --years of synthetic articles (see bench_article_storage.py) and
+times Database.search_articles on a handful of queries, common and rare
+terms, with and without a `since` cut-off.
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --years 5 --issues-per-day 30
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('ANTHROPIC_API_KEY', 'sk-bench-fake')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_article_storage import WORDS, make_year
+from src.database.models import Database
+
+# Words by frequency rank: common, middling and rare, alone and combined
+COMMON, MIDDLING, RARE = WORDS[30], WORDS[400], WORDS[4000]
+QUERIES = [(COMMON, None), (MIDDLING, None), (RARE, None),
+           (f'{COMMON} {MIDDLING}', None), (f'{MIDDLING} {RARE}', None),
+           (MIDDLING, '2026-06-01')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--issues-per-day', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    articles = make_year(365 * args.years, args.issues_per_day, 6)
+    for i, article in enumerate(articles):
+        day = i // (args.issues_per_day * 6)
+        article['received_timestamp'] = f'{2024 + day // 365}-{(day % 365) // 31 + 1:02d}-{(day % 31) + 1:02d}'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / 'search.db')
+        email_id = db.store_email({'gmail_message_id': 'bench', 'subject': 'Bench',
+                                   'sender_email': 'a@b.example', 'received_timestamp': '',
+                                   'is_newsletter': True})
+        start = time.perf_counter()
+        db.store_articles_bulk([(a, email_id) for a in articles])
+        print(f'\n{len(articles)} articles over {args.years} years, stored and indexed '
+              f'in {time.perf_counter() - start:.1f} s\n')
+
+        for query, since in QUERIES:
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                hits = db.search_articles(query, since=since, limit=20)
+                times.append(time.perf_counter() - start)
+            label = f'"{query}"' + (f' since {since}' if since else '')
+            print(f'  {label:<36} {len(hits):>3} hits  median {statistics.median(times) * 1000:7.2f} ms  '
+                  f'max {max(times) * 1000:7.2f} ms')
+        db.close()
+    print()
+
+
+if __name__ == '__main__':
+    main()
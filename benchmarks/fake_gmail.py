@@ -0,0 +1,200 @@
+"""
+Local fake Gmail endpoint for benchmarks.
+
+Serves just enough of the Gmail v1 REST surface for GmailClient:
+
+  GET  /gmail/v1/users/me/messages          – paginated messages.list
+  GET  /gmail/v1/users/me/messages/<id>     – messages.get (format=full)
+  POST /batch                               – multipart/mixed HTTP batch
+
+Every HTTP request sleeps for `latency` seconds before answering, which
+stands in for the network round trip to Google.  With `max_concurrent`
+set, REST GETs beyond that many in flight get a 429, like Gmail's
+concurrent-request limit.
+
+make_service() returns a googleapiclient service whose discovery document
+points at the fake server, so the real request/batch machinery is
+exercised end to end.
+"""
+import base64
+import json
+import re
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+MESSAGE_PATH = re.compile(r'^/gmail/v1/users/me/messages/([^/?]+)$')
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def make_message(index: int) -> dict:
+    """A format='full' message resource shaped like a typical newsletter."""
+    html = ('<html><body>'
+            + ''.join(f'<h2><a href="https://example.com/story/{index}/{n}">Story {n}</a></h2>'
+                      f'<p>{"Blurb text for a story in the fake newsletter. " * 20}</p>'
+                      for n in range(8))
+            + '<a href="https://example.com/unsubscribe">Unsubscribe</a></body></html>')
+    return {
+        'id': f'msg{index:06d}',
+        'threadId': f'thr{index:06d}',
+        'payload': {
+            'mimeType': 'multipart/alternative',
+            'headers': [
+                {'name': 'From', 'value': f'Fake Weekly {index % 40} <news{index % 40}@fake.substack.com>'},
+                {'name': 'Subject', 'value': f'Fake Weekly #{index}'},
+                {'name': 'Date', 'value': 'Mon, 02 Feb 2026 08:00:00 +0000'},
+                {'name': 'List-Unsubscribe', 'value': '<https://example.com/unsubscribe>'},
+            ],
+            'parts': [
+                {'mimeType': 'text/plain', 'body': {'data': _b64('Plain text body. ' * 200)}},
+                {'mimeType': 'text/html', 'body': {'data': _b64(html)}},
+            ],
+        },
+    }
+
+
+class FakeGmail:
+    def __init__(self, message_count: int = 500, latency: float = 0.02,
+                 max_concurrent: int = 0):
+        self.messages = {m['id']: m for m in map(make_message, range(message_count))}
+        self.ids = list(self.messages)
+        self.latency = latency
+        self.max_concurrent = max_concurrent
+        self.http_requests = 0
+        self.throttled = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/'
+
+    def start(self) -> 'FakeGmail':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ------------------------------------------------------------------
+    # Request routing
+    # ------------------------------------------------------------------
+    def _count_request(self):
+        with self._lock:
+            self.http_requests += 1
+
+    def _enter(self) -> bool:
+        """Track an in-flight GET; False if it should be throttled."""
+        with self._lock:
+            if self.max_concurrent and self._in_flight >= self.max_concurrent:
+                self.throttled += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def _leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def handle_get(self, path_and_query: str):
+        """Return (status, JSON body) for a single REST GET."""
+        url = urlparse(path_and_query)
+        params = parse_qs(url.query)
+
+        if url.path == '/gmail/v1/users/me/messages':
+            page_size = int(params.get('maxResults', ['100'])[0])
+            start = int(params.get('pageToken', ['0'])[0])
+            page = self.ids[start:start + page_size]
+            body = {'messages': [{'id': i, 'threadId': self.messages[i]['threadId']} for i in page],
+                    'resultSizeEstimate': len(self.ids)}
+            if start + page_size < len(self.ids):
+                body['nextPageToken'] = str(start + page_size)
+            return 200, body
+
+        match = MESSAGE_PATH.match(url.path)
+        if match and match.group(1) in self.messages:
+            return 200, self.messages[match.group(1)]
+
+        return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+
+    def handle_batch(self, content_type: str, payload: bytes):
+        """Answer every inner request of a multipart/mixed batch."""
+        envelope = BytesParser().parsebytes(
+            f'Content-Type: {content_type}\r\n\r\n'.encode('ascii') + payload)
+        boundary = 'batch_fake_gmail_boundary'
+        chunks = []
+
+        for part in envelope.get_payload():
+            request_line = part.get_payload().lstrip().split('\n', 1)[0]
+            _, path, _ = request_line.split(' ', 2)
+            status, body = self.handle_get(path)
+            content_id = part['Content-ID'][1:-1]
+            chunks.append(
+                f'--{boundary}\r\n'
+                f'Content-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n\r\n'
+                f'HTTP/1.1 {status} {"OK" if status == 200 else "Not Found"}\r\n'
+                f'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{json.dumps(body)}\r\n'
+            )
+        chunks.append(f'--{boundary}--\r\n')
+        return f'multipart/mixed; boundary={boundary}', ''.join(chunks).encode('utf-8')
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, content_type: str, body: bytes):
+                time.sleep(fake.latency)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                fake._count_request()
+                if not fake._enter():
+                    body = {'error': {'code': 429, 'message': 'Too many concurrent requests for user'}}
+                    self._reply(429, 'application/json', json.dumps(body).encode('utf-8'))
+                    return
+                try:
+                    status, body = fake.handle_get(self.path)
+                    self._reply(status, 'application/json', json.dumps(body).encode('utf-8'))
+                finally:
+                    fake._leave()
+
+            def do_POST(self):
+                fake._count_request()
+                length = int(self.headers.get('Content-Length', 0))
+                content_type, body = fake.handle_batch(self.headers['Content-Type'],
+                                                       self.rfile.read(length))
+                self._reply(200, content_type, body)
+
+        return Handler
+
+
+def make_service(root_url: str):
+    """Build a real googleapiclient Gmail service pointed at root_url."""
+    import httplib2
+    from googleapiclient.discovery import build_from_document
+    from googleapiclient.discovery_cache import get_static_doc
+
+    document = json.loads(get_static_doc('gmail', 'v1'))
+    document['rootUrl'] = root_url
+    document['baseUrl'] = root_url
+    return build_from_document(document, http=httplib2.Http())
@@ -14,6 +14,11 @@ TEMPLATES_DIR = BASE_DIR / "src" / "templates"
 DOCS_DIR = BASE_DIR / "docs"
 EMAIL_OUTPUT_DIR = BASE_DIR / "email_output"
 DATABASE_PATH = BASE_DIR / "newsletter_digest.db"
+CACHE_DIR = BASE_DIR / "cache"
+MESSAGE_CACHE_DIR = CACHE_DIR / "messages"
+CLAUDE_CACHE_DIR = CACHE_DIR / "claude"
+REPLAY_MANIFEST_DIR = CACHE_DIR / "runs"
+URL_CACHE_PATH = CACHE_DIR / "url_verdicts.json"
 
 # Ensure directories exist
 DOCS_DIR.mkdir(exist_ok=True)
@@ -36,9 +41,55 @@ GMAIL_TOKEN_PATH = os.getenv("GMAIL_TOKEN_PATH", "token.json")
 GMAIL_SCOPES = ['https://www.googleapis.com/auth/gmail.readonly',
                 'https://www.googleapis.com/auth/gmail.send']
 
+# Gmail fetch tuning
+GMAIL_LIST_PAGE_SIZE = 500   # messages.list maxResults (Gmail's own cap)
+GMAIL_BATCH_SIZE = 50        # messages.get calls per HTTP batch (Gmail allows up to 100; 1 = serial)
+GMAIL_INCREMENTAL_SYNC = True  # daily runs list via history API from the saved historyId
+GMAIL_HEADER_FIRST = True    # fetch headers first; download bodies only for likely newsletters
+GMAIL_FETCH_MODE = 'batch'   # 'batch' | 'concurrent' | 'serial' ('offline' = message cache only)
+GMAIL_FETCH_WORKERS = 8      # max in-flight messages.get calls in 'concurrent' mode
+GMAIL_QUOTA_UNITS_PER_SEC = 250  # Gmail per-user quota; None disables pacing
+GMAIL_BODY_FORMAT = 'full'   # 'full' (JSON payload tree) | 'raw' (RFC 822, parsed once with email.parser)
+
+# Local message cache – fetched messages are kept (compressed) so reruns,
+# backfills and replays don't spend Gmail quota on them again
+MESSAGE_CACHE_ENABLED = True
+MESSAGE_CACHE_MAX_MB = 1024
+
+# SQLite tuning (src/database/connection.py) – every connection runs in WAL
+# mode with synchronous=NORMAL
+DB_CACHE_MB = 64             # page cache per connection
+DB_MMAP_MB = 256             # memory-mapped I/O window per connection
+DB_BUSY_TIMEOUT_SECS = 30    # how long a writer waits for another's lock
+DB_BLOOM_FILTER = True       # keep known message IDs in an in-memory Bloom filter
+DB_BLOOM_MIN_CAPACITY = 100_000
+DB_BLOOM_ERROR_RATE = 0.01
+DB_MIGRATION_CHUNK_ROWS = 5000   # rows per transaction when a migration rewrites a table
+
+# Claude response cache – identical prompts reuse the stored response, and
+# `--replay` rebuilds a past digest from these plus the message cache
+CLAUDE_CACHE_ENABLED = True
+
 # Digest settings
 DEFAULT_LOOKBACK_HOURS = 24
 MIN_WORD_COUNT = 100  # Minimum words to consider an article
+HTML_PARSER = None    # 'lexbor' | 'lxml' | 'html.parser'; None = fastest installed
+
+# URL verdict cache (src/processors/urlcache.py) – noise verdict and base
+# score per link URL; footer and sponsor links recur in every issue
+URL_CACHE_ENABLED = True          # keep the verdicts between runs
+URL_CACHE_MAX_ENTRIES = 50_000
+
+# Staged pipeline (src/pipeline.py) – fetch, gate, extract and Claude calls
+# run concurrently, connected by bounded queues
+PIPELINE_QUEUE_SIZE = 32       # max items waiting between two stages
+PIPELINE_EXTRACT_WORKERS = 4   # threads running ArticleExtractor
+PIPELINE_EXTRACT_PROCESSES = 0  # >0: run ArticleExtractor in this many processes instead
+PIPELINE_EXTRACT_CHUNK = 4     # newsletters per process-pool task
+PIPELINE_CLAUDE_WORKERS = 2    # Claude batches in flight at once
+ESSAY_BATCH_SIZE = 10          # essays per summarisation call
+LINK_BATCH_SIZE = 50           # link articles per categorisation call
+DB_WRITE_BATCH_SIZE = 500      # articles stored per database transaction
 
 # ---------------------------------------------------------------------------
 # Essay newsletters – these are primarily long-form original writing.
@@ -4,28 +4,83 @@ Shared API helpers for all Claude modules.
 call_claude()  –  drop-in wrapper around client.messages.create()
                   that retries automatically on 429 Rate Limit errors
                   with exponential back-off + jitter.
+
+Responses are cached on disk under config.CLAUDE_CACHE_DIR, keyed by a
+hash of (model, max_tokens, messages), so an identical prompt is never
+paid for twice.  Only answers worth replaying are kept: the response must
+have finished (stop_reason 'end_turn', not cut off at max_tokens) and pass
+the caller's `valid` check.  With OFFLINE set (the `--replay` mode does this) a
+prompt that isn't cached raises ClaudeCacheMiss instead of calling the API.
 """
+import hashlib
+import json
+import os
+import sys
 import time
 import random
-from typing import Any
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
 
 from anthropic import Anthropic, RateLimitError
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import config
+
 # ── retry tuning ───────────────────────────────────────────────────
 MAX_RETRIES     = 5
 BASE_DELAY_SECS = 2     # first retry waits ~2 s; doubles each attempt
 MAX_DELAY_SECS  = 60    # hard cap — never wait longer than 60 s
 
+# Serve responses from the cache only; never touch the network
+OFFLINE = False
+
+
+class ClaudeCacheMiss(LookupError):
+    """Raised in OFFLINE mode for a prompt with no cached response"""
+
+
+class CachedResponse:
+    """Stands in for an anthropic Message: exposes .content[0].text"""
+
+    def __init__(self, text: str):
+        self.content = [SimpleNamespace(type='text', text=text)]
+        self.stop_reason = 'end_turn'
+
 
 def call_claude(client: Anthropic, *, model: str, max_tokens: int,
-                messages: list) -> Any:
+                messages: list, valid: Optional[Callable[[str], bool]] = None) -> Any:
     """
     Retry-aware wrapper around client.messages.create().
 
     Catches RateLimitError (HTTP 429), honours the Retry-After header
     when present, and otherwise uses exponential back-off with ±25 %
     jitter.  All other exceptions propagate immediately.
+
+    A cached response for the same prompt is returned without calling
+    the API at all.  `valid` is the caller's check that a response text
+    parses: a response it rejects is returned but not cached, and a cached
+    one it rejects is deleted and the prompt sent again.
     """
+    key = _cache_key(model, max_tokens, messages)
+    cached = _read_cached(key)
+    if cached is not None:
+        if valid is None or valid(cached):
+            return CachedResponse(cached)
+        _evict_cached(key)
+    if OFFLINE:
+        raise ClaudeCacheMiss(f"no cached Claude response for prompt {key[:12]}")
+
+    response = _create_with_retry(client, model=model, max_tokens=max_tokens,
+                                  messages=messages)
+    text = response.content[0].text
+    if getattr(response, 'stop_reason', None) == 'end_turn' and (valid is None or valid(text)):
+        _write_cached(key, model, text)
+    return response
+
+
+def _create_with_retry(client: Anthropic, *, model: str, max_tokens: int,
+                       messages: list) -> Any:
     for attempt in range(1, MAX_RETRIES + 1):
         try:
             return client.messages.create(
@@ -57,3 +112,39 @@ def call_claude(client: Anthropic, *, model: str, max_tokens: int,
 
     # unreachable, but satisfies type checkers
     raise RuntimeError("call_claude: exhausted retries without result or exception")
+
+
+# ── response cache ─────────────────────────────────────────────────
+def _cache_key(model: str, max_tokens: int, messages: list) -> str:
+    prompt = json.dumps([model, max_tokens, messages], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def _cache_path(key: str) -> Path:
+    return Path(config.CLAUDE_CACHE_DIR) / key[:2] / f"{key}.json"
+
+
+def _read_cached(key: str) -> Optional[str]:
+    if not config.CLAUDE_CACHE_ENABLED:
+        return None
+    try:
+        return json.loads(_cache_path(key).read_text(encoding='utf-8'))['text']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cached(key: str, model: str, text: str):
+    if not config.CLAUDE_CACHE_ENABLED:
+        return
+    path = _cache_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps({'model': model, 'text': text}), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def _evict_cached(key: str):
+    try:
+        _cache_path(key).unlink()
+    except OSError:
+        pass
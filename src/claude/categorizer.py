@@ -5,8 +5,9 @@ Topic Categorisation via Claude
 Only link-based articles come through here.  Essays are hardcoded into the
 "Essays" bin at extraction time and never reach the categorizer.
 
-All link articles are sent in a single prompt so the model can see the full
-set and make consistent choices.  The prompt includes a one-line definition
+Link articles are sent in batches (config.LINK_BATCH_SIZE per prompt, each
+batch dispatched by the pipeline as soon as it fills) so the model sees a
+large enough set to make consistent choices.  The prompt includes a one-line definition
 for each category (from config.CATEGORY_DEFINITIONS) so Claude has crisp
 guardrails — the definitions are what keeps the buckets MECE at runtime.
 
@@ -14,11 +15,12 @@ Returns a plain dict: {article_index: category_string}.
 Any index the model omits (or assigns an unrecognised category) falls back
 to "Other".
 """
+import hashlib
 import json
 import re
 import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from anthropic import Anthropic
 
@@ -28,11 +30,26 @@ from src.claude.api_helpers import call_claude
 
 SNIPPET_CHARS = 300
 
+MODEL = "claude-sonnet-4-5-20250929"
+
+# Bump whenever the prompt or its parsing changes, so categories stored by
+# an older version are not reused (see DigestPipeline)
+PROMPT_VERSION = 1
+
 
 class TopicCategorizer:
+    model = MODEL
+
     def __init__(self, api_key: str = None):
         self.client = Anthropic(api_key=api_key or config.ANTHROPIC_API_KEY)
 
+    @property
+    def prompt_version(self) -> str:
+        """PROMPT_VERSION plus a digest of the categories, which are part of the prompt"""
+        categories = json.dumps([[cat, config.CATEGORY_DEFINITIONS[cat]]
+                                 for cat in config.CATEGORIZABLE_CATEGORIES])
+        return f"{PROMPT_VERSION}-{hashlib.sha256(categories.encode('utf-8')).hexdigest()[:12]}"
+
     # ------------------------------------------------------------------
     # Public
     # ------------------------------------------------------------------
@@ -54,9 +71,10 @@ class TopicCategorizer:
 
         response = call_claude(
             self.client,
-            model="claude-sonnet-4-5-20250929",
+            model=self.model,
             max_tokens=1024,
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            valid=lambda text: self._parse_json(text) is not None,
         )
 
         raw_map = self._parse_response(response.content[0].text)
@@ -103,16 +121,24 @@ class TopicCategorizer:
     # Parse
     # ------------------------------------------------------------------
     @staticmethod
-    def _parse_response(raw: str) -> Dict[int, str]:
+    def _parse_json(raw: str) -> Optional[Dict[str, Any]]:
+        """The JSON object of index → category, or None unless raw is one"""
         text = raw.strip()
         text = re.sub(r'^```(json)?\s*', '', text)
         text = re.sub(r'\s*```$', '', text)
 
-        allowed = set(config.CATEGORIZABLE_CATEGORIES) | {'Other'}
-
         try:
             data = json.loads(text)
         except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    @classmethod
+    def _parse_response(cls, raw: str) -> Dict[int, str]:
+        allowed = set(config.CATEGORIZABLE_CATEGORIES) | {'Other'}
+
+        data = cls._parse_json(raw)
+        if data is None:
             print("\u26a0 Categorizer: failed to parse JSON. All articles \u2192 'Other'.")
             return {}
 
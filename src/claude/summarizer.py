@@ -9,14 +9,14 @@ author.  That blurb is surfaced directly in the digest — no Claude call.
 
 Essays (detected by the extractor and tagged article_type == 'essay') need
 a 2-3 sentence summary because their full text is too long to drop into the
-digest inline.  All essays are batched into a single Claude call to stay
-well under rate limits.
+digest inline.  Essays are batched (config.ESSAY_BATCH_SIZE per Claude
+call) to stay well under rate limits.
 """
 import json
 import re
 import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from anthropic import Anthropic
 
@@ -28,8 +28,20 @@ from src.claude.api_helpers import call_claude
 # Enough to get the argument; not so much that we burn tokens on boilerplate.
 CONTENT_CHARS = 3000
 
+MODEL = "claude-sonnet-4-5-20250929"
+
+# Bump whenever the prompt or its parsing changes, so summaries stored by
+# an older version are not reused (see DigestPipeline)
+PROMPT_VERSION = 1
+
+# Placeholder for an essay Claude gave no usable summary for
+UNAVAILABLE = "Summary unavailable."
+
 
 class DigestSummarizer:
+    model = MODEL
+    prompt_version = str(PROMPT_VERSION)
+
     def __init__(self, api_key: str = None):
         self.client = Anthropic(api_key=api_key or config.ANTHROPIC_API_KEY)
 
@@ -47,7 +59,7 @@ class DigestSummarizer:
         Returns:
             The same list of dicts, each with a 'summary' key added.
             If the batch parse fails for any reason every essay gets
-            "Summary unavailable." rather than crashing the pipeline.
+            UNAVAILABLE rather than crashing the pipeline.
         """
         if not essays:
             return []
@@ -55,9 +67,10 @@ class DigestSummarizer:
         prompt   = self._build_prompt(essays)
         response = call_claude(
             self.client,
-            model="claude-sonnet-4-5-20250929",
+            model=self.model,
             max_tokens=1024,
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            valid=lambda text: self._parse_json(text, len(essays)) is not None,
         )
 
         summaries = self._parse_response(response.content[0].text, len(essays))
@@ -99,21 +112,29 @@ class DigestSummarizer:
     # Parse
     # ==================================================================
     @staticmethod
-    def _parse_response(raw: str, expected_count: int) -> List[str]:
-        """
-        Parse the JSON array.  Falls back to line-splitting if JSON fails
-        (Claude occasionally returns numbered paragraphs instead).
-        """
+    def _parse_json(raw: str, expected_count: int) -> Optional[List[str]]:
+        """The JSON array of summaries, or None unless raw is one of the right length"""
         text = raw.strip()
         text = re.sub(r'^```(json)?\s*', '', text)
         text = re.sub(r'\s*```$', '', text)
 
         try:
             data = json.loads(text)
-            if isinstance(data, list) and len(data) == expected_count:
-                return [str(s).strip() for s in data]
         except (json.JSONDecodeError, ValueError):
-            pass
+            return None
+        if isinstance(data, list) and len(data) == expected_count:
+            return [str(s).strip() for s in data]
+        return None
+
+    @classmethod
+    def _parse_response(cls, raw: str, expected_count: int) -> List[str]:
+        """
+        Parse the JSON array.  Falls back to line-splitting if JSON fails
+        (Claude occasionally returns numbered paragraphs instead).
+        """
+        summaries = cls._parse_json(raw, expected_count)
+        if summaries is not None:
+            return summaries
 
         # Fallback: numbered lines
         print("  ⚠ Summarizer: batch JSON parse failed, trying line-split fallback.")
@@ -126,5 +147,5 @@ class DigestSummarizer:
 
         # Pad or trim to match
         while len(cleaned) < expected_count:
-            cleaned.append("Summary unavailable.")
+            cleaned.append(UNAVAILABLE)
         return cleaned[:expected_count]
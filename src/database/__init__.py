@@ -1,3 +1,7 @@
 from .models import Database
+from .connection import ConnectionManager, connection_manager
+from .bloom import BloomFilter
+from .migrations import MIGRATIONS, SCHEMA_VERSION, migrate
 
-__all__ = ['Database']
+__all__ = ['Database', 'ConnectionManager', 'connection_manager', 'BloomFilter',
+           'MIGRATIONS', 'SCHEMA_VERSION', 'migrate']
@@ -0,0 +1,36 @@
+"""
+Article body codec
+Bodies live once per SHA-256 in the `blobs` table, compressed with zstd
+when the zstandard package is installed and zlib otherwise.  The codec is
+stored alongside each blob, so a database written with one stays readable.
+"""
+import hashlib
+import zlib
+from typing import Tuple
+
+try:
+    import zstandard
+except ImportError:          # optional – zlib is always available
+    zstandard = None
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress(text: str) -> Tuple[str, bytes]:
+    """(codec, compressed bytes) for an article body"""
+    data = text.encode('utf-8')
+    if zstandard:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 6)
+
+
+def decompress(codec: str, data: bytes) -> str:
+    if codec == 'zstd':
+        if not zstandard:
+            raise ValueError('blob is zstd-compressed; install the zstandard package')
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    if codec == 'zlib':
+        return zlib.decompress(data).decode('utf-8')
+    raise ValueError(f'unknown blob codec {codec!r}')
@@ -0,0 +1,53 @@
+"""
+Bloom filter of known message IDs
+==================================
+
+A fixed-size bit array answering "have I seen this ID?" in memory.  A
+"no" is always right; a "yes" is wrong about error_rate of the time, so
+Database.filter_unprocessed only asks SQLite about the IDs it says "yes"
+to.  About 1.2 bytes per ID at a 1% error rate.
+"""
+import hashlib
+import math
+import threading
+from typing import Iterable, List
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        Args:
+            capacity:   Number of items the error rate is sized for.  Past
+                        that the filter still works, it just errs more often.
+            error_rate: Target false-positive rate at capacity.
+        """
+        self.capacity = max(1, capacity)
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()   # |= on a shared byte is read-modify-write
+
+    def add(self, item: str):
+        positions = self._positions(item)
+        with self._lock:
+            for pos in positions:
+                self._bits[pos >> 3] |= 1 << (pos & 7)
+            self.count += 1
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _positions(self, item: str) -> List[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
@@ -0,0 +1,164 @@
+"""
+SQLite connection manager
+==========================
+
+One ConnectionManager per database file per process.  It hands each
+thread its own connection, shared by every Database object that thread
+opens, and tunes each connection the same way:
+
+  journal_mode=WAL      readers never block the writer or each other, so
+                        the fetch, gate and routing threads don't stall
+                        on "database is locked"
+  synchronous=NORMAL    fsync at checkpoints, not on every commit (safe
+                        under WAL; a power cut can lose the last commits
+                        but never corrupts the file)
+  cache_size / mmap     DB_CACHE_MB of page cache and DB_MMAP_MB of
+                        memory-mapped I/O per connection
+  busy timeout          a writer waits DB_BUSY_TIMEOUT_SECS for the lock
+
+Schema creation runs once per file per process, not on every Database().
+Every statement is tallied per thread (statement_counts()), which is how
+the pipeline reports the reads and writes each stage issued.
+
+The manager also holds the process's Bloom filter of processed message
+IDs (see bloom.py), loaded from the file the first time it is needed.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from .bloom import BloomFilter
+
+_managers: Dict[str, 'ConnectionManager'] = {}
+_managers_lock = threading.Lock()
+
+_statements = threading.local()   # per-thread read / write tallies
+_WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE', 'REPLAC')
+
+
+def statement_counts() -> Tuple[int, int]:
+    """(reads, writes) the calling thread has issued so far, on any database"""
+    return getattr(_statements, 'reads', 0), getattr(_statements, 'writes', 0)
+
+
+@contextmanager
+def recording_statements(conn: sqlite3.Connection) -> Iterator[List[str]]:
+    """Collect the SQL conn runs inside the block (still tallied as usual)"""
+    statements: List[str] = []
+
+    def record(sql: str):
+        statements.append(sql)
+        _tally_statement(sql)
+
+    conn.set_trace_callback(record)
+    try:
+        yield statements
+    finally:
+        conn.set_trace_callback(_tally_statement)
+
+
+def _tally_statement(sql: str):
+    verb = sql.lstrip()[:6].upper()
+    if verb == 'SELECT':
+        _statements.reads = getattr(_statements, 'reads', 0) + 1
+    elif verb in _WRITE_VERBS:
+        _statements.writes = getattr(_statements, 'writes', 0) + 1
+
+
+def connection_manager(db_path: Path) -> 'ConnectionManager':
+    """The process-wide manager for db_path"""
+    key = str(db_path) if str(db_path) == ':memory:' else str(Path(db_path).resolve())
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = ConnectionManager(db_path)
+        return _managers[key]
+
+
+class ConnectionManager:
+    """Per-thread, reference-counted connections to one database file"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._local = threading.local()
+        self._known_ids: Optional[BloomFilter] = None
+        self._known_ids_lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use.  Pair with release()."""
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = self._open()
+            self._local.users = 0
+        self._local.users += 1
+        return self._local.conn
+
+    def release(self):
+        """Closes this thread's connection once its last user is done"""
+        if getattr(self._local, 'conn', None) is None:
+            return
+        self._local.users -= 1
+        if self._local.users <= 0:
+            self._local.conn.close()
+            self._local.conn = None
+
+    def ensure_schema(self, create: Callable[[], None]):
+        """Run create() the first time any thread asks, and never again"""
+        with self._schema_lock:
+            if not self.schema_ready:
+                create()
+                self.schema_ready = True
+
+    def known_ids(self, conn: sqlite3.Connection) -> Optional[BloomFilter]:
+        """
+        Bloom filter of every processed message ID, built on first use
+        from conn.  None when DB_BLOOM_FILTER is off.
+        """
+        if not config.DB_BLOOM_FILTER:
+            return None
+        with self._known_ids_lock:
+            if self._known_ids is None:
+                count = conn.execute('SELECT COUNT(*) FROM processed_emails').fetchone()[0]
+                known = BloomFilter(max(2 * count, config.DB_BLOOM_MIN_CAPACITY),
+                                    config.DB_BLOOM_ERROR_RATE)
+                known.update(row[0] for row in
+                             conn.execute('SELECT gmail_message_id FROM processed_emails'))
+                self._known_ids = known
+            return self._known_ids
+
+    def remember_ids(self, gmail_message_ids: Iterable[str]):
+        """Add newly stored IDs to the filter, if it has been built"""
+        with self._known_ids_lock:
+            if self._known_ids is None:
+                return
+            self._known_ids.update(gmail_message_ids)
+            if len(self._known_ids) > self._known_ids.capacity:
+                # Over its sizing; rebuild (bigger) on next use
+                self._known_ids = None
+
+    def _open(self) -> sqlite3.Connection:
+        if self._is_new_file():
+            # Deleted or replaced since the schema was last created
+            with self._schema_lock:
+                self.schema_ready = False
+            with self._known_ids_lock:
+                self._known_ids = None
+
+        conn = sqlite3.connect(str(self.db_path), timeout=config.DB_BUSY_TIMEOUT_SECS)
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA cache_size = -{config.DB_CACHE_MB * 1024}')
+        conn.execute(f'PRAGMA mmap_size = {config.DB_MMAP_MB * 1024 * 1024}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.set_trace_callback(_tally_statement)
+        return conn
+
+    def _is_new_file(self) -> bool:
+        if str(self.db_path) == ':memory:':
+            return True
+        path = Path(self.db_path)
+        return not path.exists() or path.stat().st_size == 0
@@ -0,0 +1,246 @@
+"""
+Schema migrations
+==================
+
+create_tables() describes the original schema with CREATE ... IF NOT
+EXISTS, which can add a table but never change one that is already there.
+Everything since goes here as an ordered, numbered step.  The database
+records the last step it has run in `PRAGMA user_version`; migrate() runs
+the steps after that one and bumps the version as each one completes.
+
+Two kinds of step:
+
+  transactional   apply() runs inside a single transaction together with
+                  the version bump – all or nothing.  For DDL: new tables,
+                  ADD COLUMN (instant in SQLite), and index builds.
+  chunked         apply() commits as it goes, via rewrite_in_chunks(), so
+                  a rewrite of a multi-GB table holds the write lock for
+                  one chunk at a time and other connections get a turn in
+                  between.  It must be safe to re-run from the top: a step
+                  interrupted half way is simply run again on next open.
+
+SQLite has no online index build; CREATE INDEX holds the write lock until
+it is done (readers carry on under WAL).  Give each large index its own
+step so the lock is held for that one build, not for a whole batch.
+
+To change the schema, append a Migration with the next version number.
+Never edit or reorder one that has shipped.
+"""
+import sqlite3
+from typing import Callable, List, NamedTuple, Optional
+
+import config
+from .blobs import compress, content_hash
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+    chunked: bool = False
+
+
+# ------------------------------------------------------------------
+# Helpers for migration steps
+# ------------------------------------------------------------------
+def add_column(conn: sqlite3.Connection, table: str, column: str, declaration: str):
+    """ALTER TABLE ... ADD COLUMN, skipped if the column is already there"""
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    if column not in existing:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+
+
+def rewrite_in_chunks(conn: sqlite3.Connection, table: str, where: str, columns: str,
+                      rewrite: Callable[[List[sqlite3.Row]], None],
+                      chunk_rows: Optional[int] = None) -> int:
+    """
+    Call rewrite(rows) on every row of `table` matching `where`, in id
+    order, `chunk_rows` (default DB_MIGRATION_CHUNK_ROWS) at a time and
+    one transaction per chunk.  Rows carry `id` plus `columns`.
+
+    Returns the number of rows rewritten.
+    """
+    chunk_rows = chunk_rows or config.DB_MIGRATION_CHUNK_ROWS
+    last_id = 0
+    done = 0
+    while True:
+        rows = conn.execute(f'''
+            SELECT id, {columns} FROM {table}
+            WHERE id > ? AND ({where})
+            ORDER BY id LIMIT ?
+        ''', (last_id, chunk_rows)).fetchall()
+        if not rows:
+            return done
+        with conn:
+            rewrite(rows)
+        last_id = rows[-1]['id']
+        done += len(rows)
+        print(f"    … {done} {table} rows rewritten")
+
+
+# ------------------------------------------------------------------
+# Steps
+# ------------------------------------------------------------------
+def _add_access_path_indexes(conn: sqlite3.Connection):
+    # get_recent_articles: range on extraction_timestamp, newest first
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_extraction_ts
+        ON articles(extraction_timestamp)
+    ''')
+    # search_articles(since=...) and anything else by received date
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_received_ts
+        ON articles(received_timestamp)
+    ''')
+    # articles of an email (join key from processed_emails)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_email_id
+        ON articles(email_id)
+    ''')
+
+
+def _add_article_type_and_blurb(conn: sqlite3.Connection):
+    add_column(conn, 'articles', 'article_type', 'TEXT')
+    add_column(conn, 'articles', 'blurb', 'TEXT')
+
+
+def _move_inline_bodies_to_blobs(conn: sqlite3.Connection):
+    """Rows stored before bodies moved to blobs: same layout as new rows"""
+    def move(rows: List[sqlite3.Row]):
+        blobs = {}
+        for row in rows:
+            body = row['content']
+            blobs[content_hash(body)] = body
+        conn.executemany('''
+            INSERT INTO blobs (hash, codec, data, size) VALUES (?, ?, ?, ?)
+            ON CONFLICT(hash) DO NOTHING
+        ''', [(body_hash, *compress(body), len(body.encode('utf-8')))
+              for body_hash, body in blobs.items()])
+        conn.executemany('''
+            UPDATE articles SET content_hash = ?, content = NULL, content_snippet = NULL
+            WHERE id = ?
+        ''', [(content_hash(row['content']), row['id']) for row in rows])
+
+    rewrite_in_chunks(conn, 'articles', 'content IS NOT NULL', 'content', move)
+
+
+def _add_article_enrichments(conn: sqlite3.Connection):
+    # Claude's output per article body (summary, category), so reruns and
+    # multi-day digests reuse it.  Keyed by model and prompt version too:
+    # changing either is a cache miss, not a stale answer.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS article_enrichments (
+            content_hash TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            model TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (content_hash, kind, model, prompt_version)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _key_newsletters_by_sender(conn: sqlite3.Connection):
+    # The original registry was UNIQUE on sender_domain, which folds every
+    # Substack (Beehiiv, …) newsletter into one row, and nothing ever wrote
+    # to it.  Rebuild it keyed by sender address and fill it from the
+    # newsletters already in processed_emails; from here on
+    # store_emails_bulk keeps it current.
+    conn.execute('DROP TABLE IF EXISTS newsletters')
+    conn.execute('''
+        CREATE TABLE newsletters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_email TEXT UNIQUE NOT NULL,
+            sender_domain TEXT,
+            sender_name TEXT,
+            category TEXT,
+            auto_detected BOOLEAN,
+            first_seen TEXT,
+            last_seen TEXT,
+            total_received INTEGER DEFAULT 0,
+            user_whitelisted BOOLEAN DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_newsletters_sender_domain
+        ON newsletters(sender_domain)
+    ''')
+    conn.execute('''
+        INSERT INTO newsletters
+        (sender_email, sender_domain, sender_name, auto_detected,
+         first_seen, last_seen, total_received)
+        SELECT lower(sender_email),
+               lower(substr(sender_email, instr(sender_email, '@') + 1)),
+               max(sender_name), 1,
+               min(received_timestamp), max(received_timestamp), COUNT(*)
+        FROM processed_emails
+        WHERE is_newsletter AND sender_email IS NOT NULL
+        GROUP BY lower(sender_email)
+    ''')
+
+
+def _key_enrichments_by_article(conn: sqlite3.Connection):
+    # Link articles cut from one block share their body text, so a body
+    # hash handed one link's summary or category to the other.  Key by a
+    # hash of URL, title and body instead.  The old rows can't be re-keyed
+    # (the table never held the URL) and may be wrong, so they go.
+    conn.execute('DROP TABLE IF EXISTS article_enrichments')
+    conn.execute('''
+        CREATE TABLE article_enrichments (
+            article_key TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            model TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (article_key, kind, model, prompt_version)
+        ) WITHOUT ROWID
+    ''')
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'indexes for time-window and archive queries', _add_access_path_indexes),
+    Migration(2, 'articles.article_type and articles.blurb', _add_article_type_and_blurb),
+    Migration(3, 'move inline article bodies into blobs', _move_inline_bodies_to_blobs,
+              chunked=True),
+    Migration(4, 'article_enrichments: stored summaries and categories', _add_article_enrichments),
+    Migration(5, 'newsletters registry keyed by sender address', _key_newsletters_by_sender),
+    Migration(6, 'article_enrichments keyed by article, not body', _key_enrichments_by_article),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> List[Migration]:
+    """Run every migration newer than the database; returns the ones applied"""
+    pending = [m for m in MIGRATIONS if m.version > schema_version(conn)]
+    # A database create_tables() has only just made needs no commentary
+    announce = conn.execute('SELECT EXISTS (SELECT 1 FROM processed_emails)').fetchone()[0]
+    for migration in pending:
+        if announce:
+            print(f"  Migrating database to v{migration.version}: {migration.description} …")
+        if migration.chunked:
+            # Commits as it goes; re-run from the top if interrupted
+            migration.apply(conn)
+            _set_version(conn, migration.version)
+            conn.commit()
+            continue
+        conn.execute('BEGIN')
+        try:
+            migration.apply(conn)
+            _set_version(conn, migration.version)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return pending
+
+
+def _set_version(conn: sqlite3.Connection, version: int):
+    # PRAGMA takes no bound parameters; version is always an int
+    conn.execute(f'PRAGMA user_version = {int(version)}')
@@ -4,19 +4,69 @@ Handles all data persistence with comprehensive metadata tracking
 """
 import sqlite3
 from datetime import datetime
-import hashlib
 import json
+import re
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Sequence, Iterator, Iterable
 import config
+from .blobs import compress, content_hash, decompress
+from .connection import connection_manager, recording_statements
+from .migrations import migrate
+
+# Rows per multi-row INSERT.  Keeps the bound parameters (rows × columns)
+# under SQLite's 32766 limit.
+BULK_INSERT_ROWS = 500
+
+# IDs per `IN (...)` lookup
+BULK_QUERY_IDS = 1000
+
+# Characters of an article body shown as its preview snippet
+SNIPPET_CHARS = 500
+
+# search_articles: bm25 weights for the title, blurb, content and
+# newsletter_name columns of articles_fts, and words per result snippet
+SEARCH_WEIGHTS = (10.0, 4.0, 1.0, 2.0)
+SEARCH_SNIPPET_WORDS = 24
+
+
+def _chunks(items: Sequence, size: int) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _placeholders(rows: int, columns: int) -> str:
+    row = '(' + ', '.join('?' * columns) + ')'
+    return ', '.join([row] * rows)
+
+
+def _snippet(text: str, terms: set, words: int = SEARCH_SNIPPET_WORDS) -> str:
+    """The `words`-word window of text with the most query terms, terms bracketed"""
+    tokens = text.split()
+    if not tokens:
+        return ''
+    hits = [re.sub(r'\W+', '', token.lower()) in terms for token in tokens]
+    best = 0
+    best_hits = window_hits = sum(hits[:words])
+    for start in range(1, len(tokens) - words + 1):
+        window_hits += hits[start + words - 1] - hits[start - 1]
+        if window_hits > best_hits:
+            best, best_hits = start, window_hits
+    shown = [f'[{token}]' if hit else token
+             for token, hit in zip(tokens[best:best + words], hits[best:best + words])]
+    return ('… ' if best else '') + ' '.join(shown) + (' …' if best + words < len(tokens) else '')
 
 
 class Database:
-    def __init__(self, db_path: Path = config.DATABASE_PATH):
-        self.db_path = db_path
-        self.conn = sqlite3.connect(str(db_path))
-        self.conn.row_factory = sqlite3.Row  # Enable dict-like access
-        self.create_tables()
+    def __init__(self, db_path: Optional[Path] = None):
+        """
+        Opening a Database is cheap: every Database on the same thread
+        shares one tuned connection (see connection.py), and the schema is
+        only created the first time the file is opened in this process.
+        """
+        self.db_path = db_path or config.DATABASE_PATH
+        self._manager = connection_manager(self.db_path)
+        self.conn = self._manager.acquire()
+        self._manager.ensure_schema(self.create_tables)
     
     def create_tables(self):
         """Create all database tables with comprehensive metadata"""
@@ -39,7 +89,7 @@ class Database:
             )
         ''')
         
-        # Newsletter registry
+        # Newsletter registry (keyed by sender address since migration 5)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS newsletters (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -54,7 +104,9 @@ class Database:
             )
         ''')
         
-        # Articles with complete metadata
+        # Articles with complete metadata.  The body lives in blobs under
+        # content_hash; content / content_snippet are only filled on rows
+        # written before bodies moved there.
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS articles (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -82,6 +134,16 @@ class Database:
             ON articles(content_hash)
         ''')
         
+        # Article bodies, compressed, stored once per distinct SHA-256
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                size INTEGER,
+                data BLOB NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        
         # Article clusters (for duplicate coverage)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS article_clusters (
@@ -94,6 +156,20 @@ class Database:
             )
         ''')
         
+        # Full-text index over articles (rowid = articles.id).  Contentless:
+        # the text lives in articles / blobs, so only the index is stored.
+        # Filled by store_articles_bulk; rebuilt from scratch (after the
+        # migrations below) when created on a database that already holds
+        # articles.
+        had_index = cursor.execute('''
+            SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'
+        ''').fetchone() is not None
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, blurb, content, newsletter_name,
+                content = ''
+            )
+        ''')
         # Cluster membership
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS cluster_articles (
@@ -135,18 +211,217 @@ class Database:
             )
         ''')
         
+        # Sync checkpoints (e.g. the Gmail historyId to resume from)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
         self.conn.commit()
+        
+        # Everything added to the schema since lives in migrations.py
+        migrate(self.conn)
+        
+        if not had_index:
+            self.rebuild_search_index()
     
     def store_email(self, email_data: Dict[str, Any]) -> int:
         """Store processed email with full metadata"""
-        cursor = self.conn.cursor()
+        return self.store_emails_bulk([email_data])[0]
+    
+    def store_emails_bulk(self, emails: List[Dict[str, Any]]) -> List[int]:
+        """
+        Store many processed emails in one transaction.
         
-        cursor.execute('''
-            INSERT OR IGNORE INTO processed_emails 
-            (gmail_message_id, thread_id, subject, sender_email, sender_name, 
-             received_timestamp, raw_headers, is_newsletter, newsletter_service)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        Returns the row ID of each email, in input order.  An email that is
+        already stored keeps its row (and its values) and its existing ID
+        is returned.  The newsletters registry is updated for the new
+        newsletter emails in the same transaction.
+        """
+        ids_by_message: Dict[str, int] = {}
+        with self.conn:
+            # IDs only grow (AUTOINCREMENT), so anything above this is new
+            last_id = self.conn.execute(
+                'SELECT COALESCE(MAX(id), 0) FROM processed_emails').fetchone()[0]
+            for chunk in _chunks(emails, BULK_INSERT_ROWS):
+                cursor = self.conn.execute(f'''
+                    INSERT INTO processed_emails 
+                    (gmail_message_id, thread_id, subject, sender_email, sender_name, 
+                     received_timestamp, raw_headers, is_newsletter, newsletter_service)
+                    VALUES {_placeholders(len(chunk), 9)}
+                    ON CONFLICT(gmail_message_id) DO UPDATE SET
+                        gmail_message_id = excluded.gmail_message_id
+                    RETURNING id, gmail_message_id
+                ''', [value for email in chunk for value in self._email_row(email)])
+                ids_by_message.update((row['gmail_message_id'], row['id'])
+                                      for row in cursor.fetchall())
+            new = {}
+            for email in emails:
+                # setdefault: the first of any repeats in the batch is the one stored
+                if ids_by_message[email['gmail_message_id']] > last_id:
+                    new.setdefault(email['gmail_message_id'], email)
+            self._register_newsletters([e for e in new.values() if e['is_newsletter']])
+        self._manager.remember_ids(ids_by_message)
+        return [ids_by_message[email['gmail_message_id']] for email in emails]
+    
+    def _register_newsletters(self, emails: List[Dict[str, Any]]):
+        """Count newly stored newsletter emails into the newsletters registry"""
+        senders: Dict[str, Dict[str, Any]] = {}
+        for email in emails:
+            sender_email = (email.get('sender_email') or '').lower()
+            if not sender_email:
+                continue
+            received = email['received_timestamp']
+            entry = senders.setdefault(sender_email, {
+                'name': '', 'first': received, 'last': received, 'count': 0})
+            entry['name'] = email.get('sender_name') or entry['name']
+            entry['first'] = min(entry['first'], received)
+            entry['last'] = max(entry['last'], received)
+            entry['count'] += 1
+        
+        rows = [(sender_email, sender_email.partition('@')[2], e['name'],
+                 True, e['first'], e['last'], e['count'])
+                for sender_email, e in senders.items()]
+        for chunk in _chunks(rows, BULK_INSERT_ROWS):
+            self.conn.execute(f'''
+                INSERT INTO newsletters
+                (sender_email, sender_domain, sender_name, auto_detected,
+                 first_seen, last_seen, total_received)
+                VALUES {_placeholders(len(chunk), 7)}
+                ON CONFLICT(sender_email) DO UPDATE SET
+                    sender_name = COALESCE(NULLIF(excluded.sender_name, ''), sender_name),
+                    first_seen = min(first_seen, excluded.first_seen),
+                    last_seen = max(last_seen, excluded.last_seen),
+                    total_received = total_received + excluded.total_received
+            ''', [value for row in chunk for value in row])
+    
+    def store_article(self, article_data: Dict[str, Any], email_id: int) -> int:
+        """Store article with full metadata"""
+        return self.store_articles_bulk([(article_data, email_id)])[0]
+    
+    def store_articles_bulk(self, articles: List[Tuple[Dict[str, Any], int]]) -> List[int]:
+        """
+        Store many (article_data, email_id) pairs in one transaction.
+        
+        Each distinct body is compressed into blobs once; articles only
+        reference it by content_hash, so repeated sponsor blocks and
+        re-sent issues cost one row each, not one copy each.
+        
+        Returns the new row IDs, in input order.
+        """
+        ids: List[int] = []
+        with self.conn:
+            for chunk in _chunks(articles, BULK_INSERT_ROWS):
+                bodies = [article.get('content', '') for article, _ in chunk]
+                hashes = [content_hash(body) for body in bodies]
+                self._store_blobs(dict(zip(hashes, bodies)))
+                cursor = self.conn.execute(f'''
+                    INSERT INTO articles 
+                    (email_id, title, url, author, publish_date,
+                     word_count, content_hash, paywall_detected, newsletter_name, 
+                     newsletter_email, received_timestamp, article_type, blurb)
+                    VALUES {_placeholders(len(chunk), 13)}
+                    RETURNING id
+                ''', [value for (article, email_id), body_hash in zip(chunk, hashes)
+                      for value in self._article_row(article, email_id, body_hash)])
+                # RETURNING order is unspecified, but AUTOINCREMENT hands out
+                # IDs in insertion order, so sorting restores input order
+                chunk_ids = sorted(row['id'] for row in cursor.fetchall())
+                self._index_articles(zip(chunk_ids, (article for article, _ in chunk)))
+                ids.extend(chunk_ids)
+        return ids
+    
+    def _index_articles(self, articles: Iterable[Tuple[int, Dict[str, Any]]]):
+        """Add (article_id, article_data) pairs to articles_fts"""
+        rows = [(article_id, a.get('title', ''), a.get('blurb', ''), a.get('content', ''),
+                 a.get('newsletter_name', ''))
+                for article_id, a in articles]
+        for chunk in _chunks(rows, BULK_INSERT_ROWS):
+            self.conn.execute(f'''
+                INSERT INTO articles_fts (rowid, title, blurb, content, newsletter_name)
+                VALUES {_placeholders(len(chunk), 5)}
+            ''', [value for row in chunk for value in row])
+    
+    def rebuild_search_index(self) -> int:
+        """Re-index every stored article; returns how many were indexed"""
+        indexed = 0
+        with self.conn:
+            self.conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('delete-all')")
+            last_id = 0
+            while True:
+                rows = self.conn.execute('''
+                    SELECT id, title, blurb, content, content_hash, newsletter_name
+                    FROM articles WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, BULK_INSERT_ROWS)).fetchall()
+                if not rows:
+                    break
+                articles = self._with_bodies(rows)
+                self._index_articles((a['id'], {**a, 'content': a['content'] or '',
+                                                 'blurb': a['blurb'] or ''})
+                                     for a in articles)
+                indexed += len(articles)
+                last_id = rows[-1]['id']
+        return indexed
+    
+    def search_articles(self, query: str, since: Optional[str] = None,
+                        limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Full-text search over every stored article, best match first.
+        
+        Args:
+            query: Words to look for; an article must contain all of them.
+            since: Only articles received on or after this ISO date.
+            limit: Maximum number of results.
+        
+        Returns:
+            Article dicts (id, title, url, newsletter_name, received_timestamp,
+            score, snippet), ranked by bm25.  The snippet is the passage of
+            the body with the most matches, matched words in [brackets].
+        """
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            return []
+        match = ' '.join('"' + term + '"' for term in terms)
+        
+        bm25 = f"bm25(articles_fts, {', '.join(map(str, SEARCH_WEIGHTS))})"
+        if since is None:
+            # Rank inside the index, then join only the winners
+            ranked = f'''
+                SELECT rowid AS id, {bm25} AS score FROM articles_fts
+                WHERE articles_fts MATCH ? ORDER BY score LIMIT ?
+            '''
+            params = (match, limit)
+        else:
+            ranked = f'''
+                SELECT articles_fts.rowid AS id, {bm25} AS score FROM articles_fts
+                JOIN articles a ON a.id = articles_fts.rowid
+                WHERE articles_fts MATCH ? AND a.received_timestamp >= ?
+                ORDER BY score LIMIT ?
+            '''
+            params = (match, since, limit)
+        
+        cursor = self.conn.execute(f'''
+            SELECT a.id, a.title, a.url, a.newsletter_name, a.received_timestamp,
+                   a.content, a.content_hash, r.score
+            FROM ({ranked}) r
+            JOIN articles a ON a.id = r.id
+            ORDER BY r.score
+        ''', params)
+        
+        results = []
+        for article in self._with_bodies(cursor.fetchall()):
+            article['snippet'] = _snippet(article.pop('content') or '', set(terms))
+            article.pop('content_hash')
+            article.pop('content_snippet', None)
+            results.append(article)
+        return results
+    
+    @staticmethod
+    def _email_row(email_data: Dict[str, Any]) -> tuple:
+        return (
             email_data['gmail_message_id'],
             email_data.get('thread_id'),
             email_data['subject'],
@@ -156,50 +431,38 @@ class Database:
             json.dumps(email_data.get('headers', {})),
             email_data['is_newsletter'],
             email_data.get('newsletter_service')
-        ))
-        
-        self.conn.commit()
-        
-        # Get the ID (either just inserted or existing)
-        cursor.execute('''
-            SELECT id FROM processed_emails WHERE gmail_message_id = ?
-        ''', (email_data['gmail_message_id'],))
-        
-        result = cursor.fetchone()
-        return result['id'] if result else cursor.lastrowid
+        )
     
-    def store_article(self, article_data: Dict[str, Any], email_id: int) -> int:
-        """Store article with full metadata"""
-        cursor = self.conn.cursor()
-        
-        # Generate content hash for deduplication
-        content = article_data.get('content', '')
-        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
-        
-        cursor.execute('''
-            INSERT INTO articles 
-            (email_id, title, url, author, publish_date, content, content_snippet,
-             word_count, content_hash, paywall_detected, newsletter_name, 
-             newsletter_email, received_timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    def _store_blobs(self, bodies: Dict[str, str]):
+        """Compress and insert {hash: body}; hashes already stored are left alone"""
+        rows = []
+        for body_hash, body in bodies.items():
+            codec, data = compress(body)
+            rows.append((body_hash, codec, len(body.encode('utf-8')), data))
+        for chunk in _chunks(rows, BULK_INSERT_ROWS):
+            self.conn.execute(f'''
+                INSERT INTO blobs (hash, codec, size, data)
+                VALUES {_placeholders(len(chunk), 4)}
+                ON CONFLICT(hash) DO NOTHING
+            ''', [value for row in chunk for value in row])
+    
+    @staticmethod
+    def _article_row(article_data: Dict[str, Any], email_id: int, body_hash: str) -> tuple:
+        return (
             email_id,
             article_data['title'],
             article_data.get('url', ''),
             article_data.get('author'),
             article_data.get('publish_date'),
-            content,
-            content[:500],  # Snippet for previews
             article_data.get('word_count', 0),
-            content_hash,
+            body_hash,
             article_data.get('paywall_detected', False),
             article_data.get('newsletter_name', ''),
             article_data.get('newsletter_email', ''),
-            article_data.get('received_timestamp')
-        ))
-        
-        self.conn.commit()
-        return cursor.lastrowid
+            article_data.get('received_timestamp'),
+            article_data.get('article_type'),
+            article_data.get('blurb')
+        )
     
     def get_article_with_metadata(self, article_id: int) -> Optional[Dict[str, Any]]:
         """Retrieve article with ALL metadata"""
@@ -218,54 +481,173 @@ class Database:
         ''', (article_id,))
         
         row = cursor.fetchone()
-        return dict(row) if row else None
+        return self._with_bodies([row])[0] if row else None
+    
+    def get_article_bodies(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Decompressed article bodies by content_hash (unknown hashes are left out)"""
+        bodies = {}
+        for chunk in _chunks(list(set(hashes)), BULK_QUERY_IDS):
+            cursor = self.conn.execute(f'''
+                SELECT hash, codec, data FROM blobs
+                WHERE hash IN ({', '.join('?' * len(chunk))})
+            ''', chunk)
+            for row in cursor.fetchall():
+                bodies[row['hash']] = decompress(row['codec'], row['data'])
+        return bodies
+    
+    def get_enrichments(self, kind: str, keys: Iterable[str], model: str,
+                        prompt_version: str) -> Dict[str, str]:
+        """
+        Stored Claude results ('summary', 'category', …) by article key.
+
+        Only results produced by this model with this prompt version count;
+        keys without one are left out.
+        """
+        values = {}
+        for chunk in _chunks(list(set(keys)), BULK_QUERY_IDS):
+            cursor = self.conn.execute(f'''
+                SELECT article_key, value FROM article_enrichments
+                WHERE article_key IN ({', '.join('?' * len(chunk))})
+                  AND kind = ? AND model = ? AND prompt_version = ?
+            ''', [*chunk, kind, model, prompt_version])
+            values.update((row['article_key'], row['value']) for row in cursor.fetchall())
+        return values
+
+    def store_enrichments(self, kind: str, values: Dict[str, str], model: str,
+                          prompt_version: str):
+        """Store {article key: value} for kind, replacing any earlier result"""
+        rows = [(key, kind, model, prompt_version, value)
+                for key, value in values.items()]
+        with self.conn:
+            for chunk in _chunks(rows, BULK_INSERT_ROWS):
+                self.conn.execute(f'''
+                    INSERT INTO article_enrichments
+                    (article_key, kind, model, prompt_version, value)
+                    VALUES {_placeholders(len(chunk), 5)}
+                    ON CONFLICT DO UPDATE SET
+                        value = excluded.value,
+                        created_at = CURRENT_TIMESTAMP
+                ''', [value for row in chunk for value in row])
+
+    def _with_bodies(self, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        """Article rows as dicts, content and snippet filled in from blobs"""
+        articles = [dict(row) for row in rows]
+        missing = [a for a in articles if a.get('content') is None and a.get('content_hash')]
+        bodies = self.get_article_bodies(a['content_hash'] for a in missing)
+        for article in missing:
+            if article['content_hash'] in bodies:
+                article['content'] = bodies[article['content_hash']]
+                article['content_snippet'] = article['content'][:SNIPPET_CHARS]
+        return articles
     
     def check_if_processed(self, gmail_message_id: str) -> bool:
         """Check if an email has already been processed"""
+        return not self.filter_unprocessed([gmail_message_id])
+    
+    def filter_unprocessed(self, gmail_message_ids: Iterable[str]) -> List[str]:
+        """
+        The IDs not in processed_emails yet, in input order.
+        
+        IDs the Bloom filter has never seen are new without asking SQLite;
+        the rest are confirmed BULK_QUERY_IDS at a time with one IN (...)
+        query each.
+        """
+        ids = list(gmail_message_ids)
+        known = self._manager.known_ids(self.conn)
+        maybe_seen = list(dict.fromkeys(i for i in ids if known is None or i in known))
+        
+        seen = set()
+        for chunk in _chunks(maybe_seen, BULK_QUERY_IDS):
+            cursor = self.conn.execute(f'''
+                SELECT gmail_message_id FROM processed_emails
+                WHERE gmail_message_id IN ({', '.join('?' * len(chunk))})
+            ''', chunk)
+            seen.update(row['gmail_message_id'] for row in cursor.fetchall())
+        return [i for i in ids if i not in seen]
+    
+    def get_sync_state(self, key: str) -> Optional[str]:
+        """Get a stored sync checkpoint value, or None if never set"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT value FROM sync_state WHERE key = ?
+        ''', (key,))
+        row = cursor.fetchone()
+        return row['value'] if row else None
+    
+    def set_sync_state(self, key: str, value: str):
+        """Store (or overwrite) a sync checkpoint value"""
         cursor = self.conn.cursor()
         cursor.execute('''
-            SELECT id FROM processed_emails WHERE gmail_message_id = ?
-        ''', (gmail_message_id,))
-        return cursor.fetchone() is not None
+            INSERT INTO sync_state (key, value, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value,
+                updated_at = excluded.updated_at
+        ''', (key, value))
+        self.conn.commit()
     
     def store_digest(self, digest_data: Dict[str, Any], paths: Dict[str, str]) -> int:
-        """Store digest record with paths"""
-        cursor = self.conn.cursor()
+        """
+        Store today's digest record and which articles appeared in it, in
+        one transaction.  Re-running on the same day replaces both.
         
+        digest_data['all_articles'] lists the digest's articles as dicts
+        with 'id' (articles row ID), 'section' and 'importance_score'.
+        """
         today = datetime.now().date().isoformat()
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO daily_digests
-            (date, digest_html_path, email_html_path, webpage_url,
-             article_count, newsletter_count)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            today,
-            paths['webpage_path'],
-            paths['email_path'],
-            paths.get('webpage_url', ''),
-            digest_data['total_articles'],
-            digest_data['newsletter_count']
-        ))
-        
-        digest_id = cursor.lastrowid
-        
-        # Store which articles appeared in this digest
-        for article in digest_data.get('all_articles', []):
-            cursor.execute('''
-                INSERT OR IGNORE INTO digest_articles
-                (digest_id, article_id, section, importance_score)
-                VALUES (?, ?, ?, ?)
+        with self.conn:
+            digest_id = self.conn.execute('''
+                INSERT INTO daily_digests
+                (date, digest_html_path, email_html_path, webpage_url,
+                 article_count, newsletter_count)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(date) DO UPDATE SET
+                    digest_html_path = excluded.digest_html_path,
+                    email_html_path = excluded.email_html_path,
+                    webpage_url = excluded.webpage_url,
+                    article_count = excluded.article_count,
+                    newsletter_count = excluded.newsletter_count,
+                    generation_timestamp = CURRENT_TIMESTAMP
+                RETURNING id
             ''', (
-                digest_id,
-                article['id'],
-                article.get('section', 'categorized'),
-                article.get('importance_score', 0)
-            ))
-        
-        self.conn.commit()
+                today,
+                paths['webpage_path'],
+                paths['email_path'],
+                paths.get('webpage_url', ''),
+                digest_data['total_articles'],
+                digest_data['newsletter_count']
+            )).fetchone()['id']
+            
+            # Store which articles appeared in this digest
+            self.conn.execute('''
+                DELETE FROM digest_articles WHERE digest_id = ?
+            ''', (digest_id,))
+            rows = [(digest_id, article['id'], article.get('section', 'categorized'),
+                     article.get('importance_score', 0))
+                    for article in digest_data.get('all_articles', [])]
+            for chunk in _chunks(rows, BULK_INSERT_ROWS):
+                self.conn.execute(f'''
+                    INSERT INTO digest_articles
+                    (digest_id, article_id, section, importance_score)
+                    VALUES {_placeholders(len(chunk), 4)}
+                    ON CONFLICT(digest_id, article_id) DO UPDATE SET
+                        section = excluded.section,
+                        importance_score = excluded.importance_score
+                ''', [value for row in chunk for value in row])
         return digest_id
     
+    def get_newsletter_stats(self, sender_email: str) -> Optional[Dict[str, Any]]:
+        """
+        The newsletters registry row for a sender (first_seen, last_seen,
+        total_received, …), or None if no newsletter came from it
+        """
+        cursor = self.conn.execute('''
+            SELECT * FROM newsletters WHERE sender_email = ?
+        ''', (sender_email.lower(),))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
     def get_archive_metadata(self, days: int = 30) -> List[Dict[str, Any]]:
         """Get metadata for archive index"""
         cursor = self.conn.cursor()
@@ -290,8 +672,50 @@ class Database:
             ORDER BY a.extraction_timestamp DESC
         ''', (hours,))
         
-        return [dict(row) for row in cursor.fetchall()]
+        return self._with_bodies(cursor.fetchall())
+    
+    def explain_queries(self) -> Dict[str, List[Tuple[str, List[str]]]]:
+        """
+        EXPLAIN QUERY PLAN for the SQL each public read method really runs.
+        
+        Every method is called once with sample arguments while its
+        statements are recorded, then each SELECT is explained.
+        
+        Returns:
+            {call: [(sql, [plan line, ...]), ...]}, in call order.  A call
+            answered without SQL (e.g. by the Bloom filter) has no entries.
+        """
+        calls = [
+            ('Bloom filter load (first ID check)', lambda: self._manager.known_ids(self.conn)),
+            ('get_article_with_metadata(1)', lambda: self.get_article_with_metadata(1)),
+            ("check_if_processed('…')", lambda: self.check_if_processed('explain')),
+            ("filter_unprocessed(['…'])", lambda: self.filter_unprocessed(['explain'])),
+            ("get_sync_state('…')", lambda: self.get_sync_state('explain')),
+            ("get_newsletter_stats('…')", lambda: self.get_newsletter_stats('explain')),
+            ('get_archive_metadata(30)', lambda: self.get_archive_metadata(30)),
+            ('get_recent_articles(24)', lambda: self.get_recent_articles(24)),
+            ("get_article_bodies(['…'])", lambda: self.get_article_bodies(['0' * 64])),
+            ("get_enrichments('summary', ['…'], …)",
+             lambda: self.get_enrichments('summary', ['0' * 64], 'explain', '1')),
+            ("search_articles('news')", lambda: self.search_articles('news')),
+            ("search_articles('news', since=…)",
+             lambda: self.search_articles('news', since='2026-01-01')),
+        ]
+        plans = {}
+        for label, call in calls:
+            with recording_statements(self.conn) as statements:
+                call()
+            plans[label] = []
+            for sql in statements:
+                # FTS5 reads its shadow tables through 'main'.'…' statements
+                if not sql.lstrip().upper().startswith('SELECT') or "'main'." in sql:
+                    continue
+                rows = self.conn.execute(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+                plans[label].append((' '.join(sql.split()), [row['detail'] for row in rows]))
+        return plans
     
     def close(self):
-        """Close database connection"""
-        self.conn.close()
+        """Release this thread's connection (closed once nothing else uses it)"""
+        if self.conn is not None:
+            self._manager.release()
+            self.conn = None
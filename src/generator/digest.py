@@ -11,7 +11,7 @@ Jinja2 template.  Writes two identical copies to disk:
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from jinja2 import Environment, FileSystemLoader
 
@@ -29,7 +29,8 @@ class DigestGenerator:
     # ------------------------------------------------------------------
     # Public
     # ------------------------------------------------------------------
-    def generate_and_save(self, digest_data: Dict[str, Any]) -> Dict[str, str]:
+    def generate_and_save(self, digest_data: Dict[str, Any],
+                          digest_date: Optional[str] = None) -> Dict[str, str]:
         """
         Render and write both output files.
 
@@ -39,13 +40,16 @@ class DigestGenerator:
                 • total_articles     (int)
                 • newsletter_count   (int)
                 • sections           (OrderedDict: section_name -> list of article dicts)
+            digest_date: YYYY-MM-DD used in the file names (default: today).
+                         Replays pass the original run's date so the
+                         archive copy is overwritten in place.
 
         Returns:
             {"email_path": str, "webpage_path": str}
         """
         html = self._render(digest_data)
 
-        today = datetime.now().strftime('%Y-%m-%d')
+        today = digest_date or datetime.now().strftime('%Y-%m-%d')
 
         email_path   = config.EMAIL_OUTPUT_DIR / f"{today}_digest.html"
         webpage_path = config.DOCS_DIR        / f"{today}_digest.html"
@@ -0,0 +1,153 @@
+"""
+On-disk Message Cache
+Compressed Gmail message resources, keyed by message ID, with LRU eviction
+"""
+import gzip
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:          # optional – gzip is always available
+    zstandard = None
+
+import config
+
+# Any cached body format can also answer a 'metadata' lookup
+BODY_FORMATS = ('full', 'raw')
+
+
+class MessageCache:
+    """
+    One compressed JSON file per (message ID, format) under `cache_dir`.
+
+    Gmail message IDs never change content, so entries never go stale;
+    the only eviction is by size.  Reads bump a file's mtime, and once the
+    cache grows past `max_bytes` the least recently used files are deleted
+    until it is back under 90 % of the cap.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None,
+                 max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or config.MESSAGE_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else config.MESSAGE_CACHE_MAX_MB * 1024 * 1024
+        self.suffix = '.json.zst' if zstandard else '.json.gz'
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._sizes = self._scan()
+        self._total = sum(self._sizes.values())
+
+    # ------------------------------------------------------------------
+    # Public
+    # ------------------------------------------------------------------
+    def get(self, message_id: str, fmt: str) -> Optional[Dict[str, Any]]:
+        """Cached message resource for message_id in format fmt, or None"""
+        candidates = (fmt,) + BODY_FORMATS if fmt == 'metadata' else (fmt,)
+        for candidate in candidates:
+            message = self._read(message_id, candidate)
+            if message is not None:
+                with self._lock:
+                    self.hits += 1
+                return message
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, message: Dict[str, Any], fmt: str):
+        """Store a Gmail message resource fetched in format fmt"""
+        path = self._path(message['id'], fmt)
+        data = self._compress(json.dumps(message, separators=(',', ':')).encode('utf-8'))
+
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(path.name + f'.{threading.get_ident()}.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total += len(data) - self._sizes.get(path, 0)
+            self._sizes[path] = len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._total
+
+    # ------------------------------------------------------------------
+    # Storage helpers
+    # ------------------------------------------------------------------
+    def _path(self, message_id: str, fmt: str) -> Path:
+        # Two-character fan-out keeps directories small on big archives
+        return self.cache_dir / message_id[-2:] / f'{message_id}.{fmt}{self.suffix}'
+
+    def _read(self, message_id: str, fmt: str) -> Optional[Dict[str, Any]]:
+        for path in self._existing_paths(message_id, fmt):
+            try:
+                data = path.read_bytes()
+                os.utime(path)           # LRU: reads count as use
+                return json.loads(self._decompress(data, path))
+            except (OSError, ValueError):
+                # Evicted by another process, or a torn write – treat as a miss
+                continue
+        return None
+
+    def _existing_paths(self, message_id: str, fmt: str):
+        # Entries written by a previous run may use the other codec
+        base = self.cache_dir / message_id[-2:] / f'{message_id}.{fmt}'
+        for suffix in ('.json.zst', '.json.gz'):
+            path = base.with_name(base.name + suffix)
+            if path in self._sizes:
+                yield path
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstandard:
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(data: bytes, path: Path) -> bytes:
+        if path.name.endswith('.zst'):
+            if not zstandard:
+                raise ValueError(f'{path.name} needs the zstandard package')
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _scan(self) -> Dict[Path, int]:
+        sizes = {}
+        for shard in self.cache_dir.iterdir():
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard):
+                if entry.name.endswith(('.json.zst', '.json.gz')):
+                    sizes[Path(entry.path)] = entry.stat().st_size
+        return sizes
+
+    def _evict(self):
+        """Delete least recently used entries until under 90 % of the cap"""
+        target = self.max_bytes * 0.9
+
+        def _mtime(item: Tuple[Path, int]) -> float:
+            try:
+                return item[0].stat().st_mtime
+            except OSError:
+                return 0.0
+
+        for path, size in sorted(self._sizes.items(), key=_mtime):
+            if self._total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            self._total -= size
+            del self._sizes[path]
@@ -3,95 +3,576 @@ Gmail API Client
 Handles fetching and parsing emails from Gmail
 """
 import base64
+import random
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from email.utils import parsedate_to_datetime
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.oauth2.credentials import Credentials
 
 # Make sure project root is on path so config and src.database resolve
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 import config
 from src.database.models import Database
+from src.gmail.cache import MessageCache
+from src.gmail.filters import GATE_HEADERS, is_newsletter_by_headers, should_skip_email
+from src.gmail.mime import parse_raw_message
+from src.gmail.ratelimit import QUOTA_UNITS, AdaptiveConcurrency, TokenBucket
+from src.sources.base import MessageSource
 
 
-class GmailClient:
-    def __init__(self, credentials: Credentials):
-        self.service = build('gmail', 'v1', credentials=credentials)
+# Gmail rejects HTTP batch requests with more than 100 inner calls
+GMAIL_MAX_BATCH_SIZE = 100
+
+# sync_state key holding the historyId the next incremental run resumes from
+HISTORY_CHECKPOINT_KEY = 'gmail_history_id'
+
+# Labels the default Gmail search leaves out; skip them in history results too
+HISTORY_EXCLUDED_LABELS = {'DRAFT', 'SPAM', 'TRASH'}
+
+# ── concurrent-fetch retry tuning (same shape as claude/api_helpers) ──
+MAX_RETRIES          = 5
+RETRY_BASE_DELAY_SECS = 1
+RETRY_MAX_DELAY_SECS  = 32
+THROTTLE_STATUSES    = {429, 500, 502, 503, 504}
+# Errors no retry will fix: the message was deleted, or the ID is bad
+PERMANENT_STATUSES   = {400, 404, 410}
+
+
+class GmailClient(MessageSource):
+    def __init__(self, credentials: Credentials = None, service=None,
+                 batch_size: int = config.GMAIL_BATCH_SIZE,
+                 fetch_mode: str = config.GMAIL_FETCH_MODE,
+                 max_workers: int = config.GMAIL_FETCH_WORKERS,
+                 quota_units_per_sec: Optional[float] = config.GMAIL_QUOTA_UNITS_PER_SEC,
+                 body_format: str = config.GMAIL_BODY_FORMAT,
+                 cache: Optional[MessageCache] = None,
+                 db_path: Optional[Path] = None):
+        self.credentials = credentials
+        if service is None and fetch_mode != 'offline':
+            service = build('gmail', 'v1', credentials=credentials)
+        self.service = service
+        self.batch_size = max(1, min(batch_size, GMAIL_MAX_BATCH_SIZE))
+        self.fetch_mode = fetch_mode
+        self.body_format = body_format    # 'full' (JSON payload tree) or 'raw' (RFC 822)
+        if cache is None and config.MESSAGE_CACHE_ENABLED:
+            cache = MessageCache()
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        self.quota = TokenBucket(quota_units_per_sec)
+        self._local = threading.local()   # per-thread HTTP for concurrent fetch
+        self.db_path = db_path            # processed_emails + sync_state; default DATABASE_PATH
+        self._pending_checkpoint = None   # historyId commit_checkpoint() will save
+        self._failed_for_good = set()     # IDs Gmail answered 400/404/410 for this run
     
-    def get_messages_since(self, hours: int = 24) -> List[Dict[str, Any]]:
+    def iter_messages_since(self, hours: int = 24,
+                            incremental: bool = False) -> Iterator[Dict[str, Any]]:
         """
-        Fetch emails from the last N hours that have NOT already been processed.
+        Yield emails from the last N hours that have NOT already been processed.
 
         Uses the Gmail `after:` query to limit the initial pull to the time
-        window, then checks each message ID against the local database before
-        making the expensive per-message API call to fetch full content.
+        window (following every result page), then checks each message ID
+        against the local database before fetching content in HTTP
+        batches of `batch_size` messages.  With GMAIL_HEADER_FIRST, bodies
+        are only downloaded for messages that pass the header gate (see
+        get_messages_header_first).
+
+        In incremental mode the time-window listing is replaced by
+        users.history.list from the historyId saved at the end of the last
+        run, so only messages added since then are listed.  With no
+        checkpoint yet, or one Gmail no longer keeps history for, it falls
+        back to the time-window scan.
+
+        Message IDs are listed up front; bodies are fetched and yielded
+        one batch at a time, so only a batch of HTML is held here at once.
+
+        The history checkpoint is not saved here.  Once every listed message
+        has been yielded, commit_checkpoint() saves it – the caller calls
+        that after persisting them.  If any message could not be fetched,
+        the checkpoint stays put, and the next run lists it again – unless
+        Gmail said it never will be (PERMANENT_STATUSES, e.g. deleted since
+        it was listed): those are skipped for good rather than holding the
+        checkpoint back until the history expires.
 
         Args:
             hours: Number of hours to look back
+            incremental: Resume from the stored historyId checkpoint
 
-        Returns:
-            List of email data dictionaries (new messages only)
+        Yields:
+            Email data dictionaries (new messages only)
         """
         cutoff_time = datetime.now() - timedelta(hours=hours)
         query = f"after:{int(cutoff_time.timestamp())}"
+        self._pending_checkpoint = None
+        self._failed_for_good = set()
 
-        print(f"Fetching emails since {cutoff_time.strftime('%Y-%m-%d %H:%M:%S')}...")
-
+        db = Database(self.db_path)
         try:
             # --- Step 1: get the list of message IDs from Gmail --------------
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=500
-            ).execute()
+            messages = None
+            next_checkpoint = None
 
-            messages = results.get('messages', [])
+            if incremental:
+                # Read the mailbox's historyId BEFORE listing, so anything that
+                # arrives while this run is in flight is picked up next time
+                next_checkpoint = self.get_current_history_id()
+                checkpoint = db.get_sync_state(HISTORY_CHECKPOINT_KEY)
+                if checkpoint:
+                    print(f"Fetching emails added since historyId {checkpoint}...")
+                    messages = self.list_messages_since_history(checkpoint)
+                    if messages is None:
+                        print("  History checkpoint expired – falling back to time-window scan.")
+
+            if messages is None:
+                print(f"Fetching emails since {cutoff_time.strftime('%Y-%m-%d %H:%M:%S')}...")
+                messages = self.list_message_ids(query)
 
             if not messages:
-                print("No messages found in the specified time range.")
-                return []
+                print("No new messages found.")
+                self._pending_checkpoint = next_checkpoint
+                return
 
-            print(f"Found {len(messages)} messages in time window.")
+            print(f"Found {len(messages)} candidate messages.")
 
             # --- Step 2: filter out already-processed IDs ---------------------
-            db = Database()
-            new_messages = []
-            already_seen = 0
-
-            for msg in messages:
-                if db.check_if_processed(msg['id']):
-                    already_seen += 1
-                else:
-                    new_messages.append(msg)
-
-            db.close()
+            unprocessed = set(db.filter_unprocessed(msg['id'] for msg in messages))
+            new_messages = [msg for msg in messages if msg['id'] in unprocessed]
+            already_seen = len(messages) - len(new_messages)
 
             print(f"  Already processed: {already_seen}")
             print(f"  New (will fetch):  {len(new_messages)}")
 
             if not new_messages:
                 print("Nothing new since last run.")
-                return []
+                self._pending_checkpoint = next_checkpoint
+                return
 
-            # --- Step 3: fetch full content only for new messages -------------
-            emails = []
-            for i, message in enumerate(new_messages, 1):
-                if i % 10 == 0:
-                    print(f"  Fetching message {i}/{len(new_messages)}...")
+            # --- Step 3: fetch content only for new messages ------------------
+            new_ids = [m['id'] for m in new_messages]
+            if config.GMAIL_HEADER_FIRST:
+                emails = self.iter_messages_header_first(new_ids)
+            else:
+                emails = self.iter_messages_content(new_ids)
 
-                email_data = self.get_message_content(message['id'])
-                if email_data:
-                    emails.append(email_data)
+            missing = set(new_ids)
+            for email_data in emails:
+                missing.discard(email_data['gmail_message_id'])
+                yield email_data
 
-            print(f"✓ Successfully fetched {len(emails)} new emails")
-            return emails
+            gone = missing & self._failed_for_good
+            missing -= gone
+            print(f"✓ Successfully fetched {len(new_ids) - len(missing) - len(gone)} new emails")
+            if gone:
+                print(f"  ⚠ {len(gone)} message(s) can no longer be fetched "
+                      f"(HTTP {'/'.join(map(str, sorted(PERMANENT_STATUSES)))}) – skipped for good")
+            if missing and next_checkpoint:
+                print(f"  ⚠ {len(missing)} message(s) could not be fetched – "
+                      f"history checkpoint not advanced, so the next run retries them")
+            elif not missing:
+                self._pending_checkpoint = next_checkpoint
 
         except Exception as e:
             print(f"Error fetching messages: {e}")
-            return []
+
+        finally:
+            db.close()
+
+    def get_current_history_id(self) -> str:
+        """The mailbox's latest historyId, from users.getProfile"""
+        self.quota.acquire(QUOTA_UNITS['getProfile'])
+        profile = self.service.users().getProfile(userId='me').execute()
+        return str(profile['historyId'])
+
+    def list_messages_since_history(self, start_history_id: str) -> Optional[List[Dict[str, str]]]:
+        """
+        List messages added to the mailbox after start_history_id.
+
+        Follows every users.history.list page.  Drafts, spam and trash are
+        left out to match what the `after:` search returns.
+
+        Returns:
+            List of {'id', 'threadId'} stubs, or None if Gmail no longer
+            has history that far back (HTTP 404) and a full scan is needed
+        """
+        messages = []
+        seen = set()
+        request_args = {
+            'userId': 'me',
+            'startHistoryId': start_history_id,
+            'historyTypes': ['messageAdded'],
+            'maxResults': config.GMAIL_LIST_PAGE_SIZE,
+        }
+
+        while True:
+            try:
+                self.quota.acquire(QUOTA_UNITS['history.list'])
+                results = self.service.users().history().list(**request_args).execute()
+            except HttpError as e:
+                if e.resp.status == 404:
+                    return None
+                raise
+
+            for record in results.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message = added['message']
+                    if message['id'] in seen:
+                        continue
+                    if HISTORY_EXCLUDED_LABELS.intersection(message.get('labelIds', [])):
+                        continue
+                    seen.add(message['id'])
+                    messages.append({'id': message['id'], 'threadId': message.get('threadId')})
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return messages
+            request_args['pageToken'] = page_token
+
+    def commit_checkpoint(self, db: Database):
+        """Save the historyId from a fully fetched iter_messages_since run into db"""
+        if self._pending_checkpoint:
+            db.set_sync_state(HISTORY_CHECKPOINT_KEY, self._pending_checkpoint)
+            self._pending_checkpoint = None
+
+    def list_message_ids(self, query: str) -> List[Dict[str, str]]:
+        """
+        List every message matching a Gmail search query.
+
+        messages.list returns at most GMAIL_LIST_PAGE_SIZE results per call,
+        so keep following nextPageToken until Gmail stops returning one.
+
+        Returns:
+            List of {'id', 'threadId'} stubs, newest first
+        """
+        messages = []
+        request_args = {
+            'userId': 'me',
+            'q': query,
+            'maxResults': config.GMAIL_LIST_PAGE_SIZE,
+        }
+
+        while True:
+            self.quota.acquire(QUOTA_UNITS['messages.list'])
+            results = self.service.users().messages().list(**request_args).execute()
+            messages.extend(results.get('messages', []))
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return messages
+            request_args['pageToken'] = page_token
+
+    def get_messages_content(self, message_ids: List[str],
+                             fmt: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch and parse many messages, batching the messages.get calls.
+
+        Args:
+            message_ids: Gmail message IDs to fetch
+            fmt: 'full' or 'raw' for headers + bodies (default: the
+                 client's body_format), 'metadata' for the GATE_HEADERS
+                 only (html/text come back empty)
+
+        Returns:
+            Email data dictionaries in the same order as message_ids –
+            in 'concurrent' fetch mode, cached ones first and the rest in
+            completion order (messages that could not be fetched are left out)
+        """
+        return list(self.iter_messages_content(message_ids, fmt))
+
+    def iter_messages_content(self, message_ids: List[str],
+                              fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Like get_messages_content, but yields each email as soon as it arrives"""
+        for message in self._fetch_messages(message_ids, fmt or self.body_format):
+            yield self._parse_message(message)
+
+    def get_messages_header_first(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Two-phase fetch (see iter_messages_header_first).
+
+        Returns:
+            Email data dictionaries in the same order as message_ids;
+            header-only messages have empty html/text
+        """
+        emails = {e['gmail_message_id']: e for e in self.iter_messages_header_first(message_ids)}
+        return [emails[i] for i in message_ids if i in emails]
+
+    def iter_messages_header_first(self, message_ids: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Two-phase fetch: headers for everything, bodies only where needed.
+
+        Phase one pulls format='metadata' with just the headers the filters
+        read.  Messages that should_skip_email() rejects, or that the header
+        heuristics can't call a newsletter, stay header-only.  Phase two
+        fetches full bodies for the header-gated newsletters, plus any
+        remaining message Gmail's own search finds the word "unsubscribe"
+        in – the only ones the HTML heuristic in is_newsletter() could
+        still accept.
+
+        Yields:
+            The header-only emails first (empty html/text), then each
+            fetched email as its body arrives
+        """
+        stubs = list(self._fetch_messages(message_ids, 'metadata'))
+
+        header_only: Dict[str, Dict[str, Any]] = {}
+        need_body: List[str] = []
+        maybe_body: List[Dict[str, Any]] = []
+
+        for stub in stubs:
+            email_data = self._parse_message(stub)
+            header_only[stub['id']] = email_data
+            if should_skip_email(email_data):
+                continue
+            if is_newsletter_by_headers(email_data):
+                need_body.append(stub['id'])
+            else:
+                maybe_body.append(stub)
+
+        # Narrowed fallback for the HTML heuristic: one search call instead
+        # of downloading every remaining body
+        if maybe_body:
+            earliest = min(int(stub.get('internalDate', 0)) for stub in maybe_body) // 1000
+            mentions_unsubscribe = {
+                m['id'] for m in self.list_message_ids(f"unsubscribe after:{max(earliest - 1, 0)}")
+            }
+            need_body.extend(stub['id'] for stub in maybe_body
+                             if stub['id'] in mentions_unsubscribe)
+
+        need_body_set = set(need_body)
+        skipped_bytes = sum(stub.get('sizeEstimate', 0) for stub in stubs
+                            if stub['id'] not in need_body_set)
+        print(f"  Header gate: {len(need_body)}/{len(stubs)} need bodies "
+              f"(~{skipped_bytes / 1_000_000:.1f} MB not downloaded)")
+
+        for message_id, email_data in header_only.items():
+            if message_id not in need_body_set:
+                yield email_data
+
+        yield from self.iter_messages_content(
+            [i for i in message_ids if i in need_body_set])
+
+    def _fetch_messages(self, message_ids: List[str], fmt: str = 'full') -> Iterator[Dict[str, Any]]:
+        """
+        Yield message resources for message_ids, in input order.
+
+        Messages already in the on-disk cache are served without touching
+        the network; the rest are fetched from Gmail and cached.  In
+        'concurrent' fetch mode the cache hits come first, then the rest
+        in completion order.
+        """
+        if self.cache is None:
+            yield from self._fetch_from_gmail(message_ids, fmt)
+            return
+
+        hits: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for message_id in message_ids:
+            message = self.cache.get(message_id, fmt)
+            if message is None:
+                missing.append(message_id)
+            else:
+                hits[message_id] = message
+
+        if hits:
+            print(f"  Message cache: {len(hits)} hit(s), "
+                  f"{len(missing)} to fetch ({fmt})")
+
+        fetched = self._fetch_and_cache(missing, fmt)
+        if self.fetch_mode == 'concurrent':
+            yield from hits.values()
+            yield from fetched
+            return
+
+        # The other modes fetch in input order, skipping failures, so the
+        # next fetched message is either this ID or one further on
+        ahead = None
+        for message_id in message_ids:
+            if message_id in hits:
+                yield hits.pop(message_id)
+                continue
+            if ahead is None:
+                ahead = next(fetched, None)
+            if ahead is not None and ahead['id'] == message_id:
+                yield ahead
+                ahead = None
+
+    def _fetch_and_cache(self, message_ids: List[str], fmt: str) -> Iterator[Dict[str, Any]]:
+        for message in self._fetch_from_gmail(message_ids, fmt):
+            self.cache.put(message, fmt)
+            yield message
+
+    def _fetch_from_gmail(self, message_ids: List[str], fmt: str = 'full') -> Iterator[Dict[str, Any]]:
+        """
+        Yield message resources for message_ids, straight from Gmail.
+
+        In 'batch' mode calls go out in HTTP batches of `batch_size`, in
+        order; an entry that fails inside a batch (usually a per-call 429)
+        is retried on its own, and skipped if that fails too.  'concurrent'
+        mode hands off to _fetch_concurrent; 'serial' (or batch_size 1)
+        is one request per message.  'offline' fetches nothing, so only
+        cached messages are returned.
+        """
+        if self.fetch_mode == 'offline':
+            if message_ids:
+                print(f"  ⚠ {len(message_ids)} message(s) not in the cache (offline)")
+            return
+
+        if self.fetch_mode == 'concurrent':
+            yield from self._fetch_concurrent(message_ids, fmt)
+            return
+
+        if self.fetch_mode == 'serial' or self.batch_size == 1:
+            for message_id in message_ids:
+                message = self._fetch_message(message_id, fmt)
+                if message:
+                    yield message
+            return
+
+        total = len(message_ids)
+
+        for start in range(0, total, self.batch_size):
+            chunk = message_ids[start:start + self.batch_size]
+            print(f"  Fetching messages {start + 1}-{start + len(chunk)}/{total} ({fmt})...")
+
+            for message_id, message in self._fetch_batch(chunk, fmt):
+                if message is None:
+                    message = self._fetch_message(message_id, fmt)
+                if message:
+                    yield message
+
+    def _fetch_concurrent(self, message_ids: List[str], fmt: str = 'full') -> Iterator[Dict[str, Any]]:
+        """
+        Fetch messages on a thread pool, yielding them in completion order.
+
+        At most `limiter.limit` requests are in flight (never more than
+        max_workers).  Every request is paced through the quota bucket.
+        A throttling response (429/5xx) halves the in-flight limit and
+        requeues the message with exponential back-off + jitter; the limit
+        creeps back up as requests succeed.  Other errors skip the message,
+        as the serial path does.
+        """
+        limiter = AdaptiveConcurrency(self.max_workers)
+        pending = deque((message_id, 1) for message_id in message_ids)
+        in_flight = {}
+        done_count = 0
+        total = len(message_ids)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or in_flight:
+                while pending and len(in_flight) < limiter.limit:
+                    message_id, attempt = pending.popleft()
+                    delay = 0.0
+                    if attempt > 1:
+                        delay = min(RETRY_BASE_DELAY_SECS * (2 ** (attempt - 2)), RETRY_MAX_DELAY_SECS)
+                        delay *= random.uniform(0.75, 1.25)
+                    future = pool.submit(self._execute_get, message_id, fmt, delay)
+                    in_flight[future] = (message_id, attempt)
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    message_id, attempt = in_flight.pop(future)
+                    try:
+                        message = future.result()
+                    except HttpError as e:
+                        if e.resp.status in THROTTLE_STATUSES and attempt < MAX_RETRIES:
+                            limiter.on_throttle()
+                            print(f"  ⏳ Gmail returned {e.resp.status} – "
+                                  f"concurrency now {limiter.limit}, retrying {message_id}")
+                            pending.append((message_id, attempt + 1))
+                        else:
+                            if e.resp.status in PERMANENT_STATUSES:
+                                self._failed_for_good.add(message_id)
+                            print(f"Error fetching message {message_id}: {e}")
+                        continue
+                    except Exception as e:
+                        print(f"Error fetching message {message_id}: {e}")
+                        continue
+
+                    limiter.on_success()
+                    done_count += 1
+                    if done_count % 50 == 0:
+                        print(f"  Fetched {done_count}/{total} ({fmt}, {limiter.limit} in flight)...")
+                    yield message
+
+    def _execute_get(self, message_id: str, fmt: str, delay: float = 0.0) -> Dict[str, Any]:
+        """Worker body for _fetch_concurrent: back off, pay quota, fetch"""
+        if delay:
+            time.sleep(delay)
+        self.quota.acquire(QUOTA_UNITS['messages.get'])
+        return self._get_request(message_id, fmt).execute(http=self._thread_http())
+
+    def _thread_http(self):
+        """
+        One authorised httplib2.Http per worker thread – httplib2 objects
+        are not thread-safe, so the service's shared one can't be used.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            import httplib2
+            http = httplib2.Http()
+            if self.credentials is not None:
+                from google_auth_httplib2 import AuthorizedHttp
+                http = AuthorizedHttp(self.credentials, http=http)
+            self._local.http = http
+        return http
+
+    def _fetch_batch(self, message_ids: List[str],
+                     fmt: str = 'full') -> List[Tuple[str, Optional[Dict]]]:
+        """
+        Run one HTTP batch of messages.get calls.
+
+        Returns:
+            (message_id, message resource or None on failure) pairs, in
+            the order the IDs were given
+        """
+        responses: Dict[str, Dict] = {}
+
+        def _collect(request_id, response, exception):
+            if exception is None:
+                responses[request_id] = response
+
+        batch = self.service.new_batch_http_request(callback=_collect)
+        for message_id in message_ids:
+            batch.add(self._get_request(message_id, fmt), request_id=message_id)
+        self.quota.acquire(QUOTA_UNITS['messages.get'] * len(message_ids))
+        batch.execute()
+
+        return [(message_id, responses.get(message_id)) for message_id in message_ids]
+
+    def _fetch_message(self, message_id: str, fmt: str = 'full') -> Optional[Dict[str, Any]]:
+        """Fetch a single message resource, or None on error"""
+        try:
+            self.quota.acquire(QUOTA_UNITS['messages.get'])
+            return self._get_request(message_id, fmt).execute()
+        except HttpError as e:
+            if e.resp.status in PERMANENT_STATUSES:
+                self._failed_for_good.add(message_id)
+            print(f"Error fetching message {message_id}: {e}")
+            return None
+        except Exception as e:
+            print(f"Error fetching message {message_id}: {e}")
+            return None
+
+    def _get_request(self, message_id: str, fmt: str):
+        """Build (but don't execute) a messages.get request"""
+        if fmt == 'metadata':
+            return self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='metadata',
+                metadataHeaders=GATE_HEADERS
+            )
+        return self.service.users().messages().get(
+            userId='me',
+            id=message_id,
+            format=fmt
+        )
     
     def get_message_content(self, message_id: str) -> Dict[str, Any]:
         """
@@ -103,34 +584,37 @@ class GmailClient:
         Returns:
             Dictionary with email data and metadata
         """
-        try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=message_id,
-                format='full'
-            ).execute()
-            
-            # Extract headers
-            headers = {h['name']: h['value'] for h in message['payload']['headers']}
-            
-            # Parse key fields
-            email_data = {
-                'gmail_message_id': message['id'],
-                'thread_id': message['threadId'],
-                'subject': headers.get('Subject', ''),
-                'sender_email': self._extract_email(headers.get('From', '')),
-                'sender_name': self._extract_name(headers.get('From', '')),
-                'received_timestamp': self._parse_date(headers.get('Date', '')),
-                'headers': headers,
-                'html': self._get_html_content(message['payload']),
-                'text': self._get_text_content(message['payload'])
-            }
-            
-            return email_data
-            
-        except Exception as e:
-            print(f"Error fetching message {message_id}: {e}")
-            return None
+        message = self.cache.get(message_id, self.body_format) if self.cache else None
+        if message is None:
+            message = self._fetch_message(message_id, self.body_format)
+            if message and self.cache:
+                self.cache.put(message, self.body_format)
+        return self._parse_message(message) if message else None
+
+    def _parse_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a format='full', 'raw' or 'metadata' message resource into an email data dict"""
+        if 'raw' in message:
+            return parse_raw_message(
+                base64.urlsafe_b64decode(message['raw']),
+                message['id'],
+                message.get('threadId')
+            )
+
+        # Extract headers
+        headers = {h['name']: h['value'] for h in message['payload']['headers']}
+        
+        # Parse key fields
+        return {
+            'gmail_message_id': message['id'],
+            'thread_id': message['threadId'],
+            'subject': headers.get('Subject', ''),
+            'sender_email': self._extract_email(headers.get('From', '')),
+            'sender_name': self._extract_name(headers.get('From', '')),
+            'received_timestamp': self._parse_date(headers.get('Date', '')),
+            'headers': headers,
+            'html': self._get_html_content(message['payload']),
+            'text': self._get_text_content(message['payload'])
+        }
     
     def _get_html_content(self, payload: Dict) -> str:
         """Extract HTML content from email payload"""
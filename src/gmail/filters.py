@@ -5,6 +5,46 @@ Heuristics to identify and classify newsletters
 from typing import Dict, Any, Optional
 import re
 import config
+from src.phrases import PhraseMatcher, matcher_for
+
+
+# Every header the heuristics below read.  GmailClient fetches only these
+# (format='metadata') when deciding which message bodies to download.
+GATE_HEADERS = [
+    'From', 'Subject', 'Date',
+    'List-Unsubscribe', 'List-Unsubscribe-Post', 'Precedence',
+    'X-Mailer', 'Return-Path', 'Via',
+]
+
+# Common newsletter subject patterns, as one regex
+NEWSLETTER_SUBJECT = re.compile('|'.join([
+    r'newsletter',
+    r'digest',
+    r'weekly\s+update',
+    r'daily\s+brief',
+    r'this\s+week',
+    r'#\d+',  # Issue numbers
+]))
+
+# Common promotional senders
+SKIP_SENDERS = PhraseMatcher([
+    'noreply',
+    'no-reply',
+    'donotreply',
+    'notifications@',
+    'alerts@',
+    'digest@google',  # Google Alerts
+])
+
+# Subjects that say the email is not content
+SKIP_SUBJECTS = PhraseMatcher([
+    'verify your',
+    'reset password',
+    'confirm your',
+    'welcome to',
+    'receipt',
+    'invoice',
+])
 
 
 def is_newsletter(email_data: Dict[str, Any]) -> bool:
@@ -17,10 +57,33 @@ def is_newsletter(email_data: Dict[str, Any]) -> bool:
     Returns:
         True if email appears to be a newsletter
     """
+    if is_newsletter_by_headers(email_data):
+        return True
+    
+    # Heuristic 4: Multiple links + unsubscribe in HTML
+    html = email_data.get('html', '')
+    if html and 'unsubscribe' in html.lower():
+        link_count = len(re.findall(r'<a\s+(?:[^>]*?\s+)?href=', html, re.IGNORECASE))
+        if link_count > 3:
+            return True
+    
+    return False
+
+
+def is_newsletter_by_headers(email_data: Dict[str, Any]) -> bool:
+    """
+    The newsletter heuristics that need only headers, sender and subject
+    (everything except the HTML check in is_newsletter)
+    
+    Args:
+        email_data: Email data dictionary (html/text may be empty)
+        
+    Returns:
+        True if the headers alone mark the email as a newsletter
+    """
     headers = email_data.get('headers', {})
     subject = email_data.get('subject', '')
     sender_email = email_data.get('sender_email', '')
-    html = email_data.get('html', '')
     
     # Heuristic 1: List-Unsubscribe header (strong signal)
     if 'List-Unsubscribe' in headers or 'List-Unsubscribe-Post' in headers:
@@ -36,26 +99,9 @@ def is_newsletter(email_data: Dict[str, Any]) -> bool:
     if headers.get('Precedence', '').lower() == 'bulk':
         return True
     
-    # Heuristic 4: Multiple links + unsubscribe in HTML
-    if html and 'unsubscribe' in html.lower():
-        link_count = len(re.findall(r'<a\s+(?:[^>]*?\s+)?href=', html, re.IGNORECASE))
-        if link_count > 3:
-            return True
-    
     # Heuristic 5: Common newsletter subject patterns
-    newsletter_patterns = [
-        r'newsletter',
-        r'digest',
-        r'weekly\s+update',
-        r'daily\s+brief',
-        r'this\s+week',
-        r'#\d+',  # Issue numbers
-    ]
-    
-    subject_lower = subject.lower()
-    for pattern in newsletter_patterns:
-        if re.search(pattern, subject_lower):
-            return True
+    if NEWSLETTER_SUBJECT.search(subject.lower()):
+        return True
     
     # Heuristic 6: Via header (Substack pattern)
     via = headers.get('Via', '')
@@ -77,12 +123,12 @@ def detect_newsletter_service(sender_email: str, headers: Dict[str, str]) -> Opt
     Returns:
         Service name if detected, None otherwise
     """
-    sender_lower = sender_email.lower()
+    services = matcher_for(config.NEWSLETTER_SERVICES)
     
     # Check sender domain
-    for service in config.NEWSLETTER_SERVICES:
-        if service in sender_lower:
-            return service.split('.')[0]
+    service = services.first_in(sender_email)
+    if service:
+        return service.split('.')[0]
     
     # Check specific headers
     mailer = headers.get('X-Mailer', '').lower()
@@ -92,10 +138,9 @@ def detect_newsletter_service(sender_email: str, headers: Dict[str, str]) -> Opt
         return 'beehiiv'
     
     # Check return-path
-    return_path = headers.get('Return-Path', '').lower()
-    for service in config.NEWSLETTER_SERVICES:
-        if service in return_path:
-            return service.split('.')[0]
+    service = services.first_in(headers.get('Return-Path', ''))
+    if service:
+        return service.split('.')[0]
     
     return None
 
@@ -165,35 +210,6 @@ def should_skip_email(email_data: Dict[str, Any]) -> bool:
     Returns:
         True if email should be skipped
     """
-    subject = email_data.get('subject', '').lower()
-    sender = email_data.get('sender_email', '').lower()
-    
-    # Skip common promotional senders
-    skip_patterns = [
-        'noreply',
-        'no-reply',
-        'donotreply',
-        'notifications@',
-        'alerts@',
-        'digest@google'  # Google Alerts
-    ]
-    
-    for pattern in skip_patterns:
-        if pattern in sender:
-            return True
-    
-    # Skip if subject indicates it's not content
-    skip_subjects = [
-        'verify your',
-        'reset password',
-        'confirm your',
-        'welcome to',
-        'receipt',
-        'invoice'
-    ]
-    
-    for pattern in skip_subjects:
-        if pattern in subject:
-            return True
-    
-    return False
+    # Skip common promotional senders, and subjects that indicate it's not content
+    return (SKIP_SENDERS.any_in(email_data.get('sender_email', ''))
+            or SKIP_SUBJECTS.any_in(email_data.get('subject', '')))
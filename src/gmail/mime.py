@@ -0,0 +1,211 @@
+"""
+RFC 822 Message Parsing
+Turns raw message bytes (Gmail format='raw') into email data dicts
+"""
+import binascii
+import re
+from datetime import datetime
+from email import policy
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesParser, BytesHeaderParser
+from email.utils import parseaddr, parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+# compat32 keeps headers as plain strings.  policy.default builds a
+# structured header object every time a Content-Type is looked at, which
+# made parsing ~10x slower on typical newsletters; the few headers we
+# keep are read with raw_items() and decoded explicitly in _decode_header().
+_HEADER_PARSER = BytesHeaderParser(policy=policy.compat32)
+_PARSER = BytesParser(policy=policy.compat32)
+
+# The blank line ending a header block, whichever line endings either side uses
+_BLANK_LINE_RE = re.compile(rb'\r?\n\r?\n')
+
+# Line break + whitespace that continues a folded header line (RFC 5322 2.2.3)
+_FOLD_RE = re.compile(r'\r?\n(?=[ \t])')
+
+# Nested multiparts deeper than this go to the stdlib parser
+MAX_MIME_DEPTH = 8
+
+
+def parse_raw_message(raw: bytes, gmail_message_id: str,
+                      thread_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse a complete RFC 822 message in one pass
+
+    Bodies are found by splitting on MIME boundaries and transfer-decoded
+    with binascii, rather than fed line by line through email.feedparser.
+    Anything the splitter can't handle is re-parsed with the stdlib
+    BytesParser.
+
+    Args:
+        raw: Message bytes, already base64url-decoded
+        gmail_message_id: ID to store the message under
+        thread_id: Gmail thread ID, if known
+
+    Returns:
+        Email data dictionary with the same keys GmailClient produces
+        for format='full' messages
+    """
+    header_block, body = _split_head(raw)
+    message = _HEADER_PARSER.parsebytes(header_block)
+    headers = {name: _decode_header(value) for name, value in message.raw_items()}
+    sender_name, sender_email = parseaddr(headers.get('From', ''))
+
+    found: Dict[str, str] = {}
+    try:
+        _collect_bodies(message, body, found, depth=0)
+    except (ValueError, LookupError, binascii.Error):
+        found = _collect_bodies_stdlib(raw)
+
+    return {
+        'gmail_message_id': gmail_message_id,
+        'thread_id': thread_id,
+        'subject': headers.get('Subject', ''),
+        'sender_email': sender_email,
+        'sender_name': sender_name,
+        'received_timestamp': _parse_date(headers.get('Date', '')),
+        'headers': headers,
+        'html': found.get('text/html', ''),
+        'text': found.get('text/plain', ''),
+    }
+
+
+def parse_raw_headers(raw: bytes) -> Dict[str, str]:
+    """Decoded headers of a raw message, as parse_raw_message gives them; the body is not read"""
+    header_block, _ = _split_head(raw)
+    return {name: _decode_header(value)
+            for name, value in _HEADER_PARSER.parsebytes(header_block).raw_items()}
+
+
+def _split_head(raw: bytes) -> Tuple[bytes, bytes]:
+    """Split an entity into (header block, body) at the first blank line"""
+    if raw.startswith((b'\n', b'\r\n')):
+        # No headers: everything after the leading blank line is body
+        return b'', raw[raw.index(b'\n') + 1:]
+    match = _BLANK_LINE_RE.search(raw)
+    if match is None:
+        return raw, b''
+    return raw[:match.end()], raw[match.end():]
+
+
+def _collect_bodies(part: Message, body: bytes, found: Dict[str, str], depth: int):
+    """
+    Record the first inline text/html and text/plain leaves under `part`
+    into `found`, recursing through multipart containers
+    """
+    if len(found) == 2:
+        return
+
+    content_type = part.get_content_type()
+
+    if content_type.startswith('multipart/'):
+        boundary = part.get_param('boundary')
+        if not boundary or depth >= MAX_MIME_DEPTH:
+            raise ValueError('unsupported multipart structure')
+        sections = _split_on_delimiter(b'\n' + body, b'\n--' + str(boundary).encode('ascii'))
+        # sections[0] is the preamble; the closing delimiter's section starts with '--'
+        for section in sections[1:]:
+            if section.startswith(b'--'):
+                break
+            # Drop the rest of the delimiter line (transport padding + newline)
+            child_raw = section.split(b'\n', 1)[1] if b'\n' in section else b''
+            # A part with no headers defaults to text/plain (RFC 2046)
+            child_head, child_body = _split_head(child_raw)
+            child = _HEADER_PARSER.parsebytes(child_head)
+            _collect_bodies(child, child_body.rstrip(b'\r'), found, depth + 1)
+        return
+
+    if content_type not in ('text/html', 'text/plain') or content_type in found:
+        return
+    if (part.get('Content-Disposition') or '').lower().startswith('attachment'):
+        return
+
+    found[content_type] = _decode_text(_transfer_decode(part, body), part)
+
+
+# What follows a real delimiter: "--" (the close delimiter), or transport
+# padding and the line end (RFC 2046 5.1.1)
+_DELIMITER_END_RE = re.compile(rb'--|[ \t]*(?:\r?\n|$)')
+
+
+def _split_on_delimiter(body: bytes, delimiter: bytes) -> List[bytes]:
+    """
+    body.split(delimiter), keeping only the splits that are whole delimiter
+    lines – so a boundary "b1" never splits on a nested "--b1_alt"
+    """
+    pieces = body.split(delimiter)
+    sections = pieces[:1]
+    for piece in pieces[1:]:
+        if _DELIMITER_END_RE.match(piece):
+            sections.append(piece)
+        else:
+            sections[-1] += delimiter + piece
+    return sections
+
+
+def _transfer_decode(part: Message, body: bytes) -> bytes:
+    cte = str(part.get('Content-Transfer-Encoding', '')).strip().lower()
+    if cte == 'base64':
+        return binascii.a2b_base64(body)
+    if cte == 'quoted-printable':
+        return binascii.a2b_qp(body)
+    return body
+
+
+def _collect_bodies_stdlib(raw: bytes) -> Dict[str, str]:
+    """Slow path: full email.parser walk for messages the splitter rejects"""
+    found: Dict[str, str] = {}
+    for part in _PARSER.parsebytes(raw).walk():
+        content_type = part.get_content_type()
+        if part.is_multipart() or content_type in found:
+            continue
+        if content_type not in ('text/html', 'text/plain'):
+            continue
+        if (part.get('Content-Disposition') or '').lower().startswith('attachment'):
+            continue
+        found[content_type] = _decode_text(part.get_payload(decode=True) or b'', part)
+    return found
+
+
+def _decode_text(payload: bytes, part: Message) -> str:
+    """Decode a leaf body with the charset its Content-Type declares"""
+    charset = part.get_content_charset() or 'utf-8'
+    try:
+        return payload.decode(charset, errors='replace')
+    except LookupError:
+        # Unknown charset name
+        return payload.decode('utf-8', errors='replace')
+
+
+def _decode_header(value: Any) -> str:
+    """
+    Unfold a header value, decode raw 8-bit bytes as UTF-8 (RFC 6532) and
+    RFC 2047 encoded-words (=?utf-8?...?=)
+    """
+    value = str(value)
+    if '\n' in value:
+        # compat32 keeps folding line breaks; Gmail's JSON headers don't
+        value = _FOLD_RE.sub('', value)
+    if not value.isascii():
+        # The parser keeps 8-bit bytes as surrogate escapes
+        raw = value.encode('ascii', 'surrogateescape')
+        try:
+            value = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            value = raw.decode('latin-1')
+    if '=?' not in value:
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except (LookupError, UnicodeError, ValueError):
+        return value
+
+
+def _parse_date(date_str: str) -> str:
+    """Parse email date to ISO format"""
+    try:
+        return parsedate_to_datetime(date_str).isoformat()
+    except (TypeError, ValueError, IndexError):
+        return datetime.now().isoformat()
@@ -0,0 +1,86 @@
+"""
+Gmail quota pacing.
+
+Gmail meters every call in "quota units" against a per-user budget
+(250 units/second at the time of writing).  TokenBucket spends those units
+up front so the fetch paths never outrun the budget, and
+AdaptiveConcurrency shrinks the number of in-flight requests when Gmail
+pushes back with 429/5xx anyway.
+"""
+import threading
+import time
+from typing import Optional
+
+# Cost of each Gmail method we call, in quota units.  A batch request is
+# charged per inner call, not per HTTP round trip.
+QUOTA_UNITS = {
+    'messages.get':  5,
+    'messages.list': 5,
+    'history.list':  2,
+    'getProfile':    1,
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket measured in quota units.
+
+    acquire() reserves units immediately (the balance may go negative) and
+    then sleeps off any debt, so requests bigger than one second's worth of
+    budget – a 100-message batch is 500 units – still go through, just
+    paced.  A rate of None disables pacing.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else (rate or 0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units: float = 1) -> float:
+        """
+        Spend `units`, blocking until the budget covers them.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.rate:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= units
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight requests.
+
+    Halves the limit on every throttling response, and grows it by one
+    after a full window (`limit` successes in a row), up to `maximum`.
+    Only the scheduling thread touches it, so it needs no locking.
+    """
+
+    def __init__(self, maximum: int):
+        self.maximum = max(1, maximum)
+        self.limit = self.maximum
+        self._streak = 0
+
+    def on_success(self):
+        self._streak += 1
+        if self.limit < self.maximum and self._streak >= self.limit:
+            self.limit += 1
+            self._streak = 0
+
+    def on_throttle(self):
+        self.limit = max(1, self.limit // 2)
+        self._streak = 0
@@ -8,28 +8,73 @@ Normal run (daily, triggered by cron or GitHub Actions):
 Backfill run (seed the archive with older newsletters — one-time use):
     python src/main.py --backfill 30        # last 30 days
 
+Replay (rebuild a past digest offline – no Gmail, no Claude, no DB writes):
+    python src/main.py --replay 2026-02-03
+
+Import a local archive instead of reading Gmail (mbox, Maildir or .eml dir):
+    python src/main.py --source ~/Takeout/newsletters.mbox
+    python src/main.py --source ~/Maildir --backfill 365   # last year only
+
+Search every article ever stored (full-text, best match first):
+    python src/main.py --search "open source llm"
+    python src/main.py --search "chip export" --since 2026-01-01
+
+Show the database's query plans (schema version, and which index each
+query method uses):
+    python src/main.py --explain
+
 Pipeline (7 steps)
 ------------------
-1. Fetch      – pull new emails from Gmail
+1. Fetch      – pull new emails from Gmail (headers first; bodies only
+                for messages that look like newsletters)
 2. Persist    – store in DB, filter to newsletters only
 3. Extract    – pull articles out of each newsletter; each article is
                 tagged 'essay' or 'link' at this stage
-4. Summarise  – ONE batched Claude call for all essays.
+4. Summarise  – batched Claude calls (ESSAY_BATCH_SIZE essays each).
                 Link articles skip this entirely — their blurb IS the summary.
-5. Categorise – ONE batched Claude call for all link articles.
+5. Categorise – batched Claude calls (LINK_BATCH_SIZE links each).
                 Essays are hardcoded into the "Essays" bin.
 6. Assemble   – build the digest payload organised by category
 7. Render & deliver – Jinja2 → HTML → email (suppressed in backfill mode)
 
+Steps 1–5 run concurrently as a staged pipeline (src/pipeline.py): emails
+flow through bounded queues from fetch to gate to extraction workers, and
+each Claude batch goes out as soon as it fills.  Each email's HTML is
+dropped once its articles are out, so memory stays flat however long the
+backfill window is.  Per-stage throughput and queue depth are printed at
+the end of step 5.
+
+Incremental sync
+----------------
+Daily runs list new mail through the Gmail history API, resuming from the
+historyId stored in sync_state at the end of the previous run.  The first
+run, backfills, and runs whose checkpoint has expired use the `after:`
+time-window scan instead.
+
+Replay
+------
+Every run records the ordered list of newsletter message IDs it digested
+in cache/runs/<date>.json.  `--replay <date>` loads those messages from the
+message cache and re-runs steps 3–7 with Claude answering only from its
+response cache (a prompt that was never sent falls back to "Summary
+unavailable." / "Other").  The digest files for that date are rewritten and
+per-step timings printed, which makes it the tool for profiling the
+extractor and templates and for regenerating the archive after a template
+change.
+
 Duplicate guard
 ---------------
-GmailClient.get_messages_since() already skips message IDs that are in
-processed_emails.  A second check lives in step 2 as a belt-and-suspenders
-measure.
+The source's iter_messages_since() (GmailClient or LocalMailSource)
+already skips message IDs that are in processed_emails.  The gate in step 2
+checks each batch again with filter_unprocessed() as a belt-and-suspenders
+measure, which also drops a message that appears twice in one batch.
 """
 import argparse
+import json
 import sys
+import time
 from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -41,20 +86,25 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 import config
+from src.database.migrations import SCHEMA_VERSION, schema_version
 from src.database.models import Database
 from src.gmail.auth import get_gmail_credentials
+from src.gmail.cache import MessageCache
 from src.gmail.client import GmailClient
-from src.gmail.filters import is_newsletter, should_skip_email, extract_newsletter_name
+from src.pipeline import DigestPipeline
 from src.processors.extractor import ArticleExtractor
+from src.sources import LocalMailSource, MessageSource
+from src.claude import api_helpers
 from src.claude.categorizer import TopicCategorizer
 from src.claude.summarizer import DigestSummarizer
 from src.generator.digest import DigestGenerator
 
 
 class NewsletterDigestApp:
-    def __init__(self):
+    def __init__(self, source: Optional[MessageSource] = None):
         self.db         = Database()
         self._gmail     = None                   # lazy – see property
+        self._source    = source                 # None = read from Gmail
         self.extractor  = ArticleExtractor()
         self.categorizer = TopicCategorizer()
         self.summarizer = DigestSummarizer()
@@ -64,113 +114,217 @@ class NewsletterDigestApp:
     def gmail(self) -> GmailClient:
         """Lazy-init so the app can be imported without creds."""
         if self._gmail is None:
-            self._gmail = GmailClient(get_gmail_credentials())
+            self._gmail = GmailClient(get_gmail_credentials(), db_path=self.db.db_path)
         return self._gmail
 
+    @property
+    def source(self) -> MessageSource:
+        """Where step 1 reads emails from: a local archive, or Gmail."""
+        return self._source if self._source is not None else self.gmail
+
     # ==================================================================
     # Main entry point
     # ==================================================================
-    def run(self, hours_back: int = config.DEFAULT_LOOKBACK_HOURS,
+    def run(self, hours_back: Optional[int] = config.DEFAULT_LOOKBACK_HOURS,
             backfill: bool = False) -> Optional[str]:
         """
         Full pipeline.
 
+        hours_back=None reads everything the source has (local archives only).
+
         Returns:
             Path to the generated digest HTML, or None if nothing to digest.
         """
-        mode_label = f"BACKFILL ({hours_back} h)" if backfill else "DAILY"
+        started = datetime.now()
+        window = 'all' if hours_back is None else f"{hours_back} h"
+        mode_label = f"BACKFILL ({window})" if backfill else "DAILY"
         print(f"\n{'=' * 56}")
         print(f"  Newsletter Digest \u2013 {mode_label} run")
-        print(f"  Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"  Started: {started.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'=' * 56}\n")
 
         # ----------------------------------------------------------
-        # 1. Fetch
+        # 1–5. Fetch → persist & gate → extract → summarise / categorise
         # ----------------------------------------------------------
-        print("\U0001f4e5 Step 1 \u2013 Fetching emails \u2026")
-        raw_emails = self.gmail.get_messages_since(hours=hours_back)
-
-        if not raw_emails:
+        print("\U0001f4e5 Steps 1\u20135 \u2013 Fetch, filter, extract, summarise & categorise \u2026")
+        pipeline = DigestPipeline(self.extractor, self.summarizer, self.categorizer, db=self.db)
+        result = pipeline.run(self.source.iter_messages_since(
+            hours=hours_back,
+            incremental=config.GMAIL_INCREMENTAL_SYNC and not backfill
+        ))
+        # run() raised if any email failed to store, so all of them are in
+        self.source.commit_checkpoint(self.db)
+        self.extractor.url_cache.save()
+
+        gate = result['gate']
+        if not gate['emails']:
             print("\n\u270b No new emails.  Nothing to do.")
             self.db.close()
             return None
 
-        # ----------------------------------------------------------
-        # 2. Persist & newsletter gate
-        # ----------------------------------------------------------
-        print(f"\n\U0001f4cb Step 2 \u2013 Persisting & filtering newsletters \u2026")
-        newsletters: List[Dict[str, Any]] = []
-        skipped_dupe  = 0
-        skipped_noise = 0
-
-        for email in raw_emails:
-            if self.db.check_if_processed(email['gmail_message_id']):
-                skipped_dupe += 1
-                continue
-            if should_skip_email(email):
-                skipped_noise += 1
-                continue
-            if not is_newsletter(email):
-                email['is_newsletter'] = False
-                self.db.store_email(email)
-                continue
-
-            email['is_newsletter'] = True
-            self.db.store_email(email)
-            newsletters.append(email)
-
-        print(f"  newsletters to process : {len(newsletters)}")
-        print(f"  skipped (duplicate)    : {skipped_dupe}")
-        print(f"  skipped (noise)        : {skipped_noise}")
-
-        if not newsletters:
+        print(f"\n  newsletters processed    : {len(result['newsletter_ids'])}")
+        print(f"  skipped (duplicate)      : {gate['duplicate']}")
+        print(f"  skipped (noise)          : {gate['noise']}")
+
+        if not result['newsletter_ids']:
             print("\n\u270b No new newsletters found.  Nothing to digest.")
             self.db.close()
             return None
 
+        self._report_pipeline(pipeline, result)
+        self._save_replay_manifest(started, result['newsletter_ids'])
+
+        digest_data = self._assemble(result, started)
+        if digest_data is None:
+            self.db.close()
+            return None
+
         # ----------------------------------------------------------
-        # 3. Extract & classify (essay vs link)
+        # 7. Render & deliver
         # ----------------------------------------------------------
-        print(f"\n\U0001f4dd Step 3 \u2013 Extracting articles \u2026")
-        all_articles: List[Dict[str, Any]] = []
-
-        for nl in newsletters:
-            articles = self.extractor.extract_from_email(
-                html_content=nl.get('html', ''),
-                newsletter_name=extract_newsletter_name(nl),
-                newsletter_email=nl.get('sender_email', ''),
-                received_timestamp=nl.get('received_timestamp', '')
-            )
-            email_row_id = self._get_email_row_id(nl['gmail_message_id'])
-            for a in articles:
-                a['db_id'] = self.db.store_article(a, email_row_id)
-            all_articles.extend(articles)
-
-        if not all_articles:
-            print("\n\u270b No articles extracted.  Nothing to digest.")
+        print(f"\n\U0001f5ea  Step 7 \u2013 Generating HTML \u2026")
+        paths = self.generator.generate_and_save(digest_data, started.strftime('%Y-%m-%d'))
+        self.db.store_digest(digest_data, paths)
+
+        if not backfill:
+            print(f"\n\U0001f4e7 Sending digest email \u2026")
+            self._send_digest(paths['email_path'])
+        else:
+            print(f"\n\u23ed  Skipped email send (backfill mode)")
+
+        print(f"\n{'=' * 56}")
+        print(f"  \u2705 Done!  Digest at: {paths['webpage_path']}")
+        print(f"{'=' * 56}\n")
+
+        self.db.close()
+        return paths['webpage_path']
+
+    # ==================================================================
+    # Replay
+    # ==================================================================
+    def replay(self, digest_date: str) -> Optional[str]:
+        """
+        Rebuild the digest for a past run from cached data only.
+
+        Loads the newsletters recorded for `digest_date` (YYYY-MM-DD) from
+        the message cache and re-runs steps 3–7 with Claude restricted to
+        its response cache, printing per-stage timings.  Nothing is written to the database and no
+        email is sent; the digest files for that date are overwritten.
+
+        Returns:
+            Path to the regenerated digest HTML, or None if the run can't
+            be replayed.
+        """
+        print(f"\n{'=' * 56}")
+        print(f"  Newsletter Digest \u2013 REPLAY of {digest_date}")
+        print(f"{'=' * 56}\n")
+
+        manifest = _load_replay_manifest(digest_date)
+        if manifest is None:
+            print(f"\u270b No recorded run for {digest_date} in {config.REPLAY_MANIFEST_DIR}.")
             self.db.close()
             return None
 
-        # Split into the two streams
-        essays = [a for a in all_articles if a.get('article_type') == 'essay']
-        links  = [a for a in all_articles if a.get('article_type') == 'link']
-        print(f"  total articles extracted : {len(all_articles)}")
-        print(f"    essays                 : {len(essays)}")
-        print(f"    links                  : {len(links)}")
+        api_helpers.OFFLINE = True
+        timings: Dict[str, float] = {}
 
-        # ----------------------------------------------------------
-        # 4. Summarise essays  (one batched Claude call)
-        # ----------------------------------------------------------
-        print(f"\n\u270d  Step 4 \u2013 Summarising essays \u2026")
-        essays = self.summarizer.summarize_essays(essays)
-        print(f"  essays summarised      : {len(essays)}")
+        print(f"\U0001f4dd Re-running steps 3\u20135 on {len(manifest['message_ids'])} cached newsletters \u2026")
+        gmail = GmailClient(fetch_mode='offline', cache=MessageCache(),
+                            body_format=manifest['body_format'])
+        # Stored summaries / categories are read, as the recorded run read
+        # them, so the batches sent to the Claude cache are the same
+        pipeline = DigestPipeline(self.extractor, self.summarizer, self.categorizer,
+                                  enrichments_from=self.db.db_path)
+        result = pipeline.run(gmail.iter_messages_content(manifest['message_ids']))
 
-        # ----------------------------------------------------------
-        # 5. Categorise links  (one batched Claude call)
-        # ----------------------------------------------------------
-        print(f"\n\U0001f3f7  Step 5 \u2013 Categorising link articles \u2026")
-        category_map = self.categorizer.categorize_articles(links)
-        # category_map is {index_within_links_list: category_string}
+        if not result['newsletter_ids']:
+            print("\n\u270b None of the recorded messages are cached.  Nothing to replay.")
+            self.db.close()
+            return None
+
+        self._report_pipeline(pipeline, result)
+
+        day = datetime.strptime(digest_date, '%Y-%m-%d')
+        with _timed(timings, 'assemble'):
+            digest_data = self._assemble(result, day)
+        if digest_data is None:
+            self.db.close()
+            return None
+
+        print(f"\n\U0001f5ea  Step 7 \u2013 Generating HTML \u2026")
+        with _timed(timings, 'render'):
+            paths = self.generator.generate_and_save(digest_data, digest_date)
+
+        for step, secs in timings.items():
+            print(f"  {step:<11}: {secs * 1000:9.1f} ms")
+
+        self.db.close()
+        return paths['webpage_path']
+
+    # ==================================================================
+    # Search
+    # ==================================================================
+    def search(self, query: str, since: Optional[str] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """Print (and return) the archive's best full-text matches for query"""
+        started = time.perf_counter()
+        results = self.db.search_articles(query, since=since, limit=limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        scope = f" since {since}" if since else ""
+        print(f"\n\U0001f50e {len(results)} result(s) for \"{query}\"{scope}  ({elapsed_ms:.1f} ms)\n")
+        for rank, article in enumerate(results, 1):
+            received = (article['received_timestamp'] or '')[:10]
+            print(f"{rank:>3}. {article['title']}")
+            print(f"     {article['newsletter_name']} \u00b7 {received} \u00b7 {article['url']}")
+            if article['snippet']:
+                print(f"     {article['snippet']}")
+            print()
+
+        self.db.close()
+        return results
+
+    def explain(self):
+        """Print the query plan of every database read method"""
+        version = schema_version(self.db.conn)
+        print(f"\nDatabase {self.db.db_path}  (schema v{version} of v{SCHEMA_VERSION})\n")
+        for call, statements in self.db.explain_queries().items():
+            print(f"{call}")
+            if not statements:
+                print("    (no SQL \u2013 answered in memory)")
+            for sql, plan in statements:
+                shown = sql if len(sql) <= 100 else sql[:100] + ' \u2026'
+                print(f"    {shown}")
+                for line in plan:
+                    print(f"      {line}")
+            print()
+        self.db.close()
+
+    # ==================================================================
+    # Step 6 (shared by run and replay)
+    # ==================================================================
+    @staticmethod
+    def _report_pipeline(pipeline: DigestPipeline, result: Dict[str, Any]):
+        print(f"  total articles extracted : {len(result['articles'])}")
+        print(f"    essays (summarised)    : {len(result['essays'])}")
+        print(f"    links (categorised)    : {len(result['links'])}")
+        url_cache = getattr(pipeline.extractor, 'url_cache', None)
+        if url_cache is not None and url_cache.hits + url_cache.misses:
+            print(f"  URL verdict cache        : {url_cache.hit_rate:.0%} hits "
+                  f"({url_cache.hits} of {url_cache.hits + url_cache.misses}, {len(url_cache)} URLs)")
+        print(f"\n\u23f1  Pipeline stages")
+        pipeline.print_stats()
+
+    def _assemble(self, result: Dict[str, Any], digest_day: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Build the digest payload from a pipeline result (step 6).
+
+        Returns:
+            digest_data for the generator, or None if there are no articles.
+        """
+        if not result['articles']:
+            print("\n\u270b No articles extracted.  Nothing to digest.")
+            return None
 
         # ----------------------------------------------------------
         # 6. Assemble digest payload
@@ -185,7 +339,7 @@ class NewsletterDigestApp:
             sections[section_name] = []
 
         # Drop essays into the Essays section
-        for essay in essays:
+        for essay in result['essays']:
             sections['Essays'].append({
                 'title':           essay.get('title', 'Untitled'),
                 'url':             essay.get('url', ''),
@@ -195,9 +349,8 @@ class NewsletterDigestApp:
             })
 
         # Drop links into their categorised buckets
-        for i, link in enumerate(links):
-            cat = category_map.get(i, 'Other')
-            sections[cat].append({
+        for link in result['links']:
+            sections[link.get('category', 'Other')].append({
                 'title':           link.get('title', 'Untitled'),
                 'url':             link.get('url', ''),
                 'blurb':           link.get('blurb', ''),
@@ -210,33 +363,21 @@ class NewsletterDigestApp:
             (k, v) for k, v in sections.items() if v
         )
 
-        digest_data = {
-            "date":             datetime.now().strftime('%B %d, %Y'),
-            "total_articles":   len(all_articles),
-            "newsletter_count": len(newsletters),
+        # What store_digest records in digest_articles (stored articles
+        # only – a replay writes nothing, so its articles have no db_id)
+        all_articles = [{'id': essay['db_id'], 'section': 'Essays'}
+                        for essay in result['essays'] if 'db_id' in essay]
+        all_articles += [{'id': link['db_id'], 'section': link.get('category', 'Other')}
+                         for link in result['links'] if 'db_id' in link]
+
+        return {
+            "date":             digest_day.strftime('%B %d, %Y'),
+            "total_articles":   len(result['articles']),
+            "newsletter_count": len(result['newsletter_ids']),
             "sections":         sections,   # the single source of truth for the template
+            "all_articles":     all_articles,
         }
 
-        # ----------------------------------------------------------
-        # 7. Render & deliver
-        # ----------------------------------------------------------
-        print(f"\n\U0001f5ea  Step 7 \u2013 Generating HTML \u2026")
-        paths = self.generator.generate_and_save(digest_data)
-        self.db.store_digest(digest_data, paths)
-
-        if not backfill:
-            print(f"\n\U0001f4e7 Sending digest email \u2026")
-            self._send_digest(paths['email_path'])
-        else:
-            print(f"\n\u23ed  Skipped email send (backfill mode)")
-
-        print(f"\n{'=' * 56}")
-        print(f"  \u2705 Done!  Digest at: {paths['webpage_path']}")
-        print(f"{'=' * 56}\n")
-
-        self.db.close()
-        return paths['webpage_path']
-
     # ==================================================================
     # Email delivery
     # ==================================================================
@@ -264,14 +405,43 @@ class NewsletterDigestApp:
     # ==================================================================
     # Helpers
     # ==================================================================
-    def _get_email_row_id(self, gmail_message_id: str) -> int:
-        cursor = self.db.conn.cursor()
-        cursor.execute(
-            'SELECT id FROM processed_emails WHERE gmail_message_id = ?',
-            (gmail_message_id,)
-        )
-        row = cursor.fetchone()
-        return row['id'] if row else 0
+    def _save_replay_manifest(self, started: datetime, newsletter_ids: List[str]):
+        """Record which newsletters this run digested, in order, for --replay"""
+        if not config.MESSAGE_CACHE_ENABLED or self._source is not None:
+            return      # replay reads the Gmail message cache only
+        digest_date = started.strftime('%Y-%m-%d')
+        path = _replay_manifest_path(digest_date)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            'date':        digest_date,
+            'body_format': self.gmail.body_format,
+            'message_ids': newsletter_ids,
+        }, indent=2), encoding='utf-8')
+
+
+# ==================================================================
+# Module helpers
+# ==================================================================
+@contextmanager
+def _timed(timings: Optional[Dict[str, float]], step: str):
+    """Add the wall time of the block to timings[step] (no-op if None)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[step] = timings.get(step, 0.0) + time.perf_counter() - started
+
+
+def _replay_manifest_path(digest_date: str) -> Path:
+    return Path(config.REPLAY_MANIFEST_DIR) / f"{digest_date}.json"
+
+
+def _load_replay_manifest(digest_date: str) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(_replay_manifest_path(digest_date).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
 
 
 # ==================================================================
@@ -289,14 +459,59 @@ def parse_args() -> argparse.Namespace:
             "Example: --backfill 30"
         )
     )
+    parser.add_argument(
+        '--replay', default=None, metavar='YYYY-MM-DD',
+        help=(
+            "Rebuild the digest of a past run from the message and Claude "
+            "caches, fully offline, and print per-step timings."
+        )
+    )
+    parser.add_argument(
+        '--search', default=None, metavar='QUERY',
+        help=(
+            "Search the article archive for QUERY (all words must match) "
+            "and print the best matches instead of running the digest."
+        )
+    )
+    parser.add_argument(
+        '--since', default=None, metavar='YYYY-MM-DD',
+        help="With --search: only articles received on or after this date."
+    )
+    parser.add_argument(
+        '--explain', action='store_true',
+        help=(
+            "Print EXPLAIN QUERY PLAN for every database query method and "
+            "exit (a quick check that no query scans a whole table)."
+        )
+    )
+    parser.add_argument(
+        '--source', default=None, metavar='PATH',
+        help=(
+            "Read newsletters from a local mail archive (mbox file, Maildir, "
+            "or a directory of .eml files) instead of Gmail.  Imports the "
+            "whole archive unless --backfill limits it; email delivery is "
+            "suppressed."
+        )
+    )
     return parser.parse_args()
 
 
 if __name__ == '__main__':
     args = parse_args()
-    app  = NewsletterDigestApp()
+    app  = NewsletterDigestApp(
+        source=LocalMailSource(args.source) if args.source else None
+    )
 
-    if args.backfill is not None:
+    if args.explain:
+        app.explain()
+    elif args.search is not None:
+        app.search(args.search, since=args.since)
+    elif args.replay is not None:
+        app.replay(args.replay)
+    elif args.source is not None:
+        hours = args.backfill * 24 if args.backfill is not None else None
+        app.run(hours_back=hours, backfill=True)
+    elif args.backfill is not None:
         app.run(hours_back=args.backfill * 24, backfill=True)
     else:
         app.run()
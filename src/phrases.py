@@ -0,0 +1,79 @@
+"""
+Compiled Phrase Matching
+========================
+
+The gate and the extractor ask "does this text contain any of these
+phrases?" for every email, every anchor and every article – noise links,
+paywall wording, skip-worthy senders and subjects.  A PhraseMatcher is
+built once per phrase list and answers that in one pass:
+
+  short text   one regex whose alternatives share common prefixes (a
+               trie: "p(?:aywall|remium ...)"), so each position of the
+               text is tried against one branch per distinct next
+               character rather than once per phrase
+  long text    one `in` per phrase.  CPython's substring search skips
+               through the text faster than any regex can walk it, so
+               past LONG_TEXT characters the per-phrase scan is quicker
+               (benchmarks/bench_phrase_matching.py measures the crossover)
+
+Phrases and text are compared lowercased.  matcher_for() caches a matcher
+per phrase list, for lists that live in config and are read at call time.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class PhraseMatcher:
+    # Longer than this, one substring search per phrase beats the regex
+    LONG_TEXT = 96
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: Tuple[str, ...] = tuple(dict.fromkeys(p.lower() for p in phrases if p))
+        # (?!) never matches: an empty list matches nothing
+        self._regex = re.compile(_trie_pattern(self.phrases) or '(?!)')
+
+    def any_in(self, text: str) -> bool:
+        """True if text contains any of the phrases"""
+        text = text.lower()
+        if len(text) > self.LONG_TEXT:
+            return any(phrase in text for phrase in self.phrases)
+        return self._regex.search(text) is not None
+
+    def first_in(self, text: str) -> Optional[str]:
+        """The phrase found earliest in text (the longest, on a tie), or None"""
+        match = self._regex.search(text.lower())
+        return match.group() if match else None
+
+    def __repr__(self) -> str:
+        return f'PhraseMatcher({list(self.phrases)!r})'
+
+
+@lru_cache(maxsize=64)
+def _matcher_for(phrases: Tuple[str, ...]) -> PhraseMatcher:
+    return PhraseMatcher(phrases)
+
+
+def matcher_for(phrases: Iterable[str]) -> PhraseMatcher:
+    """A PhraseMatcher for phrases, built the first time this list is seen"""
+    return _matcher_for(tuple(phrases))
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}               # a phrase ends here
+
+    def branch(node: Dict[str, dict]) -> str:
+        arms = [re.escape(char) + branch(child)
+                for char, child in sorted(node.items()) if char]
+        if not arms:
+            return ''
+        pattern = arms[0] if len(arms) == 1 else '(?:' + '|'.join(arms) + ')'
+        # Greedy, so a longer phrase wins over one that is its prefix
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return branch(trie)
@@ -0,0 +1,561 @@
+"""
+Staged Digest Pipeline
+=======================
+
+Steps 1–5 of a digest run as concurrent stages joined by bounded queues:
+
+    source ─▶ fetch ─q─▶ gate ─q─▶ extract ×N ─q─▶ route ─▶ Claude ×M
+              thread     thread     threads        caller    thread pool
+
+  fetch    – pulls emails from the MessageSource
+  gate     – duplicate / noise / newsletter checks; persists every email,
+             one transaction for whatever has queued up since the last
+             (skipped for replays, whose input is already the newsletters).
+             A transaction that fails stops the run: fetching ends and
+             run() raises, rather than digesting without those emails
+  extract  – ArticleExtractor, one newsletter per task; the newsletter's
+             HTML is dropped as soon as its articles are out.  With
+             PIPELINE_EXTRACT_PROCESSES set, one thread feeds an
+             ExtractorPool (processors/pool.py) instead, in chunks of
+             whatever is waiting, so parsing uses more than one core
+  route    – puts newsletters back in arrival order, stores their articles
+             DB_WRITE_BATCH_SIZE at a time, and fills the essay and link
+             batches.  Each batch is sent to
+             Claude the moment it is full, while extraction carries on
+  summarise / categorise – the batched Claude calls.  Articles that
+             already have a summary / category from the same model and prompt
+             version (article_enrichments, keyed by URL, title and body)
+             take the stored one instead;
+             fresh results are stored for next time.  A replay reads them
+             too, without storing, so its batches match the recorded run's
+
+A full queue makes the stage feeding it wait, so no stage runs more than
+PIPELINE_QUEUE_SIZE items ahead of the next and memory stays bounded.  Wall
+time approaches that of the slowest stage instead of the sum of all of them.
+
+Batches are formed in arrival order, never completion order, so the same
+input always produces the same Claude prompts (which is what lets --replay
+hit the response cache).
+"""
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Queue
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import config
+from src.claude.api_helpers import ClaudeCacheMiss
+from src.claude.summarizer import UNAVAILABLE
+from src.database.blobs import content_hash
+from src.database.connection import statement_counts
+from src.database.models import Database
+from src.gmail.filters import is_newsletter, should_skip_email, extract_newsletter_name
+from src.processors.pool import ExtractorPool
+
+# End-of-stream marker passed down each queue
+_DONE = object()
+
+
+def enrichment_key(article: Dict[str, Any]) -> str:
+    """
+    article_enrichments key for an article.  The body alone isn't enough:
+    links cut from one block share their text.
+    """
+    return content_hash('\0'.join((article.get('url') or '', article.get('title') or '',
+                                    article['content'])))
+
+
+class StageStats:
+    """Items handled, busy time, SQL statements and input-queue depth for one stage"""
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_secs = 0.0
+        self.reads = 0
+        self.writes = 0
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+        self._lock = threading.Lock()
+
+    def record(self, secs: float, items: int = 1):
+        with self._lock:
+            self.items += items
+            self.busy_secs += secs
+
+    def record_queries(self, reads: int, writes: int):
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+
+    def sample_depth(self, depth: int):
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+            self._depth_total += depth
+            self._depth_samples += 1
+
+    @property
+    def mean_depth(self) -> float:
+        return self._depth_total / self._depth_samples if self._depth_samples else 0.0
+
+
+class DigestPipeline:
+    def __init__(self, extractor, summarizer, categorizer,
+                 db: Optional[Database] = None,
+                 enrichments_from: Optional[Path] = None,
+                 extract_workers: Optional[int] = None,
+                 extract_processes: Optional[int] = None,
+                 claude_workers: Optional[int] = None,
+                 queue_size: Optional[int] = None,
+                 essay_batch_size: Optional[int] = None,
+                 link_batch_size: Optional[int] = None,
+                 db_write_batch_size: Optional[int] = None):
+        """
+        Args:
+            extractor, summarizer, categorizer: The app's step 3–5 workers
+            db: Connection the routing stage stores articles through.  None
+                means a replay: no gate, nothing written.
+            enrichments_from: For a replay, the database whose stored
+                summaries and categories are read (never written), so each
+                Claude batch holds the same misses as the recorded run's and
+                its prompt is found in the response cache.
+            extract_processes: Worker processes for step 3; 0 extracts on
+                extract_workers threads instead.
+            Remaining args default to the PIPELINE_* / *_BATCH_SIZE settings.
+        """
+        self.extractor = extractor
+        self.summarizer = summarizer
+        self.categorizer = categorizer
+        self.db = db
+        self.enrichments_from = enrichments_from
+        self.extract_workers = max(1, extract_workers or config.PIPELINE_EXTRACT_WORKERS)
+        if extract_processes is None:
+            extract_processes = config.PIPELINE_EXTRACT_PROCESSES
+        self.extract_processes = max(0, extract_processes or 0)
+        # Threads in the extract stage: one feeds the pool in process mode
+        self._extract_threads = 1 if self.extract_processes else self.extract_workers
+        self.claude_workers = max(1, claude_workers or config.PIPELINE_CLAUDE_WORKERS)
+        self.queue_size = max(1, queue_size or config.PIPELINE_QUEUE_SIZE)
+        self.essay_batch_size = max(1, essay_batch_size or config.ESSAY_BATCH_SIZE)
+        self.link_batch_size = max(1, link_batch_size or config.LINK_BATCH_SIZE)
+        self.db_write_batch_size = max(1, db_write_batch_size or config.DB_WRITE_BATCH_SIZE)
+
+    # ------------------------------------------------------------------
+    # Public
+    # ------------------------------------------------------------------
+    def run(self, emails: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Push emails through every stage and wait for the last Claude batch.
+
+        Returns:
+            {
+              "articles":       every extracted article, in newsletter order,
+              "essays":         the essay articles, each with 'summary' set,
+              "links":          the link articles, each with 'category' set,
+              "newsletter_ids": message IDs of the newsletters, in order,
+              "gate":           {"emails", "duplicate", "noise"} counts,
+            }
+
+        Re-raises the first error any stage hit, after every stage has
+        wound down.
+        """
+        self.stats = {
+            'fetch':      StageStats('fetch'),
+            'gate':       StageStats('gate'),
+            'extract':    StageStats('extract', self.extract_processes or self.extract_workers),
+            'route':      StageStats('route'),
+            'summarise':  StageStats('summarise', self.claude_workers),
+            'categorise': StageStats('categorise', self.claude_workers),
+        }
+        self.gate_counts = {'emails': 0, 'duplicate': 0, 'noise': 0}
+        self._errors: List[BaseException] = []
+        self._stopping = threading.Event()     # set when the gate can't persist
+        self._articles: List[Dict[str, Any]] = []
+        self._essays: List[Dict[str, Any]] = []
+        self._links: List[Dict[str, Any]] = []
+        self._newsletter_ids: List[str] = []
+        self._essay_batch: List[Dict[str, Any]] = []
+        self._link_batch: List[Dict[str, Any]] = []
+        self._unstored: List[Tuple[Dict[str, Any], int]] = []
+        self._futures = []
+
+        to_gate = Queue(maxsize=self.queue_size)
+        to_extract = Queue(maxsize=self.queue_size)
+        to_route = Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._counted, name='fetch',
+                             args=('fetch', self._fetch, emails, to_gate)),
+            threading.Thread(target=self._counted, name='gate',
+                             args=('gate', self._gate, to_gate, to_extract)),
+        ]
+        if self.extract_processes:
+            threads.append(threading.Thread(target=self._counted, name='extract',
+                                            args=('extract', self._extract_in_pool,
+                                                  to_extract, to_route)))
+        else:
+            threads += [
+                threading.Thread(target=self._counted, name=f'extract-{i}',
+                                 args=('extract', self._extract, to_extract, to_route))
+                for i in range(self.extract_workers)
+            ]
+
+        started = time.perf_counter()
+        # Worker processes are forked before any stage thread exists
+        self._pool = (ExtractorPool(self.extractor, self.extract_processes)
+                      if self.extract_processes else None)
+        try:
+            self._run_stages(threads, to_route)
+        finally:
+            if self._pool is not None:
+                self._pool.close()
+        self.wall_secs = time.perf_counter() - started
+
+        if self._errors:
+            raise self._errors[0]
+
+        return {
+            'articles':       self._articles,
+            'essays':         self._essays,
+            'links':          self._links,
+            'newsletter_ids': self._newsletter_ids,
+            'gate':           self.gate_counts,
+        }
+
+    def _run_stages(self, threads: List[threading.Thread], to_route: Queue):
+        with ThreadPoolExecutor(max_workers=self.claude_workers,
+                                thread_name_prefix='claude') as self._claude:
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            self._counted('route', self._route_all, to_route)
+            for thread in threads:
+                thread.join()
+            for future in self._futures:
+                try:
+                    future.result()
+                except Exception as exc:
+                    self._fail(exc)
+
+    def print_stats(self):
+        """Per-stage throughput and queue depth for the last run()"""
+        print(f"  {'stage':<11} {'workers':>7} {'items':>6} {'busy s':>8} "
+              f"{'items/s':>8} {'queue avg':>9} {'max':>4} {'reads':>6} {'writes':>6}")
+        for stats in self.stats.values():
+            rate = stats.items / self.wall_secs if self.wall_secs else 0.0
+            print(f"  {stats.name:<11} {stats.workers:>7} {stats.items:>6} "
+                  f"{stats.busy_secs:>8.2f} {rate:>8.1f} {stats.mean_depth:>9.1f} "
+                  f"{stats.max_depth:>4} {stats.reads:>6} {stats.writes:>6}")
+        busy_total = sum(stats.busy_secs for stats in self.stats.values())
+        print(f"  wall time {self.wall_secs:.2f} s  (stages busy {busy_total:.2f} s in total)")
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+    def _fetch(self, emails: Iterable[Dict[str, Any]], outbox: Queue):
+        stats = self.stats['fetch']
+        try:
+            # The source's generator runs on this thread, so any DB
+            # connection it opens belongs to this thread too
+            iterator = iter(emails)
+            while not self._stopping.is_set():
+                started = time.perf_counter()
+                try:
+                    email = next(iterator)
+                except StopIteration:
+                    break
+                stats.record(time.perf_counter() - started)
+                outbox.put(email)
+        except Exception as exc:
+            self._fail(exc)
+        finally:
+            outbox.put(_DONE)
+
+    def _gate(self, inbox: Queue, outbox: Queue):
+        """Step 2 – persist each new email, pass on only the newsletters"""
+        stats = self.stats['gate']
+        # sqlite3 connections belong to the thread that opened them
+        db = Database(self.db.db_path) if self.db is not None else None
+        seq = 0
+        finished = False
+        try:
+            while not finished:
+                batch = [self._take(inbox, stats)]
+                # Take whatever else is already waiting, so one transaction
+                # covers it all; never wait for more
+                while len(batch) < self.queue_size and not inbox.empty():
+                    batch.append(inbox.get())
+                if _DONE in batch:
+                    batch = batch[:batch.index(_DONE)]
+                    finished = True
+                if not batch or self._stopping.is_set():
+                    continue
+                started = time.perf_counter()
+                try:
+                    kept = batch if db is None else self._persist_emails(db, batch)
+                except Exception as exc:
+                    # An unstored email would be missing from this digest and
+                    # never listed again: stop fetching, and drain what's queued
+                    self._fail(exc)
+                    self._stopping.set()
+                    kept = []
+                stats.record(time.perf_counter() - started, len(batch))
+                for email in kept:
+                    outbox.put((seq, email))
+                    seq += 1
+        finally:
+            for _ in range(self._extract_threads):
+                outbox.put(_DONE)
+            if db is not None:
+                db.close()
+
+    def _persist_emails(self, db: Database, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Stores the new emails in one transaction; returns the newsletters"""
+        unprocessed = set(db.filter_unprocessed(e['gmail_message_id'] for e in emails))
+        new = []
+        for email in emails:
+            self.gate_counts['emails'] += 1
+            if email['gmail_message_id'] not in unprocessed:
+                self.gate_counts['duplicate'] += 1
+            elif should_skip_email(email):
+                self.gate_counts['noise'] += 1
+            else:
+                email['is_newsletter'] = is_newsletter(email)
+                new.append(email)
+                unprocessed.discard(email['gmail_message_id'])   # repeats in the batch
+
+        for email, db_id in zip(new, db.store_emails_bulk(new)):
+            email['db_id'] = db_id
+        return [email for email in new if email['is_newsletter']]
+
+    def _extract(self, inbox: Queue, outbox: Queue):
+        """Step 3 – articles out, HTML released"""
+        stats = self.stats['extract']
+        while True:
+            item = self._take(inbox, stats)
+            if item is _DONE:
+                break
+            seq, nl = item
+            started = time.perf_counter()
+            try:
+                articles = self.extractor.extract_from_email(**self._extract_job(nl))
+            except Exception as exc:
+                self._fail(exc)
+                articles = []
+            stats.record(time.perf_counter() - started)
+            outbox.put((seq, nl, articles))
+        outbox.put(_DONE)
+
+    def _extract_in_pool(self, inbox: Queue, outbox: Queue):
+        """Step 3 on worker processes – chunks out, results back in order"""
+        stats = self.stats['extract']
+        pending = deque()       # (items, future), oldest first
+        finished = False
+        while not finished or pending:
+            # Collect the oldest chunk when it is done, when the window is
+            # full, or when there is nothing new to send meanwhile
+            if pending and (finished or pending[0][1].done() or inbox.empty()
+                            or len(pending) >= self._pool.max_pending):
+                items, future = pending.popleft()
+                try:
+                    secs, results = future.result()
+                    stats.record(secs, len(items))
+                except Exception as exc:
+                    self._fail(exc)
+                    results = [[] for _ in items]
+                for (seq, nl), articles in zip(items, results):
+                    outbox.put((seq, nl, articles))
+                continue
+
+            # Whatever is already waiting, up to a chunk; never wait for more
+            items = [self._take(inbox, stats)]
+            while len(items) < self._pool.chunk_size and not inbox.empty():
+                items.append(inbox.get())
+            if _DONE in items:
+                items = items[:items.index(_DONE)]
+                finished = True
+            if items:
+                jobs = [self._extract_job(nl) for _, nl in items]
+                pending.append((items, self._pool.submit(jobs)))
+        outbox.put(_DONE)
+
+    @staticmethod
+    def _extract_job(nl: Dict[str, Any]) -> Dict[str, Any]:
+        """extract_from_email's arguments; takes the HTML and text off nl"""
+        nl.pop('text', None)
+        return {
+            'html_content':       nl.pop('html', ''),
+            'newsletter_name':    extract_newsletter_name(nl),
+            'newsletter_email':   nl.get('sender_email', ''),
+            'received_timestamp': nl.get('received_timestamp', ''),
+        }
+
+    def _route_all(self, inbox: Queue):
+        """Runs on the caller's thread, which owns self.db"""
+        stats = self.stats['route']
+        waiting: Dict[int, Any] = {}      # extracted out of order, keyed by seq
+        next_seq = 0
+        finished_workers = 0
+
+        while finished_workers < self._extract_threads:
+            item = self._take(inbox, stats)
+            if item is _DONE:
+                finished_workers += 1
+                continue
+            waiting[item[0]] = item
+            while next_seq in waiting:
+                _, nl, articles = waiting.pop(next_seq)
+                next_seq += 1
+                started = time.perf_counter()
+                try:
+                    self._route(nl, articles)
+                except Exception as exc:
+                    self._fail(exc)
+                stats.record(time.perf_counter() - started)
+
+        # Partial last batches
+        try:
+            self._store_articles()
+        except Exception as exc:
+            self._fail(exc)
+        self._submit_essays()
+        self._submit_links()
+
+    def _route(self, nl: Dict[str, Any], articles: List[Dict[str, Any]]):
+        if self.db is not None:
+            self._unstored.extend((a, nl['db_id']) for a in articles)
+            if len(self._unstored) >= self.db_write_batch_size:
+                self._store_articles()
+
+        self._newsletter_ids.append(nl['gmail_message_id'])
+        self._articles.extend(articles)
+        for a in articles:
+            if a.get('article_type') == 'essay':
+                self._essays.append(a)
+                self._essay_batch.append(a)
+                if len(self._essay_batch) >= self.essay_batch_size:
+                    self._submit_essays()
+            elif a.get('article_type') == 'link':
+                self._links.append(a)
+                self._link_batch.append(a)
+                if len(self._link_batch) >= self.link_batch_size:
+                    self._submit_links()
+
+    def _store_articles(self):
+        if self._unstored:
+            ids = self.db.store_articles_bulk(self._unstored)
+            for (article, _), db_id in zip(self._unstored, ids):
+                article['db_id'] = db_id
+            self._unstored = []
+
+    # ------------------------------------------------------------------
+    # Claude batches
+    # ------------------------------------------------------------------
+    def _submit_essays(self):
+        if self._essay_batch:
+            self._futures.append(self._claude.submit(self._counted, 'summarise',
+                                                    self._summarise, self._essay_batch))
+            self._essay_batch = []
+
+    def _submit_links(self):
+        if self._link_batch:
+            self._futures.append(self._claude.submit(self._counted, 'categorise',
+                                                    self._categorise, self._link_batch))
+            self._link_batch = []
+
+    def _summarise(self, essays: List[Dict[str, Any]]):
+        """Step 4 – sets 'summary' on each essay in the batch"""
+        started = time.perf_counter()
+        with self._enrichments('summary', self.summarizer, essays) as todo:
+            if todo:
+                try:
+                    summarised = self.summarizer.summarize_essays(todo)
+                except ClaudeCacheMiss as exc:
+                    print(f"  ⚠ {exc} – {len(todo)} essays left unsummarised")
+                    summarised = [{'summary': UNAVAILABLE} for _ in todo]
+                for essay, done in zip(todo, summarised):
+                    essay['summary'] = done['summary']
+        self.stats['summarise'].record(time.perf_counter() - started, len(essays))
+
+    def _categorise(self, links: List[Dict[str, Any]]):
+        """Step 5 – sets 'category' on each link in the batch"""
+        started = time.perf_counter()
+        with self._enrichments('category', self.categorizer, links) as todo:
+            if todo:
+                try:
+                    category_map = self.categorizer.categorize_articles(todo)
+                except ClaudeCacheMiss as exc:
+                    print(f"  ⚠ {exc} – {len(todo)} links filed under Other")
+                    category_map = None
+                for i, link in enumerate(todo):
+                    link['category'] = (category_map or {}).get(i, 'Other')
+                if category_map is None:
+                    del todo[:]             # a guess, not an answer: don't store it
+        self.stats['categorise'].record(time.perf_counter() - started, len(links))
+
+    @contextmanager
+    def _enrichments(self, kind: str, worker, articles: List[Dict[str, Any]]):
+        """
+        Sets `kind` on the articles with a stored result and yields the
+        rest, for the caller to fill in; on exit, stores what it filled.
+
+        Only when there is a database (self.db, or enrichments_from for a
+        replay, which only reads) and the worker declares `model` and
+        `prompt_version`; otherwise every article is yielded.  Runs on a
+        Claude thread, so it opens that thread's own connection.
+        """
+        model = getattr(worker, 'model', None)
+        prompt_version = getattr(worker, 'prompt_version', None)
+        db_path = self.db.db_path if self.db is not None else self.enrichments_from
+        if db_path is None or model is None or prompt_version is None:
+            yield list(articles)
+            return
+
+        db = Database(db_path)
+        try:
+            keys = {id(a): enrichment_key(a) for a in articles if a.get('content')}
+            stored = db.get_enrichments(kind, keys.values(), model, prompt_version)
+            todo = []
+            for article in articles:
+                value = stored.get(keys.get(id(article)))
+                if value is None:
+                    todo.append(article)
+                else:
+                    article[kind] = value
+            yield todo
+            fresh = {keys[id(a)]: a[kind] for a in todo
+                     if id(a) in keys and a.get(kind) not in (None, UNAVAILABLE)}
+            if fresh and self.db is not None:
+                db.store_enrichments(kind, fresh, model, prompt_version)
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _counted(self, stage: str, target, *args):
+        """Run target(*args), charging the SQL this thread issues to stage"""
+        reads, writes = statement_counts()
+        try:
+            return target(*args)
+        finally:
+            now_reads, now_writes = statement_counts()
+            self.stats[stage].record_queries(now_reads - reads, now_writes - writes)
+
+    @staticmethod
+    def _take(inbox: Queue, stats: StageStats):
+        stats.sample_depth(inbox.qsize())
+        return inbox.get()
+
+    def _fail(self, exc: BaseException):
+        # Stages keep draining their queues after an error so nothing
+        # upstream blocks; run() re-raises the first error at the end
+        print(f"  ✗ Pipeline error: {exc!r}")
+        self._errors.append(exc)
@@ -1 +1,2 @@
 from .extractor import ArticleExtractor
+from .pool import ExtractorPool
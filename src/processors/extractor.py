@@ -22,16 +22,22 @@ Extraction strategies (tried in priority order):
   1. Section-based  – split on h2/h3 boundaries.
   2. Link-based     – each article-looking <a> becomes its own entry.
   3. Fallback       – whole email body = one article.
+
+The HTML is parsed once by a pluggable backend (parsers.py: lexbor, lxml
+or html.parser – config.HTML_PARSER, by default the fastest installed).
 """
-import re
+import hashlib
+import json
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup
+from typing import List, Dict, Any, Optional, Tuple
 from urllib.parse import urlparse
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 import config
+from src.phrases import PhraseMatcher, matcher_for
+from src.processors.parsers import DocumentIndex, Element, get_backend
+from src.processors.urlcache import UrlCache
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -58,13 +64,77 @@ NOISE_ANCHOR_PHRASES = [
     'forward this email', 'view online', 'web version',
 ]
 
+SOCIAL_URL_PARTS = [
+    'twitter.com', 'facebook.com', 'instagram.com',
+    'linkedin.com', 'youtube.com', 'mailto:', 'javascript:',
+]
+
+ARTICLE_URL_SIGNALS = ['article', 'post', 'story', 'news', 'blog', 'opinion', 'analysis']
+
+# Compiled once (src/phrases.py)
+_PAYWALL        = PhraseMatcher(PAYWALL_PHRASES)
+_SOCIAL_URL     = PhraseMatcher(SOCIAL_URL_PARTS)
+_NOISE_ANCHOR   = PhraseMatcher(NOISE_ANCHOR_PHRASES)
+_ARTICLE_SIGNAL = PhraseMatcher(ARTICLE_URL_SIGNALS)
+
 # Max characters of blurb text to keep (newsletter blurbs are short by nature)
 MAX_BLURB_CHARS = 600
 
 
+# Fingerprint of the URL rules, so persisted verdicts from other rules are dropped
+URL_RULES_VERSION = hashlib.sha256(json.dumps(
+    [SOCIAL_URL_PARTS, sorted(NOISE_PATH_SEGMENTS), ARTICLE_URL_SIGNALS]
+).encode('utf-8')).hexdigest()[:12]
+
+
+def _url_path_parts(lower_url: str) -> List[str]:
+    try:
+        return urlparse(lower_url).path.strip('/').split('/')
+    except Exception:
+        return []
+
+
+def _url_verdict(url: str) -> Tuple[bool, int]:
+    """(noise, base score) – the half of the link checks that reads only the URL"""
+    lower_url  = url.lower()
+    path_parts = _url_path_parts(lower_url)
+    if _SOCIAL_URL.any_in(lower_url) or not NOISE_PATH_SEGMENTS.isdisjoint(path_parts):
+        return True, 0
+
+    score = 0
+    depth = len([p for p in path_parts if p])
+    if depth >= 3:
+        score += 2
+    elif depth >= 2:
+        score += 1
+
+    if _ARTICLE_SIGNAL.any_in(lower_url):
+        score += 2
+
+    return False, score
+
+
+def _collapse(text: str) -> str:
+    """re.sub(r'\\s+', ' ', text).strip(), in one C-level pass"""
+    return ' '.join(text.split())
+
+
 class ArticleExtractor:
     """Extract structured articles from raw newsletter HTML."""
 
+    def __init__(self, parser: Optional[str] = None, url_cache: Optional[UrlCache] = None):
+        """
+        Args:
+            parser:    HTML parser backend name (see parsers.py); defaults to
+                       config.HTML_PARSER, then the fastest installed.
+            url_cache: Link verdicts by URL (see urlcache.py); defaults to
+                       one loaded from config.URL_CACHE_PATH.
+        """
+        self.parser = get_backend(parser)
+        if url_cache is None:
+            url_cache = UrlCache(_url_verdict, URL_RULES_VERSION)
+        self.url_cache = url_cache
+
     # ------------------------------------------------------------------
     # Public entry point
     # ------------------------------------------------------------------
@@ -84,14 +154,14 @@ class ArticleExtractor:
         if not html_content:
             return []
 
-        soup = BeautifulSoup(html_content, 'html.parser')
+        doc = self.parser.index(html_content)
 
-        # Try strategies in order
-        articles = self._extract_by_sections(soup)
+        # Try strategies in order – all three read the same index
+        articles = self._extract_by_sections(doc)
         if not articles:
-            articles = self._extract_by_links(soup)
+            articles = self._extract_by_links(doc)
         if not articles:
-            articles = self._extract_fallback(soup)
+            articles = self._extract_fallback(doc)
 
         # Stamp shared metadata, classify, and filter
         force_essay = self._is_essay_newsletter(newsletter_name)
@@ -111,49 +181,46 @@ class ArticleExtractor:
     # ------------------------------------------------------------------
     # Strategy 1 – section-based (h2 / h3 boundaries)
     # ------------------------------------------------------------------
-    def _extract_by_sections(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    def _extract_by_sections(self, doc: DocumentIndex) -> List[Dict[str, Any]]:
         """
         Walk top-level children of <body>.  Each h2/h3 starts a new bucket.
         Text before the first heading is discarded (header chrome).
         """
-        body = soup.find('body') or soup
         articles: List[Dict[str, Any]] = []
         current: Optional[Dict[str, Any]] = None
 
-        for element in body.children:
-            if not hasattr(element, 'name'):
-                if current is not None:
-                    current['_raw_text'] += element.strip() + ' '
-                continue
-
-            if element.name in ('h2', 'h3'):
+        for element in doc.body:
+            if element.tag in ('h2', 'h3'):
                 if current is not None:
-                    articles.append(self._finalise(current))
+                    articles.append(self._finalise(current, doc))
 
-                title = element.get_text(strip=True)
-                link  = self._best_link_in(element)
+                title = doc.text(element)
+                link  = self._best_link_in(element, doc)
+                # A section's text is the run of pieces from the end of
+                # its heading to the end of its last element
                 current = {
                     'title':    title,
                     'url':      link or '',
-                    '_raw_text': '',
+                    '_start':   element.end,
+                    '_end':     element.end,
                     'author':   None,
                     'publish_date': None,
                 }
             else:
                 if current is not None:
-                    current['_raw_text'] += element.get_text(separator=' ', strip=True) + ' '
+                    current['_end'] = element.end
                     if not current['url']:
-                        current['url'] = self._best_link_in(element) or ''
+                        current['url'] = self._best_link_in(element, doc) or ''
 
         if current is not None:
-            articles.append(self._finalise(current))
+            articles.append(self._finalise(current, doc))
 
         return [a for a in articles if a['word_count'] > 0]
 
     # ------------------------------------------------------------------
     # Strategy 2 – link-based
     # ------------------------------------------------------------------
-    def _extract_by_links(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    def _extract_by_links(self, doc: DocumentIndex) -> List[Dict[str, Any]]:
         """
         Each <a> that looks like an article link becomes its own entry.
         The closest block-level parent's text becomes both content and blurb.
@@ -161,18 +228,18 @@ class ArticleExtractor:
         articles: List[Dict[str, Any]] = []
         seen_urls: set = set()
 
-        for a_tag in soup.find_all('a', href=True):
-            url = a_tag['href'].strip()
+        for a_tag in doc.anchors:
+            url = a_tag.href.strip()
 
             if not url.startswith('http'):
                 continue
-            if self._is_noise_url(url, a_tag.get_text(strip=True)):
+            title = doc.text(a_tag)
+            if self._is_noise_url(url, title, self.url_cache.get(url)):
                 continue
             if url in seen_urls:
                 continue
             seen_urls.add(url)
 
-            title = a_tag.get_text(strip=True)
             if not title or len(title) < 10:
                 continue
 
@@ -182,12 +249,12 @@ class ArticleExtractor:
                 parent = content_block.parent
                 if parent is None:
                     break
-                if parent.name in ('td', 'div', 'section', 'article', 'li', 'p'):
+                if parent.tag in ('td', 'div', 'section', 'article', 'li', 'p'):
                     content_block = parent
                     break
                 content_block = parent
 
-            content = content_block.get_text(separator=' ', strip=True)
+            content = doc.text(content_block, ' ')
 
             articles.append({
                 'title':          title,
@@ -205,10 +272,9 @@ class ArticleExtractor:
     # ------------------------------------------------------------------
     # Strategy 3 – fallback (whole email = one article)
     # ------------------------------------------------------------------
-    def _extract_fallback(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    def _extract_fallback(self, doc: DocumentIndex) -> List[Dict[str, Any]]:
         """Last resort: treat the entire email body as a single article."""
-        text = soup.get_text(separator=' ', strip=True)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _collapse(doc.text(doc.root, ' '))
 
         title = 'Newsletter'
         for line in text.split('\n'):
@@ -234,8 +300,7 @@ class ArticleExtractor:
     @staticmethod
     def _is_essay_newsletter(newsletter_name: str) -> bool:
         """True if this newsletter is in the known-essay list."""
-        name_lower = (newsletter_name or '').lower()
-        return any(kw in name_lower for kw in config.ESSAY_NEWSLETTERS)
+        return matcher_for(config.ESSAY_NEWSLETTERS).any_in(newsletter_name or '')
 
     @staticmethod
     def _classify(article: Dict[str, Any], newsletter_email: str,
@@ -286,7 +351,7 @@ class ArticleExtractor:
             blurb = blurb[len(title):].strip()
 
         # Collapse whitespace
-        blurb = re.sub(r'\s+', ' ', blurb).strip()
+        blurb = _collapse(blurb)
 
         # Trim
         if len(blurb) > MAX_BLURB_CHARS:
@@ -298,16 +363,15 @@ class ArticleExtractor:
     # Finalise a section bucket  ->  article dict
     # ------------------------------------------------------------------
     @staticmethod
-    def _finalise(bucket: Dict[str, Any]) -> Dict[str, Any]:
-        """Turn a raw-text bucket into a finished article dict."""
-        content = re.sub(r'\s+', ' ', bucket['_raw_text']).strip()
+    def _finalise(bucket: Dict[str, Any], doc: DocumentIndex) -> Dict[str, Any]:
+        """Turn a section bucket into a finished article dict."""
+        content = _collapse(' '.join(doc.pieces[bucket['_start']:bucket['_end']]))
         title   = bucket['title']
 
         # Blurb: strip title from front of content if present, then trim
         blurb = content
         if blurb.lower().startswith(title.lower()):
             blurb = blurb[len(title):].strip()
-        blurb = re.sub(r'\s+', ' ', blurb).strip()
         if len(blurb) > MAX_BLURB_CHARS:
             blurb = blurb[:MAX_BLURB_CHARS].rsplit(' ', 1)[0] + ' \u2026'
 
@@ -326,46 +390,21 @@ class ArticleExtractor:
     # URL / noise helpers
     # ------------------------------------------------------------------
     @staticmethod
-    def _is_noise_url(url: str, anchor_text: str = '') -> bool:
-        lower_url  = url.lower()
-        lower_text = anchor_text.lower()
-
-        for domain in ('twitter.com', 'facebook.com', 'instagram.com',
-                       'linkedin.com', 'youtube.com', 'mailto:', 'javascript:'):
-            if domain in lower_url:
-                return True
-
-        try:
-            path_parts = urlparse(lower_url).path.strip('/').split('/')
-        except Exception:
-            path_parts = []
-        if any(seg in NOISE_PATH_SEGMENTS for seg in path_parts):
-            return True
-
-        if any(phrase in lower_text for phrase in NOISE_ANCHOR_PHRASES):
-            return True
-
-        return False
+    def _is_noise_url(url: str, anchor_text: str = '',
+                      verdict: Optional[Tuple[bool, int]] = None) -> bool:
+        """verdict: _url_verdict(url), if the caller already has it"""
+        noise, _ = verdict or _url_verdict(url)
+        return noise or _NOISE_ANCHOR.any_in(anchor_text)
 
     @staticmethod
-    def _score_link(url: str, anchor_text: str) -> int:
-        lower_url  = url.lower()
-        lower_text = anchor_text.lower()
-
-        for domain in ('twitter.com', 'facebook.com', 'instagram.com',
-                       'linkedin.com', 'youtube.com', 'mailto:', 'javascript:'):
-            if domain in lower_url:
-                return 0
-        try:
-            path_parts = urlparse(lower_url).path.strip('/').split('/')
-        except Exception:
-            path_parts = []
-        if any(seg in NOISE_PATH_SEGMENTS for seg in path_parts):
-            return 0
-        if any(phrase in lower_text for phrase in NOISE_ANCHOR_PHRASES):
+    def _score_link(url: str, anchor_text: str,
+                    verdict: Optional[Tuple[bool, int]] = None) -> int:
+        """verdict: _url_verdict(url), if the caller already has it"""
+        noise, url_score = verdict or _url_verdict(url)
+        if noise or _NOISE_ANCHOR.any_in(anchor_text):
             return 0
 
-        score = 1
+        score = 1 + url_score
 
         words = len(anchor_text.split())
         if words >= 4:
@@ -373,31 +412,18 @@ class ArticleExtractor:
         elif words >= 2:
             score += 1
 
-        depth = len([p for p in path_parts if p])
-        if depth >= 3:
-            score += 2
-        elif depth >= 2:
-            score += 1
-
-        article_signals = ('article', 'post', 'story', 'news', 'blog', 'opinion', 'analysis')
-        if any(sig in lower_url for sig in article_signals):
-            score += 2
-
         return score
 
-    def _best_link_in(self, element) -> Optional[str]:
-        if not hasattr(element, 'find_all'):
-            return None
-
+    def _best_link_in(self, element: Element, doc: DocumentIndex) -> Optional[str]:
         best_url   = None
         best_score = 0
 
-        for a in element.find_all('a', href=True):
-            url  = a['href'].strip()
+        for a in doc.links(element):
+            url  = a.href.strip()
             if not url.startswith('http'):
                 continue
-            text = a.get_text(strip=True)
-            score = self._score_link(url, text)
+            text = doc.text(a)
+            score = self._score_link(url, text, self.url_cache.get(url))
             if score > best_score:
                 best_score = score
                 best_url   = url
@@ -406,5 +432,4 @@ class ArticleExtractor:
 
     @staticmethod
     def _detect_paywall(text: str) -> bool:
-        lower = text.lower()
-        return any(phrase in lower for phrase in PAYWALL_PHRASES)
+        return _PAYWALL.any_in(text)
@@ -0,0 +1,241 @@
+"""
+HTML parser backends and the document index
+============================================
+
+Parsing is most of step 3's time, so the tree builder is pluggable.  Each
+backend parses HTML into its own tree and answers four questions about a
+node – its children, its tag (None for text), the string of a text node,
+and an <a>'s href – which is all index() needs to walk the tree once and
+produce a DocumentIndex.  The extractor never touches the tree itself.
+
+Backends:
+
+  html.parser   BeautifulSoup on the standard library's parser – always
+                available, the slowest
+  lxml          BeautifulSoup on libxml2
+  lexbor        selectolax's lexbor bindings (optional `selectolax`
+                package)
+
+All three give the same articles for well-formed newsletter HTML (test
+section S).  On broken markup each repairs the tree its own way, so the
+articles may differ.
+
+DocumentIndex
+-------------
+One walk in document order records:
+
+  pieces     every text node, stripped, empties dropped (no <script>,
+             <style> or comments) – so the text of any element is a
+             contiguous run of pieces, and BeautifulSoup's
+             get_text(sep, strip=True) is sep.join(pieces[start:end])
+  elements   each element's tag, parent, and its [start, end) ranges
+             into pieces and into anchors
+  anchors    every <a href>, in document order
+  body       the top-level children of <body>, text nodes included
+
+so the extraction strategies read text and links off ranges instead of
+re-walking the tree for each heading and anchor.
+"""
+import sys
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from bs4 import BeautifulSoup, CData, NavigableString
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import config
+
+try:
+    import lxml
+except ImportError:          # optional – falls back to html.parser
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:          # optional – falls back to lxml / html.parser
+    LexborHTMLParser = None
+
+
+class Element:
+    """An element (or top-level text node) of a DocumentIndex"""
+
+    __slots__ = ('tag', 'parent', 'start', 'end', 'first_anchor', 'end_anchor', 'href')
+
+    def __init__(self, tag: Optional[str], parent: Optional['Element'],
+                 start: int, first_anchor: int, href: Optional[str] = None):
+        self.tag = tag                    # None for a text node
+        self.parent = parent
+        self.start = self.end = start     # range into DocumentIndex.pieces
+        self.first_anchor = self.end_anchor = first_anchor   # … and .anchors
+        self.href = href                  # <a> only: None when it has no href
+
+
+class DocumentIndex:
+    def __init__(self):
+        self.pieces: List[str] = []
+        self.anchors: List[Element] = []
+        self.root: Optional[Element] = None
+        self.body: List[Element] = []
+
+    def text(self, element: Element, separator: str = '') -> str:
+        return separator.join(self.pieces[element.start:element.end])
+
+    def links(self, element: Element) -> List[Element]:
+        """The <a href> elements inside element (not element itself)"""
+        first = element.first_anchor
+        if element.href is not None:
+            first += 1
+        return self.anchors[first:element.end_anchor]
+
+
+class _Backend:
+    """The tree walk every backend shares; subclasses parse and describe nodes"""
+
+    name = ''
+
+    def index(self, html: str) -> DocumentIndex:
+        doc = DocumentIndex()
+        pieces, anchors = doc.pieces, doc.anchors
+        doc.root = Element(None, None, 0, 0)
+        body: Optional[Element] = None
+        top_level = {id(doc.root): []}    # children kept for the root and <body>
+
+        stack = [(doc.root, iter(self.children(self.root(self.parse(html)))))]
+        while stack:
+            parent, children = stack[-1]
+            node = next(children, None)
+            if node is None:
+                parent.end = len(pieces)
+                parent.end_anchor = len(anchors)
+                stack.pop()
+                continue
+
+            tag = self.tag(node)
+            kept = top_level.get(id(parent))
+            if tag is None:
+                text = self.string(node)
+                text = text.strip() if text else ''
+                if kept is not None:
+                    element = Element(None, parent, len(pieces), len(anchors))
+                    element.end = len(pieces) + (1 if text else 0)
+                    kept.append(element)
+                if text:
+                    pieces.append(text)
+                continue
+
+            href = self.href(node) if tag == 'a' else None
+            element = Element(tag, parent, len(pieces), len(anchors), href)
+            if href is not None:
+                anchors.append(element)
+            if kept is not None:
+                kept.append(element)
+            if tag == 'body' and body is None:
+                body = element
+                top_level[id(body)] = []
+            stack.append((element, iter(self.children(node))))
+
+        doc.body = top_level[id(body if body is not None else doc.root)]
+        return doc
+
+    # Per backend
+    def parse(self, html: str): ...
+    def root(self, tree): ...
+    def children(self, node) -> Iterable: ...
+    def tag(self, node) -> Optional[str]: ...
+    def string(self, node) -> Optional[str]: ...
+    def href(self, node) -> Optional[str]: ...
+
+
+class SoupBackend(_Backend):
+    """BeautifulSoup, on whichever tree builder `features` names"""
+
+    # The string types get_text() includes; comments, doctypes and
+    # <script> / <style> / <template> contents are subclasses it skips
+    _TEXT_TYPES = (NavigableString, CData)
+
+    def __init__(self, features: str):
+        self.name = features
+        self.features = features
+
+    def parse(self, html: str) -> BeautifulSoup:
+        # HTML5 parsers (lexbor) turn CR LF and lone CR into LF before
+        # anything else; html.parser and libxml2 keep them
+        html = html.replace('\r\n', '\n').replace('\r', '\n')
+        return BeautifulSoup(html, self.features)
+
+    def root(self, tree: BeautifulSoup):
+        return tree
+
+    def children(self, node) -> Iterable:
+        return node.children
+
+    def tag(self, node) -> Optional[str]:
+        return None if isinstance(node, NavigableString) else node.name
+
+    def string(self, node) -> Optional[str]:
+        return str(node) if type(node) in self._TEXT_TYPES else None
+
+    def href(self, node) -> Optional[str]:
+        return node.get('href')
+
+
+class LexborBackend(_Backend):
+    """selectolax's lexbor tree"""
+
+    name = 'lexbor'
+
+    # get_text leaves out <script> / <style> contents; dropping the
+    # elements up front does the same here
+    _HIDDEN_TAGS = ['script', 'style']
+
+    def parse(self, html: str):
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(self._HIDDEN_TAGS)
+        return tree
+
+    def root(self, tree):
+        # The document node above <html>, like BeautifulSoup's root
+        return tree.root.parent or tree.root
+
+    def children(self, node) -> Iterable:
+        child = node.child
+        while child is not None:
+            yield child
+            child = child.next
+
+    def tag(self, node) -> Optional[str]:
+        return node.tag if node.is_element_node else None
+
+    def string(self, node) -> Optional[str]:
+        return node.text_content if node.is_text_node else None
+
+    def href(self, node) -> Optional[str]:
+        attributes = node.attributes
+        if 'href' not in attributes:
+            return None
+        return attributes['href'] or ''
+
+
+def available_backends() -> List[str]:
+    """Installed backends, fastest first"""
+    names = []
+    if LexborHTMLParser is not None:
+        names.append('lexbor')
+    if lxml is not None:
+        names.append('lxml')
+    names.append('html.parser')
+    return names
+
+
+def get_backend(name: Optional[str] = None) -> _Backend:
+    """
+    The backend called `name`; by default config.HTML_PARSER, and if that
+    is None too, the fastest one installed.
+    """
+    name = name or config.HTML_PARSER or available_backends()[0]
+    if name not in available_backends():
+        raise ValueError(f"HTML parser {name!r} is not available "
+                         f"(installed: {', '.join(available_backends())})")
+    if name == 'lexbor':
+        return LexborBackend()
+    return SoupBackend(name)
@@ -0,0 +1,103 @@
+"""
+Process-pool extraction
+=======================
+
+Parsing is CPU-bound and holds the GIL, so extraction threads share one
+core.  ExtractorPool runs ArticleExtractor.extract_from_email in worker
+processes instead:
+
+  * each worker gets its own copy of the extractor once, at start-up
+    (pickled, so the parser backend and its settings come along)
+  * jobs – extract_from_email keyword arguments – go out in chunks of
+    `chunk_size` newsletters, so a task's pickling and IPC overhead is
+    paid per chunk rather than per newsletter
+  * results come back in submission order, with at most `max_pending`
+    chunks in flight, so memory stays bounded on long backfills
+
+Workers are started when the pool is created.  Under the fork start method
+(the Linux default) create it before starting any threads of your own.
+
+    with ExtractorPool(ArticleExtractor(), workers=8) as pool:
+        for articles in pool.imap(jobs):
+            ...
+"""
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import config
+
+# The extractor of the worker process this module is running in
+_extractor = None
+
+
+def _init_worker(extractor):
+    global _extractor
+    _extractor = extractor
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _extract_chunk(jobs: List[Dict[str, Any]]) -> Tuple[float, List[List[Dict[str, Any]]]]:
+    """Runs in a worker: (seconds spent, each job's articles)"""
+    started = time.perf_counter()
+    results = [_extractor.extract_from_email(**job) for job in jobs]
+    return time.perf_counter() - started, results
+
+
+class ExtractorPool:
+    def __init__(self, extractor, workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Args:
+            extractor:   The ArticleExtractor each worker gets a copy of
+            workers:     Processes; defaults to PIPELINE_EXTRACT_PROCESSES,
+                         then the CPU count
+            chunk_size:  Newsletters per task; defaults to PIPELINE_EXTRACT_CHUNK
+            max_pending: Chunks in flight at once; defaults to two per worker
+        """
+        self.workers = max(1, workers or config.PIPELINE_EXTRACT_PROCESSES or os.cpu_count() or 1)
+        self.chunk_size = max(1, chunk_size or config.PIPELINE_EXTRACT_CHUNK)
+        self.max_pending = max(1, max_pending or 2 * self.workers)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                         initializer=_init_worker, initargs=(extractor,))
+        # Start every worker now, not on the first real task
+        for future in [self._pool.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, jobs: List[Dict[str, Any]]) -> 'Future[Tuple[float, List[List[Dict[str, Any]]]]]':
+        """One chunk; the future resolves to (worker seconds, each job's articles)"""
+        return self._pool.submit(_extract_chunk, jobs)
+
+    def imap(self, jobs: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """Each job's articles, in job order"""
+        jobs = iter(jobs)
+        pending = deque()
+        while True:
+            chunk = list(islice(jobs, self.chunk_size))
+            if chunk:
+                pending.append(self.submit(chunk))
+            # Hand back whatever is finished at the head, and wait for the
+            # head once the window is full or the input has run out
+            while pending and (not chunk or len(pending) >= self.max_pending
+                               or pending[0].done()):
+                yield from pending.popleft().result()[1]
+            if not chunk:
+                return
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> 'ExtractorPool':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,116 @@
+"""
+URL Verdict Cache
+=================
+
+Every anchor the extractor looks at is lowercased, parsed with urlparse
+and checked against the social-domain, noise-path and article-signal
+lists.  The verdict depends on the URL alone, and the same footer, sponsor
+and share links recur in every issue of a newsletter, so UrlCache keeps
+URL -> (noise, base score) in a bounded LRU:
+
+  * entries live for the extractor's lifetime and are saved to
+    config.URL_CACHE_PATH, so the next run starts warm
+  * the file records `version` – a fingerprint of the rules that produced
+    the verdicts – and is ignored when the rules have changed
+  * hits / misses are counted for the run report
+
+The anchor text half of the checks (noise phrases, word count) is not
+cached; it differs per anchor.  In process mode (processors/pool.py) each
+worker gets a copy of the cache as it was loaded, and its lookups are not
+saved back.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import config
+
+Verdict = Tuple[bool, int]      # (noise, base score)
+
+
+class UrlCache:
+    def __init__(self, compute: Callable[[str], Verdict], version: str,
+                 path: Optional[Path] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            compute:     Verdict for a URL not in the cache
+            version:     Fingerprint of the rules compute applies
+            path:        Where save() writes; defaults to config.URL_CACHE_PATH.
+                         Nothing is read or written when URL_CACHE_ENABLED is off.
+            max_entries: Defaults to config.URL_CACHE_MAX_ENTRIES
+        """
+        self.compute = compute
+        self.version = version
+        self.path = Path(path or config.URL_CACHE_PATH)
+        self.max_entries = max(1, max_entries or config.URL_CACHE_MAX_ENTRIES)
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Verdict]' = OrderedDict()
+        self._lock = threading.Lock()
+        if config.URL_CACHE_ENABLED:
+            self._load()
+
+    # ------------------------------------------------------------------
+    # Public
+    # ------------------------------------------------------------------
+    def get(self, url: str) -> Verdict:
+        """The cached verdict for url, computed and stored on a miss"""
+        with self._lock:
+            verdict = self._entries.get(url)
+            if verdict is not None:
+                self._entries.move_to_end(url)
+                self.hits += 1
+                return verdict
+            self.misses += 1
+        verdict = self.compute(url)
+        with self._lock:
+            self._entries[url] = verdict
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return verdict
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def save(self):
+        """Write the entries, least recently used first, for the next run"""
+        if not config.URL_CACHE_ENABLED:
+            return
+        with self._lock:
+            entries = [[url, noise, score] for url, (noise, score) in self._entries.items()]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps({'version': self.version, 'entries': entries}),
+                       encoding='utf-8')
+        os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Worker processes get a pickled copy; a lock can't be pickled
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _load(self):
+        try:
+            saved = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if saved.get('version') != self.version:
+            return                  # verdicts from other rules
+        for url, noise, score in saved.get('entries', [])[-self.max_entries:]:
+            self._entries[url] = (noise, score)
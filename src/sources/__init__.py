@@ -0,0 +1,4 @@
+from .base import MessageSource
+from .local import LocalMailSource
+
+__all__ = ['MessageSource', 'LocalMailSource']
@@ -0,0 +1,43 @@
+"""
+Message Sources
+Common interface for everything the pipeline can read emails from
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Iterator, List, Optional
+
+from src.database.models import Database
+
+
+class MessageSource(ABC):
+    """
+    A place step 1 of the pipeline pulls emails from.
+
+    Every source returns the email data dict GmailClient.get_message_content
+    produces: gmail_message_id, thread_id, subject, sender_email,
+    sender_name, received_timestamp, headers, html, text.
+    """
+
+    @abstractmethod
+    def iter_messages_since(self, hours: Optional[int] = 24,
+                            incremental: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Yield emails received in the last `hours` hours that have not been
+        processed yet (hours=None: no time limit, where the source allows it).
+
+        Sources should stream: the pipeline drops each email's HTML as soon
+        as its articles are extracted, so nothing upstream should hold on to
+        the full set.
+        """
+
+    def commit_checkpoint(self, db: Database):
+        """
+        Called once everything iter_messages_since yielded has been
+        persisted in db.  Sources with an incremental sync checkpoint
+        advance it there, never earlier, so a message that was skipped or
+        failed to store is listed again by the next run.
+        """
+
+    def get_messages_since(self, hours: Optional[int] = 24,
+                           incremental: bool = False) -> List[Dict[str, Any]]:
+        """iter_messages_since, collected into a list"""
+        return list(self.iter_messages_since(hours, incremental))
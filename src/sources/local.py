@@ -0,0 +1,158 @@
+"""
+Local Mail Archives
+Reads exported mail (mbox, Maildir, or a directory of .eml files) so old
+newsletters can be imported without going through the Gmail API
+"""
+import hashlib
+import mailbox
+import sys
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from src.database.models import Database
+from src.gmail.mime import parse_raw_headers, parse_raw_message
+from src.sources.base import MessageSource
+
+# Prefix for the IDs local messages are stored under in processed_emails,
+# so they can never collide with real Gmail message IDs
+LOCAL_ID_PREFIX = 'local:'
+
+
+class LocalMailSource(MessageSource):
+    """
+    Messages from a local archive.  `path` may be:
+
+      • an mbox file (e.g. a Google Takeout export)
+      • a Maildir (a directory holding cur/, new/ and tmp/)
+      • a single .eml file, or a directory searched recursively for *.eml
+
+    Raw bytes go through the same one-pass parser as Gmail format='raw',
+    so the resulting dicts are identical to GmailClient's.  Each message
+    is keyed by a hash of its Message-ID header (or of its bytes when it
+    has none), which keeps re-imports of the same archive idempotent.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+        if not self.path.exists():
+            raise FileNotFoundError(f"Mail archive not found: {self.path}")
+        self.kind = self._detect_kind()
+
+    # ------------------------------------------------------------------
+    # MessageSource
+    # ------------------------------------------------------------------
+    def iter_messages_since(self, hours: Optional[int] = 24,
+                            incremental: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Yield unprocessed messages from the archive received in the last
+        `hours` hours (all of them with hours=None).  `incremental` has no
+        meaning for a static archive and is ignored.
+
+        The archive is read twice: first headers only, for the time window
+        and one filter_unprocessed() over every ID, then again to parse
+        the bodies of the new messages.
+        """
+        cutoff = None
+        if hours is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+            print(f"Reading {self.kind} {self.path} (since {cutoff.strftime('%Y-%m-%d %H:%M')})...")
+        else:
+            print(f"Reading {self.kind} {self.path}...")
+
+        # Headers only: which messages fall in the window, and their IDs
+        candidates = []
+        too_old = 0
+        for raw in self.iter_raw():
+            headers = parse_raw_headers(raw)
+            if cutoff and _sent_before(headers, cutoff):
+                too_old += 1
+                continue
+            candidates.append(local_message_id(raw, headers))
+
+        db = Database()
+        try:
+            wanted = set(db.filter_unprocessed(candidates))
+        finally:
+            db.close()
+
+        if cutoff:
+            print(f"  Outside time window: {too_old}")
+        print(f"  Already processed:   {sum(1 for i in candidates if i not in wanted)}")
+
+        # Second pass: parse the bodies of the new messages only
+        read = 0
+        for raw in self.iter_raw() if wanted else ():
+            message_id = local_message_id(raw, parse_raw_headers(raw))
+            if message_id not in wanted:
+                continue
+            wanted.discard(message_id)      # an archive can hold a message twice
+            read += 1
+            yield self.parse(raw)
+            if not wanted:
+                break
+        print(f"✓ Read {read} new emails")
+
+    # ------------------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------------------
+    def iter_messages(self) -> Iterator[Dict[str, Any]]:
+        """Yield every message in the archive as an email data dict"""
+        for raw in self.iter_raw():
+            yield self.parse(raw)
+
+    def iter_raw(self) -> Iterator[bytes]:
+        """Yield the raw RFC 822 bytes of every message in the archive"""
+        if self.kind == 'eml':
+            files = [self.path] if self.path.is_file() else sorted(self.path.rglob('*.eml'))
+            for eml_path in files:
+                yield eml_path.read_bytes()
+            return
+
+        box = mailbox.mbox(str(self.path), create=False) if self.kind == 'mbox' \
+            else mailbox.Maildir(str(self.path), factory=None, create=False)
+        try:
+            for key in box.iterkeys():
+                yield box.get_bytes(key)
+        finally:
+            box.close()
+
+    @staticmethod
+    def parse(raw: bytes) -> Dict[str, Any]:
+        """Parse one raw message, keyed by its stable local ID"""
+        email_data = parse_raw_message(raw, gmail_message_id='')
+        email_data['gmail_message_id'] = local_message_id(raw, email_data['headers'])
+        return email_data
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _detect_kind(self) -> str:
+        if self.path.is_file():
+            return 'eml' if self.path.suffix.lower() == '.eml' else 'mbox'
+        if all((self.path / sub).is_dir() for sub in ('cur', 'new', 'tmp')):
+            return 'maildir'
+        return 'eml'
+
+
+def local_message_id(raw: bytes, headers: Dict[str, str]) -> str:
+    """Stable processed_emails key for a message from a local archive"""
+    message_id = ''
+    for name, value in headers.items():
+        if name.lower() == 'message-id':
+            message_id = value.strip()
+            break
+    digest = hashlib.sha1(message_id.encode('utf-8') if message_id else raw).hexdigest()
+    return f"{LOCAL_ID_PREFIX}{digest[:24]}"
+
+
+def _sent_before(headers: Dict[str, str], cutoff: datetime) -> bool:
+    try:
+        sent = parsedate_to_datetime(headers.get('Date', ''))
+    except (TypeError, ValueError, IndexError):
+        return False
+    if sent.tzinfo is None:
+        sent = sent.astimezone()            # naive = local time
+    return sent < cutoff
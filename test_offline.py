@@ -8,6 +8,25 @@ Tests everything that can be verified without network or real API keys:
   D – DigestGenerator   (template renders without crashing)
   E – Database          (duplicate guard)
   F – URL noise filter  (disclaimer links, social links, etc.)
+  G – GmailClient       (pagination, batching, history sync, header-first and
+                         concurrent fetch, quota pacing, raw MIME parsing,
+                         message cache)
+  H – Replay            (Claude response cache, offline digest rebuild)
+  I – LocalMailSource   (mbox / Maildir / .eml import)
+  J – Pipeline          (bounded streaming, ordered Claude batches, stage stats,
+                         gate database and failed stores)
+  K – Database          (bulk writes)
+  L – Connections       (SQLite connection manager)
+  M – Duplicates        (set-based duplicate detection)
+  N – Article bodies    (content-addressed storage)
+  O – Search            (full-text article search)
+  P – Schema            (migrations and query plans)
+  Q – Enrichments       (stored Claude results, replay from the database)
+  R – Newsletters       (registry and digest membership)
+  S – HTML parsers      (parser backends)
+  T – Process pool      (process-pool extraction)
+  U – Phrase matching   (compiled phrase matchers)
+  V – URL cache         (URL verdict cache)
 """
 import sys, os, types, json, tempfile
 from pathlib import Path
@@ -20,7 +39,7 @@ class _FakeClient:
     class messages:
         @staticmethod
         def create(**kw):
-            resp = MagicMock()
+            resp = MagicMock(stop_reason='end_turn')
             resp.content = [MagicMock(text='{}')]
             return resp
 anthropic_mock.Anthropic = _FakeClient
@@ -30,14 +49,24 @@ sys.modules['anthropic'] = anthropic_mock
 for mod_name in ('google.oauth2.credentials','google_auth_oauthlib.flow',
                  'google.auth.transport.requests','googleapiclient.discovery',
                  'google.oauth2','google.auth.transport','google','google.auth',
-                 'google_auth_oauthlib'):
+                 'google_auth_oauthlib','googleapiclient'):
     sys.modules[mod_name] = MagicMock()
 
+googleapiclient_errors = types.ModuleType('googleapiclient.errors')
+class _HttpError(Exception):
+    def __init__(self, resp, content=b''):
+        super().__init__(f'HTTP {resp.status}'); self.resp = resp; self.content = content
+googleapiclient_errors.HttpError = _HttpError
+sys.modules['googleapiclient.errors'] = googleapiclient_errors
+
 os.environ['ANTHROPIC_API_KEY'] = 'sk-test-fake'
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 import config
+config.MESSAGE_CACHE_ENABLED = False   # G10 turns it on against a temp dir
+config.CLAUDE_CACHE_ENABLED = False    # H turns it on against a temp dir
+config.URL_CACHE_ENABLED = False       # V turns it on against a temp dir
 from src.processors.extractor import ArticleExtractor
 from src.claude.categorizer   import TopicCategorizer
 from src.claude.summarizer    import DigestSummarizer
@@ -365,6 +394,1395 @@ if signal_ok:
 else:
     fail('F2', 'some signal URL was incorrectly filtered')
 
+# ==================================================================
+# G – GmailClient pagination + batching
+# ==================================================================
+print('\n\u2500\u2500 G: GmailClient fetch \u2500\u2500')
+
+from src.gmail.client import GmailClient
+
+class _FakeRequest:
+    def __init__(self, fn): self.fn = fn
+    def execute(self, http=None): return self.fn()
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self.service, self.callback, self.entries = service, callback, []
+    def add(self, request, request_id):
+        self.entries.append((request_id, request))
+    def execute(self):
+        self.service.batch_calls += 1
+        for request_id, request in self.entries:
+            if request_id in self.service.batch_failures:
+                self.callback(request_id, None, Exception('429 inside batch'))
+            else:
+                self.callback(request_id, request.execute(), None)
+
+class _FakeGmailService:
+    """Just enough of users().messages() for GmailClient."""
+    def __init__(self, total, page_size):
+        self.ids = [f'm{i:04d}' for i in range(total)]
+        self.page_size, self.list_calls, self.get_calls, self.batch_calls = page_size, 0, 0, 0
+        self.batch_failures = set()
+        self.history_expired = False
+        self.unsubscribe_hits, self.search_calls = [], 0
+        self.extra_headers, self.formats = {}, []
+        self.throttle_once = set()
+    def users(self): return self
+    def messages(self): return self
+    def list(self, userId, q, maxResults, pageToken=None):
+        def _page():
+            if 'unsubscribe' in q:
+                self.search_calls += 1
+                return {'messages': [{'id': i, 'threadId': i} for i in self.unsubscribe_hits]}
+            self.list_calls += 1
+            start = int(pageToken or 0)
+            body = {'messages': [{'id': i, 'threadId': i} for i in self.ids[start:start + self.page_size]]}
+            if start + self.page_size < len(self.ids):
+                body['nextPageToken'] = str(start + self.page_size)
+            return body
+        return _FakeRequest(_page)
+    def get(self, userId, id, format, metadataHeaders=None):
+        def _message():
+            self.get_calls += 1
+            if id in self.throttle_once:
+                self.throttle_once.discard(id)
+                raise _HttpError(MagicMock(status=429))
+            self.formats.append((id, format))
+            headers = self.extra_headers.get(id, {'Subject': f'Issue {id}', 'From': 'NL <nl@example.com>'})
+            payload = {'mimeType': 'text/html',
+                       'headers': [{'name': k, 'value': v} for k, v in headers.items()]}
+            if format == 'full':
+                payload['body'] = {'data': 'PHA-aGk8L3A-'}
+            return {'id': id, 'threadId': id, 'internalDate': '1770000000000',
+                    'sizeEstimate': 50_000, 'payload': payload}
+        return _FakeRequest(_message)
+    def new_batch_http_request(self, callback):
+        return _FakeBatch(self, callback)
+    def getProfile(self, userId):
+        return _FakeRequest(lambda: {'historyId': '250'})
+    def history(self):
+        return _FakeHistory(self)
+
+class _FakeHistory:
+    def __init__(self, service): self.service = service
+    def list(self, userId, startHistoryId, historyTypes, maxResults, pageToken=None):
+        def _page():
+            if self.service.history_expired:
+                raise _HttpError(MagicMock(status=404))
+            added = lambda i, labels=('INBOX',): {'message': {'id': i, 'threadId': i, 'labelIds': list(labels)}}
+            if pageToken is None:
+                return {'history': [{'messagesAdded': [added('h1'), added('h2', ('DRAFT',))]}],
+                        'nextPageToken': 'p2'}
+            return {'history': [{'messagesAdded': [added('h3'), added('h1')]}]}
+        return _FakeRequest(_page)
+
+# G1 – list_message_ids follows nextPageToken past the first page
+svc = _FakeGmailService(total=23, page_size=10)
+listed = GmailClient(service=svc).list_message_ids('after:0')
+if len(listed) == 23 and svc.list_calls == 3:
+    ok('G1 \u2013 list_message_ids follows every result page')
+else:
+    fail('G1', f'listed {len(listed)} ids in {svc.list_calls} calls')
+
+# G2 – batched fetch keeps input order and groups calls by batch_size
+svc = _FakeGmailService(total=23, page_size=10)
+fetched = GmailClient(service=svc, batch_size=10).get_messages_content(svc.ids)
+if [e['gmail_message_id'] for e in fetched] == svc.ids and svc.batch_calls == 3:
+    ok('G2 \u2013 batched fetch returns every message in order, 3 batches for 23 ids')
+else:
+    fail('G2', f'{len(fetched)} emails, {svc.batch_calls} batches')
+
+# G3 – a failed batch entry is retried on its own instead of being dropped
+svc = _FakeGmailService(total=5, page_size=10)
+svc.batch_failures = {'m0002'}
+fetched = GmailClient(service=svc, batch_size=5).get_messages_content(svc.ids)
+if len(fetched) == 5 and fetched[2]['html'] == '<p>hi</p>':
+    ok('G3 \u2013 failed batch entry retried individually')
+else:
+    fail('G3', f'got {[e["gmail_message_id"] for e in fetched]}')
+
+# G4 – incremental sync lists via history from the checkpoint, then advances it …
+tmp = tempfile.NamedTemporaryFile(suffix='.db', delete=False); tmp.close()
+config.DATABASE_PATH = Path(tmp.name)
+db = Database(); db.set_sync_state('gmail_history_id', '100'); db.close()
+
+class _LossyClient(GmailClient):
+    """Every single-message retry fails, so a failed batch entry is skipped"""
+    def _fetch_message(self, message_id, fmt='full'):
+        return None
+
+# G4 – … only when told everything was persisted, and only if nothing was skipped
+svc = _FakeGmailService(total=40, page_size=10)
+svc.batch_failures = {'h3'}
+lossy = _LossyClient(service=svc, batch_size=10)
+skipped = lossy.get_messages_since(hours=1, incremental=True)
+db = Database(); lossy.commit_checkpoint(db); after_skip = db.get_sync_state('gmail_history_id'); db.close()
+
+svc = _FakeGmailService(total=40, page_size=10)
+client = GmailClient(service=svc, batch_size=10)
+fetched = client.get_messages_since(hours=1, incremental=True)
+db = Database(); before_commit = db.get_sync_state('gmail_history_id'); db.close()
+db = Database(); client.commit_checkpoint(db); checkpoint = db.get_sync_state('gmail_history_id'); db.close()
+if ([e['gmail_message_id'] for e in fetched] == ['h1', 'h3'] and svc.list_calls == 0
+        and [e['gmail_message_id'] for e in skipped] == ['h1']
+        and after_skip == before_commit == '100' and checkpoint == '250'):
+    ok('G4 \u2013 incremental sync uses history (no drafts, no dupes); checkpoint advances '
+       'on commit, never past a skipped message')
+else:
+    fail('G4', f'fetched {[e["gmail_message_id"] for e in fetched]}, list calls {svc.list_calls}, '
+               f'checkpoints {after_skip}/{before_commit}/{checkpoint}')
+
+# G4b – a message Gmail answers 404 for (deleted since it was listed) doesn't
+# hold the checkpoint back; the client reads and saves it in its own db_path
+class _GoneService(_FakeGmailService):
+    def get(self, userId, id, format, metadataHeaders=None):
+        if id == 'h3':
+            def _gone():
+                raise _HttpError(MagicMock(status=404))
+            return _FakeRequest(_gone)
+        return super().get(userId, id, format, metadataHeaders)
+gone_db_path = Path(tmp.name).with_name(Path(tmp.name).stem + '-own.db')
+db = Database(); db.conn.execute('DELETE FROM sync_state'); db.conn.commit(); db.close()
+own_db = Database(gone_db_path)
+gone_results = {}
+for mode in ('batch', 'concurrent'):
+    svc = _GoneService(total=40, page_size=10)
+    svc.batch_failures = {'h3'}
+    gone = GmailClient(service=svc, batch_size=10, fetch_mode=mode, db_path=gone_db_path)
+    own_db.set_sync_state('gmail_history_id', '100')
+    fetched = gone.get_messages_since(hours=1, incremental=True)
+    gone.commit_checkpoint(own_db)
+    gone_results[mode] = ([e['gmail_message_id'] for e in fetched],
+                          own_db.get_sync_state('gmail_history_id'))
+own_db.close()
+db = Database(); default_checkpoint = db.get_sync_state('gmail_history_id'); db.close()
+if (gone_results == {'batch': (['h1'], '250'), 'concurrent': (['h1'], '250')}
+        and default_checkpoint is None):
+    ok('G4b \u2013 a permanently failed message is skipped for good; checkpoint saved to the client\'s db')
+else:
+    fail('G4b', f'{gone_results}, default db checkpoint {default_checkpoint}')
+gone_db_path.unlink()
+
+# G5 – an expired checkpoint (history 404) falls back to the time-window scan
+svc = _FakeGmailService(total=12, page_size=10)
+svc.history_expired = True
+fetched = GmailClient(service=svc, batch_size=10).get_messages_since(hours=1, incremental=True)
+if len(fetched) == 12 and svc.list_calls == 2:
+    ok('G5 \u2013 expired history checkpoint falls back to time-window scan')
+else:
+    fail('G5', f'fetched {len(fetched)} with {svc.list_calls} list calls')
+
+config.DATABASE_PATH = orig_db_path
+os.unlink(tmp.name)
+
+# G6 – header-first fetch downloads bodies only past the header gate
+svc = _FakeGmailService(total=4, page_size=10)
+svc.extra_headers = {
+    'm0000': {'Subject': 'Morning Notes', 'From': 'NL <nl@example.com>', 'List-Unsubscribe': '<x>'},
+    'm0001': {'Subject': 'Your receipt', 'From': 'Shop <shop@example.com>'},
+    'm0002': {'Subject': 'Lunch?', 'From': 'Pal <pal@example.com>'},
+    'm0003': {'Subject': 'Quarterly letter', 'From': 'Fund <ir@example.com>'},
+}
+svc.unsubscribe_hits = ['m0001', 'm0003']
+fetched = GmailClient(service=svc, batch_size=10).get_messages_header_first(svc.ids)
+full_ids = sorted(i for i, f in svc.formats if f == 'full')
+if (full_ids == ['m0000', 'm0003'] and len(fetched) == 4 and svc.search_calls == 1
+        and fetched[0]['html'] == '<p>hi</p>' and fetched[2]['html'] == ''):
+    ok('G6 \u2013 header-first fetch downloads bodies only for gated + unsubscribe-search hits')
+else:
+    fail('G6', f'full fetches {full_ids}, {len(fetched)} emails, {svc.search_calls} searches')
+
+# G7 – concurrent fetch survives 429s (retried, concurrency halved) and paces quota
+from src.gmail import client as gmail_client_module
+from src.gmail.ratelimit import TokenBucket
+gmail_client_module.RETRY_BASE_DELAY_SECS = 0.01
+svc = _FakeGmailService(total=30, page_size=100)
+svc.throttle_once = {'m0003', 'm0017'}
+fetched = GmailClient(service=svc, fetch_mode='concurrent', max_workers=8,
+                      quota_units_per_sec=None).get_messages_content(svc.ids)
+if sorted(e['gmail_message_id'] for e in fetched) == svc.ids and svc.get_calls == 32:
+    ok('G7 \u2013 concurrent fetch retries throttled messages and returns all of them')
+else:
+    fail('G7', f'{len(fetched)} emails from {svc.get_calls} calls')
+
+import time as _time
+bucket = TokenBucket(rate=1000, capacity=10)
+bucket_started = _time.monotonic()
+for _ in range(4):
+    bucket.acquire(5)                                # 20 units against a 10-unit burst
+waited = _time.monotonic() - bucket_started
+if 0.009 <= waited <= 0.1:
+    ok('G8 \u2013 token bucket pays down quota debt at its configured rate')
+else:
+    fail('G8', f'took {waited:.3f}s')
+
+# G9 – raw RFC 822 ingestion: one parse, real charsets, attachments ignored
+import base64
+from email.message import EmailMessage
+from src.gmail import mime
+raw_msg = EmailMessage()
+raw_msg['From'] = '=?utf-8?q?Caf=C3=A9_Weekly?= <cafe@example.com>'
+raw_msg['Subject'] = 'Issue #12'
+raw_msg['Date'] = 'Mon, 02 Feb 2026 08:00:00 +0000'
+raw_msg.set_content('Plain édition', charset='iso-8859-1', cte='quoted-printable')
+raw_msg.add_alternative('<p>Crème brûlée</p>', subtype='html', charset='iso-8859-1', cte='quoted-printable')
+raw_msg.add_attachment('<p>not the body</p>', subtype='html', filename='old.html')
+raw_bytes = raw_msg.as_bytes()
+parsed_raw = GmailClient(service=object())._parse_message(
+    {'id': 'r1', 'threadId': 't1', 'raw': base64.urlsafe_b64encode(raw_bytes).decode('ascii')})
+stdlib = mime._collect_bodies_stdlib(raw_bytes)
+if (parsed_raw['html'].strip() == '<p>Crème brûlée</p>' and parsed_raw['text'].strip() == 'Plain édition'
+        and parsed_raw['sender_name'] == 'Café Weekly' and parsed_raw['sender_email'] == 'cafe@example.com'
+        and stdlib == {'text/html': parsed_raw['html'], 'text/plain': parsed_raw['text']}):
+    ok('G9 \u2013 raw format parse decodes charsets + encoded headers, skips attachments')
+else:
+    fail('G9', f'html={parsed_raw["html"]!r} text={parsed_raw["text"]!r} from={parsed_raw["sender_name"]!r}')
+
+# G9b – a boundary that is a prefix of a nested one ("b1" / "b1_alt") only
+# splits on its own delimiter lines
+nested_raw = (b'From: a@example.com\r\nSubject: Nested\r\nMIME-Version: 1.0\r\n'
+              b'Content-Type: multipart/mixed; boundary="b1"\r\n\r\n'
+              b'--b1\r\nContent-Type: multipart/alternative; boundary="b1_alt"\r\n\r\n'
+              b'--b1_alt\r\nContent-Type: text/html\r\n\r\n<p>body</p>\r\n'
+              b'--b1_alt--\r\n'
+              b'--b1 \r\nContent-Type: text/plain\r\n\r\nfooter text\r\n'
+              b'--b1--\r\n')
+nested = mime.parse_raw_message(nested_raw, 'n1')
+nested_stdlib = mime._collect_bodies_stdlib(nested_raw)
+if (nested['text'] == 'footer text' and nested['html'] == '<p>body</p>'
+        and nested_stdlib == {'text/html': nested['html'], 'text/plain': nested['text']}):
+    ok('G9b \u2013 prefix boundaries split only on their own delimiter lines, like email.parser')
+else:
+    fail('G9b', f'html={nested["html"]!r} text={nested["text"]!r} stdlib={nested_stdlib!r}')
+
+# G9c – raw UTF-8 headers (RFC 6532, as in Gmail raw and Takeout mbox) decode as text
+utf8_raw = ('From: \u00dcn\u00efcode <u@example.com>\r\nSubject: Caf\u00e9 \u2615 weekly\r\n'
+            'Content-Type: text/plain; charset=utf-8\r\n\r\nhi\r\n').encode('utf-8')
+utf8 = mime.parse_raw_message(utf8_raw, 'u1')
+if (utf8['subject'] == 'Caf\u00e9 \u2615 weekly' and utf8['sender_name'] == '\u00dcn\u00efcode'
+        and mime.parse_raw_headers(utf8_raw) == utf8['headers']):
+    ok('G9c \u2013 raw UTF-8 Subject and From display name decode without mojibake')
+else:
+    fail('G9c', f'subject={utf8["subject"]!r} from={utf8["sender_name"]!r}')
+
+# G9d – headers end at the first blank line, whatever its line endings, and a
+# part that opens with a blank line has no headers and keeps its whole body
+mixed_raw = b'Subject: Mixed\nContent-Type: text/plain\n\nline1\nline2\r\n\r\nline3'
+headless_raw = (b'Subject: Headless\r\nContent-Type: multipart/alternative; boundary="XX"\r\n\r\n'
+                b'--XX\r\n\r\nPlain part line one\r\n\r\nline two\r\n--XX--\r\n')
+split_cases = [(mime.parse_raw_message(raw, 'd1')['text'], mime._collect_bodies_stdlib(raw)['text/plain'])
+               for raw in (mixed_raw, headless_raw)]
+if split_cases == [('line1\nline2\r\n\r\nline3',) * 2, ('Plain part line one\r\n\r\nline two',) * 2]:
+    ok('G9d \u2013 earliest blank line ends the headers; headerless parts keep their whole body')
+else:
+    fail('G9d', f'{split_cases}')
+
+# G10 – message cache: second fetch is served from disk, LRU eviction respects the cap
+import shutil
+from src.gmail.cache import MessageCache
+cache_dir = Path(tempfile.mkdtemp())
+cache = MessageCache(cache_dir=cache_dir, max_bytes=10_000_000)
+svc = _FakeGmailService(total=6, page_size=10)
+GmailClient(service=svc, batch_size=10, cache=cache).get_messages_content(svc.ids)
+calls_after_first = svc.get_calls
+again = GmailClient(service=svc, batch_size=10, cache=cache).get_messages_content(svc.ids)
+meta = GmailClient(service=svc, batch_size=10, cache=cache).get_messages_content(svc.ids, fmt='metadata')
+if len(again) == 6 and len(meta) == 6 and svc.get_calls == calls_after_first == 6:
+    ok('G10 \u2013 cached messages (and metadata lookups) never hit the network')
+else:
+    fail('G10', f'get calls {calls_after_first} -> {svc.get_calls}')
+
+# G10b – cache hits and fetched messages come back interleaved in input order,
+# with a message that could not be fetched left out
+svc = _FakeGmailService(total=8, page_size=10)
+svc.batch_failures = {'m0005'}
+mixed_cache = MessageCache(cache_dir=cache_dir / 'mixed', max_bytes=10_000_000)
+GmailClient(service=svc, batch_size=10, cache=mixed_cache).get_messages_content(svc.ids[::3])
+mixed = _LossyClient(service=svc, batch_size=10, cache=mixed_cache).get_messages_content(svc.ids)
+expected = [i for i in svc.ids if i != 'm0005']
+if [e['gmail_message_id'] for e in mixed] == expected:
+    ok('G10b \u2013 cache hits and fetched messages keep input order')
+else:
+    fail('G10b', f'{[e["gmail_message_id"] for e in mixed]}')
+
+small = MessageCache(cache_dir=cache_dir / 'small', max_bytes=1500)
+for i in range(20):
+    small.put({'id': f'x{i:03d}', 'threadId': 't', 'raw': os.urandom(150).hex()}, 'raw')
+if small.size_bytes <= 1500 and small.get('x019', 'raw') and not small.get('x000', 'raw'):
+    ok('G11 \u2013 cache evicts least recently used entries to stay under its cap')
+else:
+    fail('G11', f'size {small.size_bytes}')
+shutil.rmtree(cache_dir)
+
+# ==================================================================
+# H – Replay
+# ==================================================================
+print('\n\u2500\u2500 H: Offline replay \u2500\u2500')
+
+import base64
+from src.claude import api_helpers
+from src.main import NewsletterDigestApp
+
+replay_dir = Path(tempfile.mkdtemp())
+saved_config = {k: getattr(config, k) for k in (
+    'CLAUDE_CACHE_ENABLED', 'CLAUDE_CACHE_DIR', 'REPLAY_MANIFEST_DIR',
+    'DOCS_DIR', 'EMAIL_OUTPUT_DIR', 'DATABASE_PATH')}
+config.CLAUDE_CACHE_ENABLED = True
+config.CLAUDE_CACHE_DIR = replay_dir / 'claude'
+config.REPLAY_MANIFEST_DIR = replay_dir / 'runs'
+config.DOCS_DIR = replay_dir / 'docs'
+config.EMAIL_OUTPUT_DIR = replay_dir / 'email'
+config.DATABASE_PATH = replay_dir / 'replay.db'
+for d in (config.DOCS_DIR, config.EMAIL_OUTPUT_DIR):
+    d.mkdir()
+
+# H1 – identical prompts are answered from the response cache; offline misses raise
+class _CountingClient:
+    calls = 0
+    class messages:
+        @staticmethod
+        def create(**kw):
+            _CountingClient.calls += 1
+            resp = MagicMock(stop_reason='end_turn'); resp.content = [MagicMock(text='["cached summary"]')]
+            return resp
+prompt = [{'role': 'user', 'content': 'Summarise this.'}]
+first = api_helpers.call_claude(_CountingClient, model='m', max_tokens=10, messages=prompt)
+second = api_helpers.call_claude(_CountingClient, model='m', max_tokens=10, messages=prompt)
+api_helpers.OFFLINE = True
+try:
+    api_helpers.call_claude(_CountingClient, model='m', max_tokens=10,
+                            messages=[{'role': 'user', 'content': 'never sent'}])
+    missed = False
+except api_helpers.ClaudeCacheMiss:
+    missed = True
+if (_CountingClient.calls == 1 and missed
+        and second.content[0].text == first.content[0].text == '["cached summary"]'):
+    ok('H1 \u2013 repeated prompt served from cache; offline miss raises ClaudeCacheMiss')
+else:
+    fail('H1', f'api calls {_CountingClient.calls}, offline miss raised {missed}')
+
+# H1b – truncated or unparseable answers are not cached, and a cached answer
+# the caller can't parse is evicted and asked again
+class _ScriptedClient:
+    replies = []
+    class messages:
+        @staticmethod
+        def create(**kw):
+            stop_reason, text = _ScriptedClient.replies.pop(0)
+            resp = MagicMock(stop_reason=stop_reason); resp.content = [MagicMock(text=text)]
+            return resp
+_ScriptedClient.replies = [('max_tokens', '["cut o'), ('end_turn', 'not json'),
+                           ('end_turn', '["fine"]')]
+is_list = lambda text: text.startswith('[') and text.endswith(']')
+ask = lambda content, valid=is_list: api_helpers.call_claude(
+    _ScriptedClient, model='m', max_tokens=10, messages=[{'role': 'user', 'content': content}],
+    valid=valid).content[0].text
+api_helpers.OFFLINE = False
+try:
+    answers = [ask('truncated'), ask('truncated'), ask('truncated'), ask('truncated')]
+    api_helpers.call_claude(_CountingClient, model='m', max_tokens=10, messages=prompt,
+                            valid=lambda text: False)   # H1's entry, now rejected
+finally:
+    api_helpers.OFFLINE = True
+if (answers == ['["cut o', 'not json', '["fine"]', '["fine"]'] and not _ScriptedClient.replies
+        and _CountingClient.calls == 2):
+    ok('H1b \u2013 only complete, parseable answers are cached; a bad cached one is evicted')
+else:
+    fail('H1b', f'answers {answers}, calls {_CountingClient.calls}')
+
+# H2 – --replay rebuilds a recorded run from the caches with no DB writes
+replay_html = ('<html><body><h2><a href="https://example.com/replayed">Replayed Story</a></h2><p>'
+               + 'The newsletter editor wrote a longer blurb about the replayed story. ' * 12
+               + '</p></body></html>')
+replay_message = {'id': 'r1', 'threadId': 'r1', 'payload': {
+    'mimeType': 'text/html',
+    'headers': [{'name': 'From', 'value': 'Replay Weekly <news@replay.example>'},
+                {'name': 'Subject', 'value': 'Replay Weekly #1'},
+                {'name': 'Date', 'value': 'Tue, 03 Feb 2026 08:00:00 +0000'}],
+    'body': {'data': base64.urlsafe_b64encode(replay_html.encode()).decode()}}}
+replay_cache = MessageCache(cache_dir=replay_dir / 'messages')
+replay_cache.put(replay_message, 'full')
+config.REPLAY_MANIFEST_DIR.mkdir()
+(config.REPLAY_MANIFEST_DIR / '2026-02-03.json').write_text(json.dumps(
+    {'date': '2026-02-03', 'body_format': 'full', 'message_ids': ['r1', 'missing']}))
+
+import src.main as main_module
+orig_cache_cls = main_module.MessageCache
+main_module.MessageCache = lambda: replay_cache
+try:
+    app = NewsletterDigestApp()
+    out_path = app.replay('2026-02-03')
+    out_html = Path(out_path).read_text(encoding='utf-8') if out_path else ''
+    db = Database()
+    rows = db.conn.execute('SELECT (SELECT COUNT(*) FROM processed_emails) + '
+                           '(SELECT COUNT(*) FROM articles)').fetchone()[0]
+    db.close()
+    if (out_path == str(config.DOCS_DIR / '2026-02-03_digest.html')
+            and 'Replayed Story' in out_html and 'February 03, 2026' in out_html and rows == 0):
+        ok('H2 \u2013 replay rebuilds the dated digest offline without touching the DB')
+    else:
+        fail('H2', f'path {out_path}, db rows {rows}')
+except Exception as e:
+    fail('H2', repr(e))
+finally:
+    main_module.MessageCache = orig_cache_cls
+    api_helpers.OFFLINE = False
+    for k, v in saved_config.items():
+        setattr(config, k, v)
+    shutil.rmtree(replay_dir)
+
+# ==================================================================
+# I – LocalMailSource
+# ==================================================================
+print('\n\u2500\u2500 I: LocalMailSource \u2500\u2500')
+
+import mailbox
+from email.message import EmailMessage
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from src.sources import LocalMailSource
+
+def _archive_message(n, sent):
+    msg = EmailMessage()
+    msg['From'] = f'Archive Weekly <news{n}@archive.example>'
+    msg['Subject'] = f'Archive Weekly #{n}'
+    msg['Date'] = format_datetime(sent)
+    msg['Message-ID'] = f'<issue-{n}@archive.example>'
+    msg['List-Unsubscribe'] = '<https://archive.example/unsubscribe>'
+    msg.set_content('Plain edition.')
+    msg.add_alternative(f'<p>Issue {n} \u2013 caf\u00e9 edition</p>', subtype='html')
+    return msg
+
+now = datetime.now(timezone.utc)
+archive = [_archive_message(1, now - timedelta(hours=2)),
+           _archive_message(2, now - timedelta(days=400))]
+archive_dir = Path(tempfile.mkdtemp())
+mbox = mailbox.mbox(str(archive_dir / 'export.mbox'))
+maildir = mailbox.Maildir(str(archive_dir / 'Maildir'))
+(archive_dir / 'eml').mkdir()
+for i, msg in enumerate(archive):
+    mbox.add(msg); maildir.add(msg)
+    (archive_dir / 'eml' / f'{i}.eml').write_bytes(msg.as_bytes())
+mbox.flush(); mbox.close()
+
+# I1 – every archive layout yields the same dicts GmailClient builds from format='raw'
+sources = {kind: LocalMailSource(archive_dir / sub)
+           for kind, sub in (('mbox', 'export.mbox'), ('maildir', 'Maildir'), ('eml', 'eml'))}
+parsed = {kind: sorted(src.iter_messages(), key=lambda e: e['subject'])
+          for kind, src in sources.items()}
+raw_resource = {'id': 'x', 'threadId': None,
+                'raw': base64.urlsafe_b64encode(archive[0].as_bytes()).decode()}
+via_gmail = GmailClient(service=object())._parse_message(raw_resource)
+first = parsed['eml'][0]
+if ({k: src.kind for k, src in sources.items()} == {'mbox': 'mbox', 'maildir': 'maildir', 'eml': 'eml'}
+        and parsed['mbox'] == parsed['maildir'] == parsed['eml']
+        and first['gmail_message_id'].startswith('local:')
+        and {k: v for k, v in first.items() if k != 'gmail_message_id'}
+            == {k: v for k, v in via_gmail.items() if k != 'gmail_message_id'}):
+    ok('I1 \u2013 mbox, Maildir and .eml give identical dicts in GmailClient\'s shape')
+else:
+    fail('I1', f'{parsed["mbox"][:1]} vs {via_gmail}')
+
+# I2 – get_messages_since honours the time window and skips processed messages
+config.DATABASE_PATH = archive_dir / 'import.db'
+recent = sources['mbox'].get_messages_since(hours=24)
+everything = sources['mbox'].get_messages_since(hours=None)
+db = Database(); db.store_email({**everything[0], 'is_newsletter': True}); db.close()
+after_import = sources['maildir'].get_messages_since(hours=None)
+config.DATABASE_PATH = orig_db_path
+if (len(recent) == 1 and recent[0]['subject'] == 'Archive Weekly #1'
+        and len(everything) == 2 and len(after_import) == 1):
+    ok('I2 \u2013 time window applied, already-imported messages skipped on re-import')
+else:
+    fail('I2', f'recent {len(recent)}, all {len(everything)}, re-import {len(after_import)}')
+
+# I3 – one processed_emails query per import, and only new in-window messages are parsed
+config.DATABASE_PATH = archive_dir / 'import.db'
+calls = {'filter_unprocessed': 0, 'check_if_processed': 0, 'parse': 0}
+def _counted(owner, name):
+    original = getattr(owner, name)
+    def wrapper(*args, **kwargs):
+        calls[name] += 1
+        return original(*args, **kwargs)
+    return original, wrapper
+patched = [(Database, 'filter_unprocessed'), (Database, 'check_if_processed'), (LocalMailSource, 'parse')]
+originals = []
+for owner, name in patched:
+    original, wrapper = _counted(owner, name)
+    originals.append(original)
+    setattr(owner, name, staticmethod(wrapper) if name == 'parse' else wrapper)
+try:
+    (archive_dir / 'eml' / '2.eml').write_bytes(_archive_message(3, now - timedelta(hours=1)).as_bytes())
+    fresh = sources['eml'].get_messages_since(hours=24)
+finally:
+    for (owner, name), original in zip(patched, originals):
+        setattr(owner, name, staticmethod(original) if name == 'parse' else original)
+    config.DATABASE_PATH = orig_db_path
+if ([e['subject'] for e in fresh] == ['Archive Weekly #3']
+        and calls == {'filter_unprocessed': 1, 'check_if_processed': 0, 'parse': 1}):
+    ok('I3 \u2013 one filter_unprocessed() per import, old and seen messages never parsed')
+else:
+    fail('I3', f'{[e["subject"] for e in fresh]}, calls {calls}')
+shutil.rmtree(archive_dir)
+
+# ==================================================================
+# J – Streaming pipeline
+# ==================================================================
+print('\n\u2500\u2500 J: Streaming pipeline \u2500\u2500')
+
+from src.sources import MessageSource
+
+class _RecordingSource(MessageSource):
+    """Yields newsletters, tracking how many already-yielded ones still hold their HTML"""
+    def __init__(self, count):
+        self.count = count; self.max_held = 0
+    def iter_messages_since(self, hours=24, incremental=False):
+        yielded = []
+        for i in range(self.count):
+            self.max_held = max(self.max_held, sum('html' in e for e in yielded))
+            yielded.append({
+                'gmail_message_id': f'stream{i}', 'thread_id': None,
+                'subject': f'Stream Weekly #{i}', 'sender_email': 'news@stream.example',
+                'sender_name': 'Stream Weekly', 'received_timestamp': '2026-02-03T08:00:00+00:00',
+                'headers': {'List-Unsubscribe': '<x>'}, 'text': '',
+                'html': replay_html.replace('replayed', f'replayed{i}'),
+            })
+            yield yielded[-1]
+
+stream_dir = Path(tempfile.mkdtemp())
+saved_config = {k: getattr(config, k) for k in (
+    'DOCS_DIR', 'EMAIL_OUTPUT_DIR', 'DATABASE_PATH', 'PIPELINE_QUEUE_SIZE', 'PIPELINE_EXTRACT_WORKERS')}
+config.DOCS_DIR = stream_dir; config.EMAIL_OUTPUT_DIR = stream_dir
+config.DATABASE_PATH = stream_dir / 'stream.db'
+config.PIPELINE_QUEUE_SIZE = 2; config.PIPELINE_EXTRACT_WORKERS = 1
+api_helpers.OFFLINE = True      # no Claude cache → fallbacks, no network
+try:
+    # J1 – a full run keeps only a queue's worth of emails' HTML alive
+    source = _RecordingSource(30)
+    out_path = NewsletterDigestApp(source=source).run(hours_back=None, backfill=True)
+    db = Database()
+    stored = db.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+    db.close()
+    # two queues of 2, plus one email in hand at the gate and the extractor
+    if out_path and source.max_held <= 6 and stored == 30:
+        ok('J1 \u2013 run streams: HTML held for at most a queue\'s worth of emails')
+    else:
+        fail('J1', f'path {out_path}, emails holding html {source.max_held}, articles {stored}')
+except Exception as e:
+    fail('J1', repr(e))
+finally:
+    api_helpers.OFFLINE = False
+    for k, v in saved_config.items():
+        setattr(config, k, v)
+    shutil.rmtree(stream_dir)
+
+# J2 – out-of-order extraction still yields ordered articles and fixed-size Claude batches
+import random
+from src.pipeline import DigestPipeline
+
+class _SlowExtractor:
+    def extract_from_email(self, html_content, newsletter_name='', newsletter_email='',
+                           received_timestamp=''):
+        _time.sleep(random.uniform(0, 0.01))
+        n = int(html_content)
+        return [{'title': f'a{n}', 'article_type': 'essay' if n % 2 else 'link'}]
+class _BatchSummarizer:
+    batches = []
+    def summarize_essays(self, essays):
+        self.batches.append([e['title'] for e in essays])
+        return [{**e, 'summary': f"s-{e['title']}"} for e in essays]
+class _BatchCategorizer:
+    batches = []
+    def categorize_articles(self, links):
+        self.batches.append([l['title'] for l in links])
+        return {i: 'Technology & AI' for i in range(len(links))}
+
+nls = [{'gmail_message_id': f'n{i}', 'html': str(i), 'headers': {}, 'sender_email': ''} for i in range(10)]
+pipe = DigestPipeline(_SlowExtractor(), _BatchSummarizer(), _BatchCategorizer(),
+                      extract_workers=3, essay_batch_size=2, link_batch_size=3)
+res = pipe.run(iter(nls))
+if ([a['title'] for a in res['articles']] == [f'a{i}' for i in range(10)]
+        and _BatchSummarizer.batches == [['a1', 'a3'], ['a5', 'a7'], ['a9']]
+        and _BatchCategorizer.batches == [['a0', 'a2', 'a4'], ['a6', 'a8']]
+        and all(e['summary'] == f"s-{e['title']}" for e in res['essays'])
+        and all(l['category'] == 'Technology & AI' for l in res['links'])
+        and pipe.stats['extract'].items == 10 and pipe.stats['categorise'].items == 5):
+    ok('J2 \u2013 pipeline keeps arrival order and sends deterministic batches as they fill')
+else:
+    fail('J2', f'{[a["title"] for a in res["articles"]]}, {_BatchSummarizer.batches}, {_BatchCategorizer.batches}')
+
+# J3 – the gate stores emails in the pipeline's own database, and a failed
+# store stops the run instead of dropping that batch
+gate_dir = Path(tempfile.mkdtemp())
+try:
+    gate_db = Database(gate_dir / 'custom_gate.db')
+    nls = [{'gmail_message_id': f'g{i}', 'subject': 'Issue', 'sender_email': 'nl@example.com',
+            'received_timestamp': '2026-02-03T08:00:00', 'html': str(i),
+            'headers': {'List-Unsubscribe': '<x>'}} for i in range(4)]
+    res = DigestPipeline(_SlowExtractor(), _BatchSummarizer(), _BatchCategorizer(),
+                         db=gate_db).run(iter(nls))
+    stored = gate_db.conn.execute('SELECT COUNT(*) FROM processed_emails').fetchone()[0]
+    linked = gate_db.conn.execute('SELECT COUNT(*) FROM articles a JOIN processed_emails e '
+                                  'ON e.id = a.email_id').fetchone()[0]
+
+    pulled = []
+    def _counting(emails):
+        for email in emails:
+            pulled.append(email['gmail_message_id'])
+            yield email
+    broken = Database(gate_dir / 'broken.db')
+    broken.conn.execute("CREATE TRIGGER no_emails BEFORE INSERT ON processed_emails "
+                        "BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    more = [{'gmail_message_id': f'b{i}', 'subject': 'Issue', 'sender_email': 'nl@example.com',
+             'received_timestamp': '2026-02-03T08:00:00', 'html': '1',
+             'headers': {'List-Unsubscribe': '<x>'}} for i in range(200)]
+    try:
+        DigestPipeline(_SlowExtractor(), _BatchSummarizer(), _BatchCategorizer(), db=broken,
+                       queue_size=2).run(_counting(more))
+        raised = None
+    except sqlite3.Error as e:
+        raised = e
+    broken.close(); gate_db.close()
+    if stored == 4 and linked == 4 and raised is not None and len(pulled) < len(more):
+        ok(f'J3 \u2013 gate writes to the pipeline\'s database; a failed store stops the run '
+           f'({len(pulled)}/{len(more)} emails pulled)')
+    else:
+        fail('J3', f'stored {stored}, linked {linked}, raised {raised!r}, pulled {len(pulled)}')
+except Exception as e:
+    fail('J3', repr(e))
+finally:
+    shutil.rmtree(gate_dir)
+
+# ==================================================================
+# K – Database bulk writes
+# ==================================================================
+print('\n\u2500\u2500 K: Database bulk writes \u2500\u2500')
+
+import src.database.models as models
+tmp = tempfile.NamedTemporaryFile(suffix='.db', delete=False); tmp.close()
+db = Database(Path(tmp.name))
+_email = lambda mid: {'gmail_message_id': mid, 'subject': 'S', 'sender_email': 'a@b.com',
+                      'received_timestamp': '2026-02-03T00:00:00', 'is_newsletter': True}
+
+# K1 – bulk email insert returns IDs in input order, existing rows keep theirs
+first = db.store_email(_email('k-1'))
+ids = db.store_emails_bulk([_email('k-2'), _email('k-1'), _email('k-3')])
+rows = db.conn.execute('SELECT COUNT(*) FROM processed_emails').fetchone()[0]
+if ids[1] == first and len(set(ids)) == 3 and rows == 3:
+    ok('K1 \u2013 store_emails_bulk returns existing and new IDs in order')
+else:
+    fail('K1', f'first {first}, bulk {ids}, rows {rows}')
+
+# K2 – bulk article insert spans several statements and keeps IDs aligned
+saved_rows, models.BULK_INSERT_ROWS = models.BULK_INSERT_ROWS, 7
+try:
+    pairs = [({'title': f't{i}', 'content': f'body {i}'}, ids[i % 3]) for i in range(20)]
+    article_ids = db.store_articles_bulk(pairs)
+    titles = [db.conn.execute('SELECT title FROM articles WHERE id = ?', (i,)).fetchone()[0]
+              for i in article_ids]
+    if titles == [f't{i}' for i in range(20)]:
+        ok('K2 \u2013 store_articles_bulk IDs map back to the input rows')
+    else:
+        fail('K2', f'{titles}')
+finally:
+    models.BULK_INSERT_ROWS = saved_rows
+    db.close()
+    os.unlink(tmp.name)
+
+# ==================================================================
+# L – SQLite connection manager
+# ==================================================================
+print('\n\u2500\u2500 L: SQLite connection manager \u2500\u2500')
+
+import threading
+tmp_dir = tempfile.mkdtemp()
+db_file = Path(tmp_dir) / 'l.db'
+
+# L1 – Databases on one thread share a WAL connection; schema is created once
+db_a, db_b = Database(db_file), Database(db_file)
+mode = db_a.conn.execute('PRAGMA journal_mode').fetchone()[0]
+created = []
+db_a._manager.ensure_schema(lambda: created.append(1))
+shared = db_a.conn is db_b.conn
+db_b.close()
+still_open = db_a.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0] == 0
+db_a.close()
+if mode == 'wal' and shared and not created and still_open:
+    ok('L1 \u2013 one tuned WAL connection per thread, schema set up once')
+else:
+    fail('L1', f'mode {mode}, shared {shared}, re-created {created}, open {still_open}')
+
+# L2 – writers on several threads don't trip over the lock
+def _writer(n):
+    try:
+        db = Database(db_file)
+        for i in range(20):
+            db.store_email(_email(f'l{n}-{i}'))
+        db.close()
+    except Exception as e:
+        writer_errors.append(e)
+writer_errors = []
+writers = [threading.Thread(target=_writer, args=(n,)) for n in range(4)]
+for t in writers:
+    t.start()
+for t in writers:
+    t.join()
+db = Database(db_file)
+rows = db.conn.execute('SELECT COUNT(*) FROM processed_emails').fetchone()[0]
+db.close()
+if not writer_errors and rows == 80:
+    ok('L2 \u2013 concurrent writers on their own connections all commit')
+else:
+    fail('L2', f'errors {writer_errors}, rows {rows}')
+
+# L3 – a deleted database file gets its schema again
+shutil.rmtree(tmp_dir)
+os.makedirs(tmp_dir)
+db = Database(db_file)
+try:
+    db.store_email(_email('l-new'))
+    ok('L3 \u2013 schema is recreated when the file goes away')
+except Exception as e:
+    fail('L3', repr(e))
+finally:
+    db.close()
+    shutil.rmtree(tmp_dir)
+
+# ==================================================================
+# M – Set-based duplicate detection
+# ==================================================================
+print('\n\u2500\u2500 M: Set-based duplicate detection \u2500\u2500')
+
+from src.database.bloom import BloomFilter
+import src.database.models as models
+tmp_dir = tempfile.mkdtemp()
+db_file = Path(tmp_dir) / 'm.db'
+db = Database(db_file)
+db.store_emails_bulk([_email(f'm-{i}') for i in range(0, 50, 2)])
+
+# M1 – filter_unprocessed keeps input order across several IN (...) chunks
+saved_ids, models.BULK_QUERY_IDS = models.BULK_QUERY_IDS, 7
+try:
+    asked = [f'm-{i}' for i in range(50)]
+    left = db.filter_unprocessed(asked)
+    if left == [f'm-{i}' for i in range(1, 50, 2)]:
+        ok('M1 \u2013 filter_unprocessed returns only new IDs, in order')
+    else:
+        fail('M1', f'{left}')
+finally:
+    models.BULK_QUERY_IDS = saved_ids
+
+# M2 – IDs the Bloom filter has never seen don't reach SQLite
+from src.database.connection import statement_counts
+reads_before = statement_counts()[0]
+left = db.filter_unprocessed([f'new-{i}' for i in range(200)])
+reads = statement_counts()[0] - reads_before
+if len(left) == 200 and reads == 0:
+    ok('M2 \u2013 unseen IDs resolved by the Bloom filter without a query')
+else:
+    fail('M2', f'{len(left)} new, {reads} reads')
+
+# M3 – stored IDs join the filter; no false negatives
+db.store_emails_bulk([_email('m-late')])
+bloom = BloomFilter(1000, 0.01)
+bloom.update(f'x{i}' for i in range(1000))
+false_pos = sum(f'y{i}' in bloom for i in range(10000))
+if (db.check_if_processed('m-late') and all(f'x{i}' in bloom for i in range(1000))
+        and false_pos < 300):
+    ok('M3 \u2013 Bloom filter tracks new IDs and stays near its error rate')
+else:
+    fail('M3', f'false positives {false_pos}/10000')
+db.close()
+shutil.rmtree(tmp_dir)
+
+# M4 – a pipeline run reports per-stage SQL; extract and route issue no reads
+# (route's three writes: the shared article body, the articles, their index rows)
+class _ThreeArticles:
+    def extract_from_email(self, html_content, newsletter_name='', newsletter_email='',
+                           received_timestamp=''):
+        return [{'title': f'{html_content}-{i}', 'article_type': 'link', 'content': 'x'}
+                for i in range(3)]
+class _NoClaude:
+    def categorize_articles(self, links):
+        return {}
+
+saved_path, config.DATABASE_PATH = config.DATABASE_PATH, Path(tempfile.mkdtemp()) / 'm4.db'
+try:
+    main_db = Database()
+    emails = [{**_email(f'm4-{i}'), 'html': str(i), 'headers': {'List-Unsubscribe': '<x>'},
+               'sender_name': 'N', 'text': ''} for i in range(12)]
+    pipe = DigestPipeline(_ThreeArticles(), None, _NoClaude(), db=main_db, extract_workers=2)
+    res = pipe.run(iter(emails))
+    stored = main_db.conn.execute('SELECT COUNT(DISTINCT email_id) FROM articles').fetchone()[0]
+    main_db.close()
+    st = pipe.stats
+    if (len(res['articles']) == 36 and stored == 12
+            and st['extract'].reads == st['route'].reads == 0
+            and st['route'].writes == 3 and 1 <= st['gate'].writes <= 12):
+        ok('M4 \u2013 row IDs flow through: extract and route issue zero reads')
+    else:
+        fail('M4', f"{len(res['articles'])} articles over {stored} emails; "
+                   + ', '.join(f'{k} r{v.reads}/w{v.writes}' for k, v in st.items()))
+finally:
+    shutil.rmtree(config.DATABASE_PATH.parent)
+    config.DATABASE_PATH = saved_path
+
+# ==================================================================
+# N – Content-addressed article bodies
+# ==================================================================
+print('\n\u2500\u2500 N: Content-addressed article bodies \u2500\u2500')
+
+tmp_dir = tempfile.mkdtemp()
+db = Database(Path(tmp_dir) / 'n.db')
+email_id = db.store_email(_email('n-1'))
+sponsor = 'Brought to you by Acme. ' * 100
+ids = db.store_articles_bulk([({'title': 'Sponsor', 'content': sponsor}, email_id),
+                              ({'title': 'Story', 'content': 'A real story. ' * 80}, email_id),
+                              ({'title': 'Sponsor again', 'content': sponsor}, email_id)])
+db.store_article({'title': 'Sponsor, next day', 'content': sponsor}, email_id)
+
+# N1 – identical bodies are stored once, compressed
+blob_rows, blob_bytes = db.conn.execute('SELECT COUNT(*), SUM(LENGTH(data)) FROM blobs').fetchone()
+inline = db.conn.execute('SELECT COUNT(*) FROM articles WHERE content IS NOT NULL').fetchone()[0]
+if blob_rows == 2 and blob_bytes < len(sponsor) and inline == 0:
+    ok('N1 \u2013 duplicate bodies share one compressed blob')
+else:
+    fail('N1', f'{blob_rows} blobs, {blob_bytes} bytes, {inline} inline bodies')
+
+# N2 – readers get the body back, with the snippet derived from it
+art = db.get_article_with_metadata(ids[2])
+recent = db.get_recent_articles(hours=1)
+if (art['content'] == sponsor and art['content_snippet'] == sponsor[:500]
+        and len(recent) == 4 and all(r['content'] for r in recent)):
+    ok('N2 \u2013 article bodies and snippets are rebuilt on read')
+else:
+    fail('N2', f'{art and art["content"][:40]!r}, {len(recent)} recent')
+db.close()
+shutil.rmtree(tmp_dir)
+
+# ==================================================================
+# O – Full-text article search
+# ==================================================================
+print('\n\u2500\u2500 O: Full-text article search \u2500\u2500')
+
+tmp_dir = tempfile.mkdtemp()
+db = Database(Path(tmp_dir) / 'o.db')
+email_id = db.store_email(_email('o-1'))
+filler = 'Markets were quiet this week and little else happened. ' * 10
+db.store_articles_bulk([
+    ({'title': 'Chip export rules tighten', 'content': filler + 'New chip export limits apply.',
+      'newsletter_name': 'Policy Weekly', 'received_timestamp': '2026-01-10T08:00:00'}, email_id),
+    ({'title': 'Quiet markets', 'content': filler + 'A chip maker mentioned export plans.',
+      'newsletter_name': 'Money Daily', 'received_timestamp': '2025-06-01T08:00:00'}, email_id),
+    ({'title': 'Gardening tips', 'content': filler, 'blurb': 'Nothing about chips',
+      'newsletter_name': 'Green Thumb', 'received_timestamp': '2026-01-11T08:00:00'}, email_id),
+])
+
+# O1 – every word must match; title hits rank first; snippet brackets the terms
+hits = db.search_articles('chip EXPORT')
+if ([h['title'] for h in hits] == ['Chip export rules tighten', 'Quiet markets']
+        and hits[0]['score'] < hits[1]['score'] and '[export]' in hits[1]['snippet']
+        and db.search_articles('  ?! ') == []):
+    ok('O1 \u2013 search_articles ranks by bm25 and returns highlighted snippets')
+else:
+    fail('O1', f'{[(h["title"], h["score"], h["snippet"][-60:]) for h in hits]}')
+
+# O2 – since filters on received date
+hits = db.search_articles('chip export', since='2026-01-01')
+if [h['title'] for h in hits] == ['Chip export rules tighten']:
+    ok('O2 \u2013 since limits results to recent articles')
+else:
+    fail('O2', f'{[h["title"] for h in hits]}')
+
+# O3 – rows that predate the index are picked up by a rebuild
+db.conn.execute('''INSERT INTO articles (email_id, title, content, newsletter_name)
+                   VALUES (?, 'Legacy post', 'An old inline body about export', 'Old News')''',
+                (email_id,))
+db.conn.commit()
+before = len(db.search_articles('legacy'))
+indexed = db.rebuild_search_index()
+after = [h['title'] for h in db.search_articles('export')]
+if before == 0 and indexed == 4 and 'Legacy post' in after and len(after) == 3:
+    ok('O3 \u2013 rebuild_search_index covers articles stored before the index')
+else:
+    fail('O3', f'before {before}, indexed {indexed}, after {after}')
+db.close()
+shutil.rmtree(tmp_dir)
+
+# ==================================================================
+# P – Schema migrations and query plans
+# ==================================================================
+print('\n\u2500\u2500 P: Schema migrations and query plans \u2500\u2500')
+
+from src.database.connection import connection_manager
+from src.database.migrations import SCHEMA_VERSION, schema_version
+tmp_dir = tempfile.mkdtemp()
+db_file = Path(tmp_dir) / 'p.db'
+db = Database(db_file)
+db.store_email(_email('p-1'))
+db.close()
+
+# P1 – a database from before the migrations is brought up to date on open
+legacy = sqlite3.connect(str(db_file))
+for index in ('idx_articles_extraction_ts', 'idx_articles_received_ts', 'idx_articles_email_id'):
+    legacy.execute(f'DROP INDEX {index}')
+legacy.execute('PRAGMA user_version = 0')
+legacy.commit()
+legacy.close()
+connection_manager(db_file).schema_ready = False
+db = Database(db_file)
+indexes = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+if (schema_version(db.conn) == SCHEMA_VERSION and 'idx_articles_email_id' in indexes
+        and db.check_if_processed('p-1')):
+    ok('P1 \u2013 user_version drives pending migrations on an existing database')
+else:
+    fail('P1', f'version {schema_version(db.conn)}, indexes {sorted(indexes)}')
+
+# P2 – no public read method scans a whole table
+plans = db.explain_queries()
+scans = [(call, line) for call, statements in plans.items() if not call.startswith('Bloom')
+         for _, plan in statements for line in plan
+         if line.startswith('SCAN') and 'VIRTUAL TABLE' not in line and line != 'SCAN r']
+recent_plan = ' '.join(plans['get_recent_articles(24)'][0][1])
+if not scans and 'idx_articles_extraction_ts' in recent_plan:
+    ok('P2 \u2013 explain_queries: every read uses an index')
+else:
+    fail('P2', f'{scans} / {recent_plan}')
+db.close()
+shutil.rmtree(tmp_dir)
+
+# P3 – an original-schema database: new columns added, inline bodies moved
+# into blobs a chunk at a time, and the old articles become searchable
+tmp_dir = tempfile.mkdtemp()
+db_file = Path(tmp_dir) / 'p3.db'
+legacy = sqlite3.connect(str(db_file))
+legacy.executescript('''
+    CREATE TABLE processed_emails (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        gmail_message_id TEXT UNIQUE NOT NULL, thread_id TEXT, subject TEXT, sender_email TEXT,
+        sender_name TEXT, received_timestamp TEXT, processed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        raw_headers TEXT, is_newsletter BOOLEAN, newsletter_service TEXT);
+    CREATE TABLE articles (id INTEGER PRIMARY KEY AUTOINCREMENT, email_id INTEGER, title TEXT,
+        url TEXT, author TEXT, publish_date TEXT, content TEXT, content_snippet TEXT,
+        word_count INTEGER, content_hash TEXT, extraction_timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+        paywall_detected BOOLEAN, newsletter_name TEXT, newsletter_email TEXT,
+        received_timestamp TEXT);
+    INSERT INTO processed_emails (gmail_message_id, subject) VALUES ('old-1', 'Old');
+''')
+legacy.executemany('''INSERT INTO articles (email_id, title, content, content_snippet)
+                      VALUES (1, ?, ?, ?)''',
+                   [(f'Old {i}', f'Archived body {i} about turbines', 'snip') for i in range(5)])
+legacy.commit()
+legacy.close()
+
+saved_chunk, config.DB_MIGRATION_CHUNK_ROWS = config.DB_MIGRATION_CHUNK_ROWS, 2
+import io, contextlib
+log = io.StringIO()
+try:
+    with contextlib.redirect_stdout(log):
+        db = Database(db_file)
+    inline = db.conn.execute('SELECT COUNT(*) FROM articles WHERE content IS NOT NULL').fetchone()[0]
+    columns = {row[1] for row in db.conn.execute('PRAGMA table_info(articles)')}
+    art = db.get_article_with_metadata(4)
+    hits = db.search_articles('turbines')
+    if (schema_version(db.conn) == SCHEMA_VERSION and inline == 0
+            and {'article_type', 'blurb'} <= columns and art['content'] == 'Archived body 3 about turbines'
+            and len(hits) == 5 and log.getvalue().count('rows rewritten') == 3):
+        ok('P3 \u2013 original schema migrates in chunks: columns added, bodies moved, indexed')
+    else:
+        fail('P3', f'inline {inline}, columns {sorted(columns)}, {art}, {len(hits)} hits\n{log.getvalue()}')
+    db.close()
+finally:
+    config.DB_MIGRATION_CHUNK_ROWS = saved_chunk
+    shutil.rmtree(tmp_dir)
+
+# ==================================================================
+# Q – Stored Claude results
+# ==================================================================
+print('\n\u2500\u2500 Q: Stored Claude results \u2500\u2500')
+
+# Q1 – a rerun over the same bodies reuses stored summaries and categories;
+# a new prompt version asks Claude again
+class _Mixed:
+    def extract_from_email(self, html_content, newsletter_name='', newsletter_email='',
+                           received_timestamp=''):
+        return [{'title': 'E', 'article_type': 'essay', 'content': f'essay body {html_content}'},
+                {'title': 'L', 'article_type': 'link', 'content': f'link body {html_content}'}]
+class _CountingSummarizer:
+    model, prompt_version, calls = 'm', '1', 0
+    def summarize_essays(self, essays):
+        self.calls += len(essays)
+        return [{**e, 'summary': f"v{self.prompt_version} {e['content']}"} for e in essays]
+class _CountingCategorizer:
+    model, prompt_version, calls = 'm', '1', 0
+    def categorize_articles(self, links):
+        self.calls += len(links)
+        return {i: 'Technology & AI' for i in range(len(links))}
+
+saved_path, config.DATABASE_PATH = config.DATABASE_PATH, Path(tempfile.mkdtemp()) / 'q1.db'
+try:
+    main_db = Database()
+    summ_q, cat_q = _CountingSummarizer(), _CountingCategorizer()
+    def _q_run(tag):
+        emails = [{**_email(f'q1-{tag}-{i}'), 'html': str(i), 'headers': {'List-Unsubscribe': '<x>'},
+                   'sender_name': 'N', 'text': ''} for i in range(4)]
+        return DigestPipeline(_Mixed(), summ_q, cat_q, db=main_db, essay_batch_size=3).run(iter(emails))
+    first = _q_run('a')
+    first_calls = (summ_q.calls, cat_q.calls)
+    again = _q_run('b')
+    again_calls = (summ_q.calls, cat_q.calls)
+    summ_q.prompt_version = '2'
+    bumped = _q_run('c')
+    main_db.close()
+    if (first_calls == (4, 4) and again_calls == (4, 4)
+            and [e['summary'] for e in again['essays']] == [e['summary'] for e in first['essays']]
+            and all(l['category'] == 'Technology & AI' for l in again['links'])
+            and (summ_q.calls, cat_q.calls) == (8, 4)
+            and all(e['summary'].startswith('v2 ') for e in bumped['essays'])):
+        ok('Q1 \u2013 reruns take stored results; a new prompt version is a miss')
+    else:
+        fail('Q1', f'calls {first_calls} {again_calls} {(summ_q.calls, cat_q.calls)}')
+finally:
+    shutil.rmtree(config.DATABASE_PATH.parent)
+    config.DATABASE_PATH = saved_path
+
+# Q3 – a replay reads the stored results too, so a batch where some essays
+# were hits sends Claude the same prompt as the recorded run (a cache hit)
+class _PromptClient:
+    prompts = []
+    class messages:
+        @staticmethod
+        def create(model, max_tokens, messages):
+            prompt = messages[0]['content']
+            _PromptClient.prompts.append(prompt)
+            titles = [line[len('Title : '):] for line in prompt.splitlines()
+                      if line.startswith('Title : ')]
+            resp = MagicMock(stop_reason='end_turn')
+            resp.content = [MagicMock(text=json.dumps([f'S-{t}' for t in titles]))]
+            return resp
+class _Essays:
+    def extract_from_email(self, html_content, newsletter_name='', newsletter_email='',
+                           received_timestamp=''):
+        return [{'title': f'E{html_content}', 'article_type': 'essay',
+                 'content': f'essay body {html_content}', 'newsletter_name': 'N'}]
+
+q3_dir = Path(tempfile.mkdtemp())
+saved_q3 = {k: getattr(config, k) for k in ('CLAUDE_CACHE_ENABLED', 'CLAUDE_CACHE_DIR')}
+config.CLAUDE_CACHE_ENABLED, config.CLAUDE_CACHE_DIR = True, q3_dir / 'claude'
+try:
+    live_db = Database(q3_dir / 'live.db')
+    summ_r = DigestSummarizer.__new__(DigestSummarizer)
+    summ_r.client = _PromptClient
+    essays = lambda tag, ids: [{**_email(f'q3-{tag}-{i}'), 'html': str(i), 'sender_name': 'N',
+                                'headers': {'List-Unsubscribe': '<x>'}, 'text': ''} for i in ids]
+    DigestPipeline(_Essays(), summ_r, None, db=live_db).run(iter(essays('early', [0])))
+    live = DigestPipeline(_Essays(), summ_r, None, db=live_db).run(iter(essays('day', [0, 1, 2])))
+    stored_rows = live_db.conn.execute('SELECT COUNT(*) FROM article_enrichments').fetchone()[0]
+    live_db.close()
+    live_prompts = len(_PromptClient.prompts)
+
+    api_helpers.OFFLINE = True
+    replayed = DigestPipeline(_Essays(), summ_r, None, enrichments_from=q3_dir / 'live.db').run(
+        iter(essays('replay', [0, 1, 2])))
+    check_db = Database(q3_dir / 'live.db')
+    rows_after = check_db.conn.execute('SELECT COUNT(*) FROM article_enrichments').fetchone()[0]
+    check_db.close()
+    live_summaries = [e['summary'] for e in live['essays']]
+    if (live_prompts == 2 and 'E0' not in _PromptClient.prompts[1]
+            and [e['summary'] for e in replayed['essays']] == live_summaries == ['S-E0', 'S-E1', 'S-E2']
+            and len(_PromptClient.prompts) == live_prompts and rows_after == stored_rows == 3):
+        ok('Q3 \u2013 replay takes stored summaries, so its batches match the recorded run')
+    else:
+        fail('Q3', f'live {live_summaries}, replay {[e["summary"] for e in replayed["essays"]]}, '
+                   f'prompts {len(_PromptClient.prompts)}, rows {stored_rows}/{rows_after}')
+except Exception as e:
+    fail('Q3', repr(e))
+finally:
+    api_helpers.OFFLINE = False
+    for k, v in saved_q3.items():
+        setattr(config, k, v)
+    shutil.rmtree(q3_dir)
+
+# Q2 – the categorizer's prompt version follows the category definitions
+saved_defs = dict(config.CATEGORY_DEFINITIONS)
+before = cat.prompt_version
+try:
+    first_cat = config.CATEGORIZABLE_CATEGORIES[0]
+    config.CATEGORY_DEFINITIONS[first_cat] = 'Something else entirely.'
+    if cat.prompt_version != before and summ.prompt_version == '1' and cat.model == summ.model:
+        ok('Q2 \u2013 editing a category definition changes the prompt version')
+    else:
+        fail('Q2', f'{before} / {cat.prompt_version}')
+finally:
+    config.CATEGORY_DEFINITIONS.clear()
+    config.CATEGORY_DEFINITIONS.update(saved_defs)
+
+# Q4 – links cut from one block share their body text but keep their own
+# stored category, on the run that stores them and on a rerun
+class _SharedBlock:
+    def extract_from_email(self, html_content, newsletter_name='', newsletter_email='',
+                           received_timestamp=''):
+        return [{'title': t, 'url': f'https://q4.example/{t}', 'article_type': 'link',
+                 'content': 'one shared block of link text'} for t in ('chips', 'markets')]
+class _ByTitle:
+    model, prompt_version, calls = 'm', '1', 0
+    def categorize_articles(self, links):
+        self.calls += len(links)
+        return {i: 'Technology & AI' if l['title'] == 'chips' else 'Markets & Finance'
+                for i, l in enumerate(links)}
+
+q4_dir = Path(tempfile.mkdtemp())
+try:
+    q4_db, cat_4 = Database(q4_dir / 'q4.db'), _ByTitle()
+    q4_runs = [DigestPipeline(_SharedBlock(), None, cat_4, db=q4_db).run(iter([
+                   {**_email(f'q4-{tag}'), 'sender_name': 'N', 'text': '', 'html': 'x',
+                    'headers': {'List-Unsubscribe': '<x>'}}]))
+               for tag in ('a', 'b')]
+    q4_db.close()
+    q4_cats = [[l['category'] for l in run['links']] for run in q4_runs]
+    if q4_cats == [['Technology & AI', 'Markets & Finance']] * 2 and cat_4.calls == 2:
+        ok('Q4 \u2013 links sharing a body keep their own stored categories')
+    else:
+        fail('Q4', f'categories {q4_cats}, calls {cat_4.calls}')
+finally:
+    shutil.rmtree(q4_dir)
+
+# ==================================================================
+# R – Newsletter registry and digest membership
+# ==================================================================
+print('\n\u2500\u2500 R: Newsletter registry and digest membership \u2500\u2500')
+
+tmp_dir = tempfile.mkdtemp()
+db = Database(Path(tmp_dir) / 'r.db')
+
+# R1 – newly stored newsletter emails are counted per sender, once each
+def _from(mid, sender, day, newsletter=True):
+    return {**_email(mid), 'sender_email': sender, 'sender_name': sender.split('@')[0],
+            'received_timestamp': f'2026-03-{day:02d}T08:00:00', 'is_newsletter': newsletter}
+db.store_emails_bulk([_from('r-1', 'Platformer@substack.com', 5),
+                      _from('r-2', 'stratechery@substack.com', 6),
+                      _from('r-3', 'platformer@substack.com', 2),
+                      _from('r-3', 'platformer@substack.com', 2),
+                      _from('r-4', 'receipts@shop.com', 7, newsletter=False)])
+db.store_emails_bulk([_from('r-1', 'platformer@substack.com', 5),
+                      _from('r-5', 'platformer@substack.com', 9)])
+plat = db.get_newsletter_stats('platformer@substack.com')
+strat = db.get_newsletter_stats('Stratechery@substack.com')
+if (plat and plat['total_received'] == 3 and plat['first_seen'].startswith('2026-03-02')
+        and plat['last_seen'].startswith('2026-03-09') and plat['sender_domain'] == 'substack.com'
+        and strat and strat['total_received'] == 1
+        and db.get_newsletter_stats('receipts@shop.com') is None):
+    ok('R1 \u2013 newsletters registry: per-sender counts and dates, repeats ignored')
+else:
+    fail('R1', f'{plat} / {strat}')
+
+# R2 – store_digest records the digest's articles; a same-day rerun replaces them
+email_id = db.store_email(_email('r-digest'))
+art_ids = db.store_articles_bulk([({'title': f'R{i}', 'content': f'r body {i}'}, email_id)
+                                  for i in range(3)])
+paths = {'webpage_path': 'w.html', 'email_path': 'e.html'}
+first_id = db.store_digest({'total_articles': 3, 'newsletter_count': 1,
+                            'all_articles': [{'id': i, 'section': 'Other'} for i in art_ids]}, paths)
+second_id = db.store_digest({'total_articles': 1, 'newsletter_count': 1,
+                             'all_articles': [{'id': art_ids[0], 'section': 'Essays'}]}, paths)
+members = db.conn.execute('SELECT digest_id, article_id, section FROM digest_articles').fetchall()
+digests = db.conn.execute('SELECT article_count FROM daily_digests').fetchall()
+if (first_id == second_id and [tuple(m) for m in members] == [(first_id, art_ids[0], 'Essays')]
+        and [d[0] for d in digests] == [1]):
+    ok('R2 \u2013 store_digest fills digest_articles and replaces a same-day digest')
+else:
+    fail('R2', f'{first_id}/{second_id} {[tuple(m) for m in members]} {[tuple(d) for d in digests]}')
+db.close()
+shutil.rmtree(tmp_dir)
+
+# ==================================================================
+# S – HTML parser backends
+# ==================================================================
+print('\n\u2500\u2500 S: HTML parser backends \u2500\u2500')
+
+from src.processors.parsers import available_backends, get_backend
+
+# S1 – every installed backend extracts identical articles from the fixtures
+# (every article kept, so nothing hides behind MIN_WORD_COUNT)
+fixtures = sorted((Path(__file__).resolve().parent / 'fixtures' / 'newsletters').glob('*.html'))
+saved_min, config.MIN_WORD_COUNT = config.MIN_WORD_COUNT, 1
+try:
+    outputs = {name: [ArticleExtractor(name).extract_from_email(
+                          f.read_bytes().decode('utf-8'), newsletter_name='Fixture Weekly',
+                          newsletter_email='editor@platformer.news', received_timestamp='t')
+                      for f in fixtures]
+               for name in available_backends()}
+finally:
+    config.MIN_WORD_COUNT = saved_min
+reference = outputs['html.parser']
+differ = [(name, f.name) for name, out in outputs.items()
+          for f, got, want in zip(fixtures, out, reference) if got != want]
+if len(fixtures) >= 6 and all(reference) and not differ:
+    ok(f'S1 \u2013 {", ".join(outputs)} agree on all {len(fixtures)} fixture newsletters')
+else:
+    fail('S1', f'{len(fixtures)} fixtures, differences: {differ}')
+
+# S2 – an unknown or uninstalled backend is refused up front
+try:
+    get_backend('html5lib-turbo')
+    fail('S2', 'no error')
+except ValueError as e:
+    if 'html.parser' in str(e):
+        ok('S2 \u2013 unknown parser backend raises ValueError naming the installed ones')
+    else:
+        fail('S2', str(e))
+
+# S3 – one walk indexes text, anchors and top-level children the same way
+# on every backend; an anchor's links() leave the anchor itself out
+snippet = ('<html><head><title>Index test</title></head><body>lead <!-- note -->'
+           '<h2>One <a href="https://e.com/1">first</a></h2>'
+           '<a href="https://e.com/2">top <b>level</b></a><script>skip()</script>'
+           '<p>tail <a href>bare</a></p></body></html>')
+shapes = {}
+for name in available_backends():
+    doc = get_backend(name).index(snippet)
+    top = [e for e in doc.body if doc.text(e)]    # <script> / comments stay empty
+    shapes[name] = ([(e.tag, doc.text(e, '|')) for e in top],
+                    [(a.href, doc.text(a)) for a in doc.anchors],
+                    [[a.href for a in doc.links(e)] for e in top if e.tag],
+                    doc.text(doc.root, ' '))
+want = ([(None, 'lead'), ('h2', 'One|first'), ('a', 'top|level'), ('p', 'tail|bare')],
+        [('https://e.com/1', 'first'), ('https://e.com/2', 'toplevel'), ('', 'bare')],
+        [['https://e.com/1'], [], ['']],
+        'Index test lead One first top level tail bare')
+if all(shape == want for shape in shapes.values()):
+    ok('S3 \u2013 DocumentIndex: text ranges, anchors and top-level children agree')
+else:
+    fail('S3', str(shapes))
+
+# ==================================================================
+# T – Process-pool extraction
+# ==================================================================
+print('\n\u2500\u2500 T: Process-pool extraction \u2500\u2500')
+
+from src.processors.pool import ExtractorPool
+
+# T1 – chunked over worker processes, results come back in job order and
+# match in-process extraction (workers fork after the config change)
+jobs = [{'html_content': f.read_bytes().decode('utf-8'), 'newsletter_name': 'Fixture Weekly',
+         'newsletter_email': 'editor@platformer.news', 'received_timestamp': 't'}
+        for f in fixtures] * 3
+saved_min, config.MIN_WORD_COUNT = config.MIN_WORD_COUNT, 1
+try:
+    with ExtractorPool(ArticleExtractor('html.parser'), workers=2, chunk_size=4,
+                       max_pending=2) as pool:
+        pooled = list(pool.imap(iter(jobs)))
+    if pooled == reference * 3:
+        ok(f'T1 \u2013 ExtractorPool returns all {len(jobs)} newsletters in order, '
+           f'identical to in-process extraction')
+    else:
+        fail('T1', f'{len(pooled)} results, {sum(a == b for a, b in zip(pooled, reference * 3))} match')
+except Exception as e:
+    fail('T1', repr(e))
+finally:
+    config.MIN_WORD_COUNT = saved_min
+
+# T2 – the pipeline's process mode routes the same articles, in arrival order,
+# as its thread mode
+nls = lambda: ({'gmail_message_id': f't{i}', 'sender_email': 'editor@platformer.news',
+                'sender_name': 'Fixture Weekly', 'headers': {}, 'text': '',
+                'html': job['html_content']} for i, job in enumerate(jobs))
+titles = {}
+for processes in (0, 2):
+    pipe = DigestPipeline(ArticleExtractor(), _BatchSummarizer(), _BatchCategorizer(),
+                          extract_processes=processes, queue_size=4)
+    res = pipe.run(nls())
+    titles[processes] = ([a['title'] for a in res['articles']], res['newsletter_ids'],
+                         pipe.stats['extract'].items, pipe.stats['extract'].workers)
+if (titles[0][:3] == titles[2][:3] and titles[0][0] and titles[2][2] == len(jobs)
+        and titles[2][3] == 2):
+    ok(f'T2 \u2013 pipeline with extract_processes=2 matches thread mode '
+       f'({len(titles[2][0])} articles from {len(jobs)} newsletters)')
+else:
+    fail('T2', str(titles))
+
+# ==================================================================
+# U – Compiled phrase matching
+# ==================================================================
+print('\n\u2500\u2500 U: Compiled phrase matching \u2500\u2500')
+
+from src.phrases import PhraseMatcher, matcher_for
+from src.gmail.filters import detect_newsletter_service, should_skip_email
+
+# U1 – a matcher agrees with one `in` per phrase on short (regex) and long
+# (substring) text; first_in gives the earliest, longest phrase
+m = PhraseMatcher(['pay', 'paywall', 'Premium Content', 'a.b'])
+samples = ['PAYWALL ahead', 'prem content', 'axb', 'x a.b', 'Premium content!', '']
+samples += [('lorem ipsum ' * 20) + s for s in samples]
+naive = [any(p in s.lower() for p in m.phrases) for s in samples]
+if ([m.any_in(s) for s in samples] == naive and any(len(s) > m.LONG_TEXT for s in samples)
+        and m.first_in('the Paywall, then pay') == 'paywall' and m.first_in('axb') is None
+        and not PhraseMatcher([]).any_in('anything')
+        and matcher_for(['a', 'b']) is matcher_for(('a', 'b'))):
+    ok('U1 \u2013 PhraseMatcher matches like per-phrase `in`, either side of LONG_TEXT')
+else:
+    fail('U1', f'{[m.any_in(s) for s in samples]} vs {naive}, first_in {m.first_in("the Paywall, then pay")}')
+
+# U2 – the gate's checks run on the compiled matchers
+if (should_skip_email({'sender_email': 'No-Reply@shop.com', 'subject': 'Hi'})
+        and should_skip_email({'sender_email': 'a@b.com', 'subject': 'Your RECEIPT'})
+        and not should_skip_email({'sender_email': 'editor@platformer.news', 'subject': 'Issue 9'})
+        and detect_newsletter_service('Writer@Substack.com', {}) == 'substack'
+        and detect_newsletter_service('a@b.com', {'Return-Path': '<bounce@mail.beehiiv.com>'}) == 'beehiiv'
+        and detect_newsletter_service('a@b.com', {}) is None):
+    ok('U2 \u2013 skip and newsletter-service checks give the same answers as before')
+else:
+    fail('U2', 'gate checks changed')
+
+# ==================================================================
+# V – URL verdict cache
+# ==================================================================
+print('\n\u2500\u2500 V: URL verdict cache \u2500\u2500')
+
+from src.processors.extractor import URL_RULES_VERSION, _url_verdict
+from src.processors.urlcache import UrlCache
+
+url_dir = Path(tempfile.mkdtemp())
+saved_url = {k: getattr(config, k) for k in ('URL_CACHE_ENABLED', 'URL_CACHE_PATH')}
+config.URL_CACHE_ENABLED, config.URL_CACHE_PATH = True, url_dir / 'urls.json'
+try:
+    # V1 – repeat issues hit the cache, and a warm cache extracts the same articles
+    cache = UrlCache(_url_verdict, URL_RULES_VERSION)
+    warm = ArticleExtractor('html.parser', url_cache=cache)
+    saved_min, config.MIN_WORD_COUNT = config.MIN_WORD_COUNT, 1
+    try:
+        runs = [[warm.extract_from_email(job['html_content'], 'Fixture Weekly',
+                                         'editor@platformer.news', 't') for job in jobs[:6]]
+                for _ in range(2)]
+    finally:
+        config.MIN_WORD_COUNT = saved_min
+    first_misses = cache.misses
+    if runs[0] == runs[1] == reference and cache.hits > first_misses > 0 and len(cache) == first_misses:
+        ok(f'V1 \u2013 second pass over the fixtures served from the cache '
+           f'({cache.hit_rate:.0%} hits overall, {len(cache)} URLs)')
+    else:
+        fail('V1', f'same {runs[0] == runs[1] == reference}, hits {cache.hits}, misses {first_misses}')
+
+    # V2 – saved and reloaded in LRU order, bounded, and dropped when the rules change
+    cache.save()
+    reloaded = UrlCache(_url_verdict, URL_RULES_VERSION)
+    small = UrlCache(_url_verdict, URL_RULES_VERSION, max_entries=3)
+    newest = list(cache._entries)[-3:]
+    small.get('https://example.com/new/a/b')
+    stale = UrlCache(_url_verdict, 'other-rules')
+    if (list(reloaded._entries.items()) == list(cache._entries.items())
+            and list(small._entries) == newest[1:] + ['https://example.com/new/a/b']
+            and len(stale) == 0 and reloaded.hits == reloaded.misses == 0):
+        ok('V2 \u2013 URL cache persists in LRU order, evicts the oldest, ignores other rule versions')
+    else:
+        fail('V2', f'reloaded {len(reloaded)}, small {list(small._entries)}, stale {len(stale)}')
+except Exception as e:
+    fail('V', repr(e))
+finally:
+    for k, v in saved_url.items():
+        setattr(config, k, v)
+    shutil.rmtree(url_dir)
+
 # ==================================================================
 # Summary
 # ==================================================================